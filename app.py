@@ -3,19 +3,31 @@ Option Pricing and Risk Analyzer
 Main Streamlit application with Black-Scholes pricing model
 """
 
+import os
+from concurrent.futures import wait
+
 import streamlit as st
 import numpy as np
-from black_scholes import calculate_call_price, calculate_put_price
-from database import init_database, save_calculation
+from database import (
+    find_nearest_calculations, find_saved_surface, list_calculations, load_calculation
+)
 
 # UI imports
 from ui.styling import get_dark_mode_css
 from ui.sidebar import render_sidebar
-from ui.components import render_title, render_parameters_table, render_value_box
+from ui.components import (
+    render_title, render_parameters_table, render_value_box, render_diagnostics_panel,
+    render_history_panel
+)
 
 # Utils imports
-from utils.calculations import calculate_pnl_grids
+from utils.cache import cached_option_prices, cached_pricing_grid, default_cache, quantize
+from utils.downsample import downsample_grid
 from utils.heatmap import create_heatmap_figure
+from utils.incremental import IncrementalGridEngine
+from utils.instrumentation import METRICS_FILE_ENV_VAR, instrumentation
+from utils.persistence import ConnectionPool, WriteBehindWriter
+from utils.surface_grid import SurfaceGridEngine
 
 # Page configuration
 st.set_page_config(
@@ -24,53 +36,155 @@ st.set_page_config(
     layout="wide"
 )
 
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def price_headline(S, K, T, r, sigma, exercise='european', q=0.0, model='black-scholes'):
+    """Headline call/put values, cached across reruns and sessions"""
+    call_price, put_price = cached_option_prices(
+        S, K, T, r, sigma, exercise=exercise, q=q, model=model
+    )
+    return float(call_price), float(put_price)
+
+
+DB_PATH = 'options.db'
+
+# Saved calculations listed per history page
+HISTORY_PAGE_SIZE = 10
+
+# Seconds a rerun waits for the writer to commit a save before reporting it
+# as queued; saves normally commit in milliseconds, so the outcome is shown
+# on the same interaction
+SAVE_CONFIRM_TIMEOUT = 5.0
+
+
+@st.cache_resource
+def get_database():
+    """
+    Process-wide read pool and write-behind writer shared by every session,
+    so sessions neither share connections nor contend for the write lock
+    """
+    return ConnectionPool(DB_PATH), WriteBehindWriter(DB_PATH)
+
+
+@st.cache_resource
+def get_surface_engine():
+    """
+    Process-wide American grid engine: its surface indexes serve every
+    session pricing the same maturity, rate and yield
+    """
+    return SurfaceGridEngine()
+
+
+def price_grid(min_spot, max_spot, min_vol, max_vol, grid_size, K, T, r,
+               exercise='european', q=0.0, model='black-scholes', engine=None, pool=None):
+    """
+    Priced spot x volatility grid, cached across reruns and sessions in
+    default_cache, which is bounded by bytes. Misses are served from a
+    surface saved on the same grid when the database behind the read pool
+    has one, and otherwise go through the engine for the exercise style:
+    the session's incremental engine for European grids, the shared
+    surface-index engine for American ones.
+    """
+    # Quantized as cached_pricing_grid does, so saved axes and the engine's
+    # previous axes compare exactly
+    spot_prices = quantize(np.linspace(min_spot, max_spot, grid_size))
+    volatilities = quantize(np.linspace(min_vol, max_vol, grid_size))
+
+    def load_saved(spot_prices, volatilities):
+        with pool.connection() as conn:
+            calculation_id = find_saved_surface(
+                conn, K, T, r, spot_prices, volatilities, exercise_style=exercise,
+                dividend_yield=q, model=model
+            )
+            if calculation_id is None:
+                return None
+            instrumentation.increment('grids_served_from_db')
+            return load_calculation(conn, calculation_id)[1]
+
+    return cached_pricing_grid(
+        spot_prices, volatilities, K, T, r, engine=engine, exercise=exercise,
+        dividend_yield=q, model=model, load_saved=None if pool is None else load_saved
+    )
+
+
+instrumentation.start_rerun()
+
 # Apply dark mode CSS
 st.markdown(get_dark_mode_css(), unsafe_allow_html=True)
 
-# Initialize database
-if 'db_conn' not in st.session_state:
-    st.session_state.db_conn = init_database()
+# Shared database access; saves this session has queued but not yet reported
+db_pool, db_writer = get_database()
+if 'pending_saves' not in st.session_state:
+    st.session_state.pending_saves = []
+
+# Per-session grid engine that reuses rows/columns across slider changes
+if 'grid_engine' not in st.session_state:
+    st.session_state.grid_engine = IncrementalGridEngine()
 
 # Render sidebar and get input parameters
-params = render_sidebar()
+with instrumentation.stage('sidebar'):
+    params = render_sidebar()
 
 # Main dashboard
 render_title()
 
-# Calculate option prices
-call_value = calculate_call_price(
-    params['current_asset_price'], 
-    params['strike_price'], 
-    params['time_to_maturity'], 
-    params['risk_free_rate'], 
-    params['volatility']
-)
-put_value = calculate_put_price(
-    params['current_asset_price'], 
-    params['strike_price'], 
-    params['time_to_maturity'], 
-    params['risk_free_rate'], 
-    params['volatility']
-)
+# Calculate option prices (inputs are quantized so they form stable cache keys)
+with instrumentation.stage('pricing'):
+    call_value, put_value = price_headline(
+        quantize(params['current_asset_price']),
+        quantize(params['strike_price']),
+        quantize(params['time_to_maturity']),
+        quantize(params['risk_free_rate']),
+        quantize(params['volatility']),
+        params['exercise_style'],
+        quantize(params['dividend_yield']),
+        params['model']
+    )
 
 # Display input parameters table
 render_parameters_table(params)
 
-# Generate heatmap data
-# Create 10x10 grid
-grid_size = 10
-spot_prices = np.linspace(params['min_spot_price'], params['max_spot_price'], grid_size)
-volatilities = np.linspace(params['min_volatility'], params['max_volatility'], grid_size)
-
-# Calculate PnL grids
-call_pnl_grid, put_pnl_grid = calculate_pnl_grids(
-    spot_prices,
-    volatilities,
-    params['strike_price'],
-    params['time_to_maturity'],
-    params['risk_free_rate'],
-    params['purchase_price']
+# Generate heatmap data at the chosen resolution over the zoom window
+grid_size = params['grid_resolution']
+zoom_min_spot, zoom_max_spot = params['zoom_spot_range']
+zoom_min_vol, zoom_max_vol = params['zoom_volatility_range']
+
+# Price the grid once; the heatmaps and the Save handler share the result
+with instrumentation.stage('grid'):
+    pricing_result = price_grid(
+        quantize(zoom_min_spot),
+        quantize(zoom_max_spot),
+        quantize(zoom_min_vol),
+        quantize(zoom_max_vol),
+        grid_size,
+        quantize(params['strike_price']),
+        quantize(params['time_to_maturity']),
+        quantize(params['risk_free_rate']),
+        params['exercise_style'],
+        quantize(params['dividend_yield']),
+        params['model'],
+        engine=(st.session_state.grid_engine if params['exercise_style'] == 'european'
+                else get_surface_engine()),
+        pool=db_pool
+    ).with_purchase_price(params['purchase_price'])
+
+# Downsample for display only; the full-resolution grid is what gets saved
+display_resolution = params['display_resolution']
+call_pnl_grid, spot_prices, volatilities = downsample_grid(
+    pricing_result.call_pnl, pricing_result.spot_prices,
+    pricing_result.volatilities, display_resolution
 )
+put_pnl_grid, _, _ = downsample_grid(
+    pricing_result.put_pnl, pricing_result.spot_prices,
+    pricing_result.volatilities, display_resolution
+)
+grid_caption = f"Computed {pricing_result.shape[0]}×{pricing_result.shape[1]} grid"
+if call_pnl_grid.shape != pricing_result.shape:
+    grid_caption += (
+        f", showing {call_pnl_grid.shape[0]}×{call_pnl_grid.shape[1]} "
+        f"(each cell shows its block's extreme PnL)"
+    )
+st.caption(grid_caption)
 
 # Create heatmaps
 col1, col2 = st.columns(2)
@@ -80,12 +194,13 @@ with col1:
     render_value_box(call_value, 'call')
     
     # Create and display heatmap
-    fig_call = create_heatmap_figure(
-        call_pnl_grid,
-        spot_prices,
-        volatilities,
-        "PnL ($)"
-    )
+    with instrumentation.stage('figure'):
+        fig_call = create_heatmap_figure(
+            call_pnl_grid,
+            spot_prices,
+            volatilities,
+            "PnL ($)"
+        )
     st.plotly_chart(fig_call, width='content')
 
 with col2:
@@ -93,12 +208,13 @@ with col2:
     render_value_box(put_value, 'put')
     
     # Create and display heatmap
-    fig_put = create_heatmap_figure(
-        put_pnl_grid,
-        spot_prices,
-        volatilities,
-        "PnL ($)"
-    )
+    with instrumentation.stage('figure'):
+        fig_put = create_heatmap_figure(
+            put_pnl_grid,
+            spot_prices,
+            volatilities,
+            "PnL ($)"
+        )
     st.plotly_chart(fig_put, width='content')
 
 # Save to database button
@@ -110,47 +226,77 @@ if st.button("Save to Database", type="primary"):
         'StrikePrice': params['strike_price'],
         'InterestRate': params['risk_free_rate'],
         'Volatility': params['volatility'],
-        'TimeToMaturity': params['time_to_maturity']
+        'TimeToMaturity': params['time_to_maturity'],
+        'ExerciseStyle': params['exercise_style'],
+        'DividendYield': params['dividend_yield'],
+        'Model': params['model']
     }
     
-    # Prepare heatmap data
-    heatmap_data = []
-    
-    # Add call option data
-    for i, spot in enumerate(spot_prices):
-        for j, vol in enumerate(volatilities):
-            call_price = calculate_call_price(
-                spot, params['strike_price'], params['time_to_maturity'], 
-                params['risk_free_rate'], vol
-            )
-            heatmap_data.append({
-                'VolatilityShock': vol,
-                'StockPriceShock': spot,
-                'OptionPrice': call_price,
-                'IsCall': True
-            })
-    
-    # Add put option data
-    for i, spot in enumerate(spot_prices):
-        for j, vol in enumerate(volatilities):
-            put_price = calculate_put_price(
-                spot, params['strike_price'], params['time_to_maturity'], 
-                params['risk_free_rate'], vol
-            )
-            heatmap_data.append({
-                'VolatilityShock': vol,
-                'StockPriceShock': spot,
-                'OptionPrice': put_price,
-                'IsCall': False
-            })
-    
-    # Save to database
+    # Queue the save; the writer thread commits it without blocking this rerun
     try:
-        calculation_id = save_calculation(
-            st.session_state.db_conn, 
-            input_params, 
-            heatmap_data
-        )
-        st.success(f"✅ Calculation saved successfully! Calculation ID: {calculation_id}")
+        with instrumentation.stage('db_write'):
+            st.session_state.pending_saves.append(db_writer.save(
+                input_params, 
+                pricing_result,
+                storage='blob'
+            ))
+        instrumentation.increment('db_saves')
     except Exception as e:
         st.error(f"❌ Error saving to database: {str(e)}")
+
+# Report queued saves once the writer has finished them, waiting briefly so
+# a save's success or failure shows on the rerun that queued it
+if st.session_state.pending_saves:
+    wait(st.session_state.pending_saves, timeout=SAVE_CONFIRM_TIMEOUT)
+for future in [f for f in st.session_state.pending_saves if f.done()]:
+    st.session_state.pending_saves.remove(future)
+    if future.exception() is None:
+        st.success(f"✅ Calculation saved successfully! Calculation ID: {future.result()}")
+    else:
+        st.error(f"❌ Error saving to database: {str(future.exception())}")
+if st.session_state.pending_saves:
+    st.info(f"💾 {len(st.session_state.pending_saves)} calculation(s) queued for saving")
+
+# Saved calculation history, paged by CalculationID, and nearest saved runs
+if 'history_before_id' not in st.session_state:
+    st.session_state.history_before_id = None
+with db_pool.connection() as conn:
+    history = list_calculations(
+        conn, HISTORY_PAGE_SIZE + 1, st.session_state.history_before_id
+    )
+    nearest = find_nearest_calculations(conn, {
+        'StockPrice': params['current_asset_price'],
+        'StrikePrice': params['strike_price'],
+        'Volatility': params['volatility'],
+        'TimeToMaturity': params['time_to_maturity']
+    })
+history_action = render_history_panel(
+    history[:HISTORY_PAGE_SIZE],
+    nearest,
+    has_older=len(history) > HISTORY_PAGE_SIZE,
+    has_newer=st.session_state.history_before_id is not None
+)
+if history_action == 'older':
+    st.session_state.history_before_id = history[HISTORY_PAGE_SIZE - 1]['CalculationID']
+elif history_action == 'newest':
+    st.session_state.history_before_id = None
+
+# Diagnostics (only rendered when instrumentation is enabled)
+if instrumentation.enabled:
+    for name, value in default_cache.stats().items():
+        instrumentation.set_gauge(f'pricing_cache_{name}', value)
+    instrumentation.set_gauge('grid_cells_computed', st.session_state.grid_engine.cells_computed)
+    instrumentation.set_gauge('grid_cells_reused', st.session_state.grid_engine.cells_reused)
+    for name, value in get_surface_engine().stats().items():
+        instrumentation.set_gauge(f'surface_{name}', value)
+    for name, value in db_writer.stats().items():
+        instrumentation.set_gauge(f'db_writer_{name}', value)
+    instrumentation.end_rerun()
+    if os.environ.get(METRICS_FILE_ENV_VAR):
+        instrumentation.dump(os.environ[METRICS_FILE_ENV_VAR])
+render_diagnostics_panel(instrumentation)
+
+# Show the other history page; st.rerun() ends the script by raising, so it
+# comes after end_rerun() has stopped the profiler and recorded this rerun
+if history_action is not None:
+    st.rerun()
@@ -0,0 +1,404 @@
+"""
+Headless Batch Pricing
+Streams option rows from CSV or Parquet through the vectorized Black-Scholes
+engine and writes prices and Greeks incrementally
+
+Usage:
+    python batch_pricing.py input.csv output.csv --greeks delta,gamma,vega
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from black_scholes import GREEK_NAMES, MODELS, black_scholes_prices, calculate_greeks
+
+# Input columns: spot, strike, expiry (years), rate and volatility are
+# required; option_type ('call'/'put', 'c'/'p' or 1/0) is optional and only
+# selects which Greeks are reported (calls when absent); dividend_yield is
+# optional and 0 when absent
+REQUIRED_COLUMNS = ('spot', 'strike', 'expiry', 'rate', 'volatility')
+OPTION_TYPE_COLUMN = 'option_type'
+DIVIDEND_YIELD_COLUMN = 'dividend_yield'
+NUMERIC_COLUMNS = REQUIRED_COLUMNS + (DIVIDEND_YIELD_COLUMN,)
+
+# Columns written by price_chunk; input columns with these names are the
+# output of an earlier run and are dropped before re-pricing
+PRICE_COLUMNS = ('call_price', 'put_price')
+OUTPUT_COLUMNS = PRICE_COLUMNS + GREEK_NAMES
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _file_format(path, explicit=None):
+    """Return 'csv' or 'parquet' from an explicit choice or the extension"""
+    if explicit:
+        return explicit
+    extension = os.path.splitext(path)[1].lower()
+    return 'parquet' if extension in ('.parquet', '.pq') else 'csv'
+
+
+def _require_pyarrow():
+    """Import pyarrow lazily, with a clear error when it is missing"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet input/output requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _pyarrow_csv():
+    """Return pyarrow.csv, or None when pyarrow is not installed"""
+    try:
+        import pyarrow.csv
+    except ImportError:
+        return None
+    return pyarrow.csv
+
+
+def _read_csv_header(path):
+    """Return the column names from the header row of a CSV file"""
+    with open(path, newline='') as f:
+        return next(csv.reader(f))
+
+
+def iter_csv_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a CSV file in fixed-size chunks.
+
+    Columns are parsed a chunk at a time rather than row by row: with
+    pyarrow.csv when pyarrow is installed, otherwise with np.loadtxt. The
+    pricing inputs are read as floats by pyarrow; every other column keeps
+    its text.
+
+    Args:
+        path (str): CSV file with a header row
+        chunk_size (int): Rows per chunk
+
+    Yields:
+        dict: Column name to numpy array
+    """
+    header = _read_csv_header(path)
+    pa_csv = _pyarrow_csv()
+    if pa_csv is None:
+        yield from _iter_csv_chunks_numpy(path, header, chunk_size)
+    else:
+        yield from _iter_csv_chunks_pyarrow(pa_csv, path, header, chunk_size)
+
+
+def _iter_csv_chunks_pyarrow(pa_csv, path, header, chunk_size):
+    """Stream a CSV file through pyarrow, re-batched to chunk_size rows"""
+    import pyarrow as pa
+
+    # Explicit types: inference from the first block can disagree with a
+    # later one (e.g. '100' then '100.5')
+    column_types = {
+        name: pa.float64() if name in NUMERIC_COLUMNS else pa.string() for name in header
+    }
+    reader = pa_csv.open_csv(
+        path, convert_options=pa_csv.ConvertOptions(column_types=column_types)
+    )
+    pending = []
+    pending_rows = 0
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            yield _table_columns(table.slice(0, chunk_size))
+            rest = table.slice(chunk_size)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield _table_columns(pa.Table.from_batches(pending))
+
+
+def _iter_csv_chunks_numpy(path, header, chunk_size):
+    """Read a CSV file with np.loadtxt, chunk_size rows per call"""
+    with open(path, newline='') as f:
+        f.readline()
+        while True:
+            with warnings.catch_warnings():
+                # A file whose length is a multiple of chunk_size ends
+                # with an empty read, which loadtxt warns about
+                warnings.simplefilter('ignore', UserWarning)
+                block = np.loadtxt(f, dtype=str, delimiter=',', quotechar='"',
+                                   max_rows=chunk_size, ndmin=2)
+            if len(block) == 0:
+                break
+            yield {name: block[:, i] for i, name in enumerate(header)}
+            if len(block) < chunk_size:
+                break
+
+
+def _table_columns(table):
+    """Convert a pyarrow Table to a dict of numpy arrays"""
+    return {
+        name: column.to_numpy()
+        for name, column in zip(table.column_names, table.columns)
+    }
+
+
+def iter_parquet_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a Parquet file in record batches of at most chunk_size rows.
+
+    Args:
+        path (str): Parquet file
+        chunk_size (int): Rows per chunk
+
+    Yields:
+        dict: Column name to numpy array
+    """
+    pa = _require_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield {
+            name: column.to_numpy(zero_copy_only=False)
+            for name, column in zip(batch.schema.names, batch.columns)
+        }
+
+
+def _csv_field(column):
+    """Return a column as an object array of CSV fields and its % format"""
+    column = np.asarray(column)
+    fields = np.empty(len(column), dtype=object)
+    if column.dtype.kind == 'f':
+        # repr() of a Python float is the shortest text that round-trips
+        fields[:] = column
+        return fields, '%r'
+    if column.dtype.kind in 'biu':
+        fields[:] = column
+        return fields, '%s'
+    text = column.astype(str)
+    needs_quotes = (np.char.find(text, ',') >= 0) | (np.char.find(text, '"') >= 0)
+    if needs_quotes.any():
+        quoted = np.char.add(np.char.add('"', np.char.replace(text, '"', '""')), '"')
+        text = np.where(needs_quotes, quoted, text)
+    fields[:] = text
+    return fields, '%s'
+
+
+class CsvChunkWriter:
+    """
+    Appends chunks of columns to a CSV file, writing the header once.
+
+    Each chunk is written as a whole: through pyarrow.csv when pyarrow is
+    installed, otherwise with np.savetxt.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._pa_csv = _pyarrow_csv()
+        self._file = None
+        self._writer = None
+
+    def write(self, columns):
+        if self._pa_csv is not None:
+            import pyarrow as pa
+
+            table = pa.table(dict(columns))
+            if self._writer is None:
+                self._writer = self._pa_csv.CSVWriter(self._path, table.schema)
+            self._writer.write_table(table)
+            return
+
+        if self._file is None:
+            self._file = open(self._path, 'w', newline='')
+            csv.writer(self._file, lineterminator='\n').writerow(list(columns))
+        fields, formats = zip(*(_csv_field(column) for column in columns.values()))
+        np.savetxt(self._file, np.column_stack(fields), fmt=list(formats), delimiter=',')
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class ParquetChunkWriter:
+    """Appends chunks of columns to a Parquet file as row groups"""
+
+    def __init__(self, path):
+        self._pa = _require_pyarrow()
+        self._path = path
+        self._writer = None
+
+    def write(self, columns):
+        pa = self._pa
+        table = pa.table({
+            name: pa.array(column) for name, column in columns.items()
+        })
+        if self._writer is None:
+            self._writer = pa.parquet.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _parse_option_type(column):
+    """Convert an option_type column to a boolean is_call array"""
+    values = np.char.lower(np.asarray(column).astype(str))
+    return np.isin(values, ('call', 'c', '1', 'true', '1.0'))
+
+
+def price_chunk(columns, greeks=(), pricer=None, model='black-scholes'):
+    """
+    Price one chunk of rows.
+
+    Args:
+        columns (dict): Column name to values; must contain REQUIRED_COLUMNS
+        greeks (iterable of str): Greeks to add (subset of GREEK_NAMES)
+        pricer (ParallelPricer): Process pool used for the prices (optional)
+        model (str): One of MODELS; 'black-76' reads spot as the futures price
+
+    Returns:
+        dict: Output columns: call_price, put_price and one column per Greek
+    """
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {missing}")
+
+    S, K, T, r, sigma = (
+        np.asarray(columns[name], dtype=np.float64) for name in REQUIRED_COLUMNS
+    )
+    q = np.asarray(columns.get(DIVIDEND_YIELD_COLUMN, 0.0), dtype=np.float64)
+    price = black_scholes_prices if pricer is None else pricer.option_prices
+    call_prices, put_prices = price(S, K, T, r, sigma, q, model)
+    outputs = {'call_price': call_prices, 'put_price': put_prices}
+
+    if greeks:
+        if OPTION_TYPE_COLUMN in columns:
+            is_call = _parse_option_type(columns[OPTION_TYPE_COLUMN])
+        else:
+            is_call = True
+        outputs.update(calculate_greeks(
+            S, K, T, r, sigma, is_call=is_call, greeks=greeks, q=q, model=model
+        ))
+
+    return outputs
+
+
+def run_batch(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, greeks=(),
+              input_format=None, output_format=None, progress=sys.stderr, workers=1,
+              model='black-scholes'):
+    """
+    Stream an input file through the pricer into an output file.
+
+    Only one chunk is held in memory at a time, so memory use does not grow
+    with the file size. Input columns are passed through and the priced
+    columns appended; input columns named like a priced column, left by an
+    earlier run, are dropped rather than passed through stale.
+
+    Args:
+        input_path (str): CSV or Parquet input file
+        output_path (str): CSV or Parquet output file
+        chunk_size (int): Rows per chunk
+        greeks (iterable of str): Greeks to add (subset of GREEK_NAMES)
+        input_format (str): 'csv' or 'parquet' (default: from the extension)
+        output_format (str): 'csv' or 'parquet' (default: from the extension)
+        progress (file): Stream for rows/sec progress lines, or None
+        workers (int): Worker processes for pricing; 1 prices in-process
+        model (str): One of MODELS
+
+    Returns:
+        int: Number of rows priced
+
+    Raises:
+        ValueError: For an unknown Greek or model, before the output file
+            is opened
+    """
+    # Checked up front: opening the writer truncates an existing output
+    greeks = tuple(greeks)
+    unknown = set(greeks) - set(GREEK_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown Greeks requested: {sorted(unknown)}")
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}; expected one of {MODELS}")
+
+    if _file_format(input_path, input_format) == 'parquet':
+        chunks = iter_parquet_chunks(input_path, chunk_size)
+    else:
+        chunks = iter_csv_chunks(input_path, chunk_size)
+
+    if _file_format(output_path, output_format) == 'parquet':
+        writer = ParquetChunkWriter(output_path)
+    else:
+        writer = CsvChunkWriter(output_path)
+
+    pricer = None
+    if workers != 1:
+        from utils.parallel import ParallelPricer
+        pricer = ParallelPricer(workers)
+        # Split each chunk evenly across the pool
+        pricer.chunk_size = -(-chunk_size // pricer.workers)
+
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for columns in chunks:
+            for name in OUTPUT_COLUMNS:
+                columns.pop(name, None)
+            columns.update(price_chunk(columns, greeks, pricer, model))
+            writer.write(columns)
+            rows += len(columns['call_price'])
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress.write(f"{rows:,} rows priced, {rows / elapsed:,.0f} rows/sec\n")
+                progress.flush()
+    finally:
+        writer.close()
+        if pricer is not None:
+            pricer.close()
+
+    return rows
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Batch Black-Scholes pricing")
+    parser.add_argument('input', help="Input CSV or Parquet file")
+    parser.add_argument('output', help="Output CSV or Parquet file")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows per chunk (default: %(default)s)")
+    parser.add_argument('--greeks', default='',
+                        help=f"Comma-separated Greeks to add, or 'all' ({', '.join(GREEK_NAMES)})")
+    parser.add_argument('--input-format', choices=('csv', 'parquet'))
+    parser.add_argument('--output-format', choices=('csv', 'parquet'))
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for pricing; 0 uses every core (default: 1)")
+    parser.add_argument('--model', choices=MODELS, default='black-scholes',
+                        help="Pricing model; black-76 reads spot as a futures price "
+                             "(default: %(default)s)")
+    parser.add_argument('--quiet', action='store_true', help="Suppress progress output")
+    args = parser.parse_args(argv)
+
+    if args.greeks == 'all':
+        greeks = GREEK_NAMES
+    else:
+        greeks = tuple(name.strip() for name in args.greeks.split(',') if name.strip())
+
+    try:
+        rows = run_batch(
+            args.input, args.output, args.chunk_size, greeks,
+            args.input_format, args.output_format,
+            progress=None if args.quiet else sys.stderr,
+            workers=args.workers or None,
+            model=args.model
+        )
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    if not args.quiet:
+        print(f"Done: {rows:,} rows written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
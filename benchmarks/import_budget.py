@@ -0,0 +1,116 @@
+"""
+Import-Time Budget Check
+Measures the cold import time of the library modules with `python -X importtime`
+and verifies they do not pull in UI, plotting or scipy dependencies
+
+Usage:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --scale 2.0
+
+tests/test_import_budget.py runs the same checks under pytest.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative cold import budget per module in milliseconds; numpy alone
+# accounts for roughly 100ms of each
+MODULE_BUDGETS_MS = {
+    'black_scholes': 200,
+    'implied_volatility': 200,
+    'database': 200,
+    'utils.calculations': 200,
+    'utils.cache': 200,
+    'utils.heatmap': 200,
+    'batch_pricing': 250,
+}
+
+# Default for --scale and for the pytest check; slow CI machines raise it,
+# and 0 skips the timing check there, keeping the deferred-module check
+SCALE_ENV_VAR = 'OPTIONS_IMPORT_BUDGET_SCALE'
+
+# Packages that must only load on first use, never at import time
+DEFERRED_MODULES = ('scipy', 'plotly', 'streamlit', 'pandas', 'pyarrow')
+
+_PROBE = (
+    "import sys, json; import {module}; "
+    "print(json.dumps(sorted(m for m in {deferred!r} if m in sys.modules)))"
+)
+
+
+def measure_import(module, runs=5):
+    """
+    Import module in fresh interpreters and report the fastest run.
+
+    Args:
+        module (str): Dotted module name, importable from the repo root
+        runs (int): Number of interpreters to start
+
+    Returns:
+        tuple: (milliseconds, deferred modules that were loaded, slowest
+            self-time imports of the fastest run as (name, milliseconds))
+    """
+    best = None
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             _PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+        entries = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            entries.append((name.strip(), name, int(self_us), int(cumulative_us)))
+        total_us = next(
+            cumulative for stripped, name, _, cumulative in entries
+            if stripped == module and name.startswith(' ' + module)
+        )
+        if best is None or total_us < best[0]:
+            slowest = sorted(entries, key=lambda entry: entry[2], reverse=True)[:5]
+            best = (
+                total_us,
+                json.loads(completed.stdout),
+                [(stripped, self_us / 1e3) for stripped, _, self_us, _ in slowest]
+            )
+    return best[0] / 1e3, best[1], best[2]
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Check library import times against a budget")
+    parser.add_argument('--runs', type=int, default=5,
+                        help="Fresh interpreters per module (default: %(default)s)")
+    parser.add_argument('--scale', type=float, default=float(os.environ.get(SCALE_ENV_VAR, 1.0)),
+                        help="Multiply every budget, e.g. for slow machines (default: "
+                             f"${SCALE_ENV_VAR} or 1.0, currently %(default)s)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    print(f"{'module':<22}{'import':>12}{'budget':>12}  deferred modules loaded")
+    for module, budget in MODULE_BUDGETS_MS.items():
+        budget *= args.scale
+        milliseconds, loaded, slowest = measure_import(module, args.runs)
+        ok = milliseconds <= budget and not loaded
+        print(f"{module:<22}{milliseconds:>10.1f}ms{budget:>10.1f}ms  "
+              f"{', '.join(loaded) or '-'}{'' if ok else '  FAIL'}")
+        if not ok:
+            failures += 1
+            for name, self_ms in slowest:
+                print(f"    {name:<40}{self_ms:>8.1f}ms self")
+
+    if failures:
+        print(f"{failures} module(s) over budget or importing deferred dependencies")
+        return 1
+    print("All modules within their import budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
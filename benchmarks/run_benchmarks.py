@@ -0,0 +1,263 @@
+"""
+Benchmark Suite
+Times pricing, grid generation, database saves and loads and heatmap rendering,
+and compares the results against a stored baseline
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from black_scholes import calculate_call_price, calculate_put_price  # noqa: E402
+from database import (  # noqa: E402
+    STORAGE_MODES, init_database, load_calculation, save_calculation
+)
+from surface_index import build_surface_index  # noqa: E402
+from utils.calculations import calculate_pnl_grids, calculate_pricing_grid  # noqa: E402
+from utils.scenario_cube import build_scenario_cube  # noqa: E402
+
+GRID_SIZES = (10, 100, 1000)
+SAVE_GRID_SIZES = (10, 100, 300)
+HEATMAP_GRID_SIZES = (10, 100)
+LATTICE_GRID_SIZES = (10, 50)
+
+# Nodes of the American surface index queried in place of the lattice
+SURFACE_INDEX_SHAPE = (201, 101)
+
+# Scenario cube benchmarks: a square spot x volatility grid at every
+# (maturity, rate) shock
+SCENARIO_CUBE_GRID_SIZE = 200
+SCENARIO_CUBE_SHOCKS = (20, 10)
+
+
+def _grid_inputs(size):
+    """Spot and volatility axes of a size x size grid around the default inputs"""
+    return np.linspace(80.0, 120.0, size), np.linspace(0.04, 0.30, size)
+
+
+def time_callable(func, min_time=0.2, max_samples=200, warmup=1):
+    """
+    Time repeated calls of func.
+
+    Args:
+        func (callable): Zero-argument function to time
+        min_time (float): Keep sampling until this many seconds have elapsed
+        max_samples (int): Upper bound on the number of samples
+        warmup (int): Untimed calls made first
+
+    Returns:
+        dict: samples, ops_per_sec, mean/p50/p90/p99/min latency in seconds
+    """
+    for _ in range(warmup):
+        func()
+
+    # Batch fast functions so each sample is well above timer resolution
+    start = time.perf_counter()
+    func()
+    single = time.perf_counter() - start
+    number = max(1, int(1e-3 / single)) if single > 0 else 1000
+
+    samples = []
+    elapsed = 0.0
+    while len(samples) < max_samples and (elapsed < min_time or len(samples) < 5):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        duration = time.perf_counter() - start
+        samples.append(duration / number)
+        elapsed += duration
+
+    latencies = np.array(samples)
+    return {
+        'samples': len(samples),
+        'calls_per_sample': number,
+        'ops_per_sec': 1.0 / latencies.mean(),
+        'mean': latencies.mean(),
+        'p50': np.percentile(latencies, 50),
+        'p90': np.percentile(latencies, 90),
+        'p99': np.percentile(latencies, 99),
+        'min': latencies.min(),
+    }
+
+
+def build_benchmarks():
+    """
+    Returns:
+        list: (name, callable, cleanup or None) for every benchmark
+    """
+    benchmarks = [
+        ('scalar_call_price', lambda: calculate_call_price(100.0, 100.0, 1.0, 0.05, 0.2), None),
+        ('scalar_put_price', lambda: calculate_put_price(100.0, 100.0, 1.0, 0.05, 0.2), None),
+    ]
+
+    for size in GRID_SIZES:
+        spot_prices, volatilities = _grid_inputs(size)
+        benchmarks.append((
+            f'pnl_grids_{size}x{size}',
+            lambda s=spot_prices, v=volatilities: calculate_pnl_grids(s, v, 100.0, 1.0, 0.05, 10.0),
+            None
+        ))
+
+    for size in LATTICE_GRID_SIZES:
+        spot_prices, volatilities = _grid_inputs(size)
+        benchmarks.append((
+            f'american_grid_{size}x{size}',
+            lambda s=spot_prices, v=volatilities: calculate_pricing_grid(
+                s, v, 100.0, 1.0, 0.05, 10.0, exercise='american'
+            ),
+            None
+        ))
+
+    # The same American grids answered from a prebuilt surface index
+    directory = tempfile.mkdtemp(prefix='bench_index_')
+    index = build_surface_index(os.path.join(directory, 'american.npy'), 'american', T=1.0,
+                                r=0.05, shape=SURFACE_INDEX_SHAPE)
+    for size in LATTICE_GRID_SIZES:
+        spot_prices, volatilities = _grid_inputs(size)
+        benchmarks.append((
+            f'surface_index_{size}x{size}',
+            lambda s=spot_prices[:, None], v=volatilities[None, :]: index.prices(s, 100.0, 1.0, 0.05, v),
+            (lambda d=directory: shutil.rmtree(d)) if size == LATTICE_GRID_SIZES[-1] else None
+        ))
+
+    # Heatmap slices read back from a scenario cube on disk
+    directory = tempfile.mkdtemp(prefix='bench_cube_')
+    n_maturity, n_rate = SCENARIO_CUBE_SHOCKS
+    cube = build_scenario_cube(
+        *_grid_inputs(SCENARIO_CUBE_GRID_SIZE), np.linspace(0.1, 2.0, n_maturity),
+        np.linspace(0.0, 0.1, n_rate), 100.0, directory=directory
+    )
+    benchmarks.append((
+        'cube_slice_spot_x_vol',
+        lambda: cube.slice('call', maturity=1.0, rate=0.05),
+        None
+    ))
+    benchmarks.append((
+        'cube_slice_spot_x_maturity',
+        lambda: cube.slice('call', columns='maturity', volatility=0.2, rate=0.05),
+        lambda d=directory: shutil.rmtree(d)
+    ))
+
+    input_params = {
+        'StockPrice': 100.0, 'StrikePrice': 100.0, 'InterestRate': 0.05,
+        'Volatility': 0.2, 'TimeToMaturity': 1.0
+    }
+    for storage in STORAGE_MODES:
+        for size in SAVE_GRID_SIZES:
+            directory = tempfile.mkdtemp(prefix='bench_db_')
+            conn = init_database(os.path.join(directory, 'bench.db'))
+            result = calculate_pricing_grid(*_grid_inputs(size), 100.0, 1.0, 0.05, 10.0)
+            calculation_id = save_calculation(conn, input_params, result, storage)
+            benchmarks.append((
+                f'save_{storage}_{size}x{size}',
+                lambda c=conn, r=result, s=storage: save_calculation(c, input_params, r, s),
+                None
+            ))
+            benchmarks.append((
+                f'load_{storage}_{size}x{size}',
+                lambda c=conn, i=calculation_id: load_calculation(c, i),
+                lambda c=conn, d=directory: (c.close(), shutil.rmtree(d))
+            ))
+
+    # Plotly is only needed for the rendering benchmarks
+    from utils.heatmap import create_heatmap_figure
+
+    for size in HEATMAP_GRID_SIZES:
+        spot_prices, volatilities = _grid_inputs(size)
+        call_pnl, _ = calculate_pnl_grids(spot_prices, volatilities, 100.0, 1.0, 0.05, 10.0)
+        benchmarks.append((
+            f'heatmap_figure_{size}x{size}',
+            lambda g=call_pnl, s=spot_prices, v=volatilities: create_heatmap_figure(g, s, v),
+            None
+        ))
+
+    return benchmarks
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Compare mean latencies against a baseline.
+
+    Args:
+        results (dict): Benchmark name to timing dict
+        baseline (dict): Benchmark name to timing dict from an earlier run
+        threshold (float): Allowed fractional slowdown, e.g. 0.25 for 25%
+
+    Returns:
+        list: (name, baseline_mean, mean, ratio) for every regression
+    """
+    regressions = []
+    for name, timing in results.items():
+        if name not in baseline:
+            continue
+        ratio = timing['mean'] / baseline[name]['mean']
+        if ratio > 1.0 + threshold:
+            regressions.append((name, baseline[name]['mean'], timing['mean'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed slowdown vs the baseline (default: %(default)s)")
+    parser.add_argument('--filter', default='', help="Only run benchmarks containing this text")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="Seconds to sample each benchmark (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'benchmark':<28}{'ops/sec':>14}{'p50':>12}{'p90':>12}{'p99':>12}")
+    for name, func, cleanup in build_benchmarks():
+        if args.filter in name:
+            timing = time_callable(func, min_time=args.min_time)
+            results[name] = timing
+            print(f"{name:<28}{timing['ops_per_sec']:>14,.1f}"
+                  f"{timing['p50'] * 1e3:>10.3f}ms{timing['p90'] * 1e3:>10.3f}ms"
+                  f"{timing['p99'] * 1e3:>10.3f}ms")
+        if cleanup is not None:
+            cleanup()
+
+    if args.output:
+        report = {
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1e3:.3f}ms -> {after * 1e3:.3f}ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} of baseline")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
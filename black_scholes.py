@@ -1,55 +1,419 @@
 """
 Black-Scholes Option Pricing Model
-Implements the Black-Scholes formula for European call and put options
+Implements the Black-Scholes formula for European call and put options, with
+a continuous dividend yield and the Black-76 variant for futures options
 """
 
 import numpy as np
-from scipy.stats import norm
 
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
 
-def calculate_call_price(S, K, T, r, sigma):
+# Pricing models: 'black-scholes' prices options on a spot price paying a
+# continuous yield q; 'black-76' prices options on a futures or forward
+# price, which is the same formula with the yield equal to the rate (the
+# futures price has no drift)
+MODELS = ('black-scholes', 'black-76')
+
+# scipy.special.ndtr, imported on first use: scipy.special costs more to
+# import than numpy itself, and importing this module should stay cheap
+_ndtr = None
+
+# Normal CDF precisions: 'double' is scipy's ndtr, correct to ~1e-16;
+# 'fast' is the Abramowitz-Stegun 26.2.17 rational approximation in NumPy
+# alone, with absolute error below FAST_CDF_MAX_ERROR. 'fast' never imports
+# scipy (about 0.4s cold), so short-lived processes price their first
+# contracts sooner; on large warm arrays ndtr is the quicker of the two
+CDF_PRECISIONS = ('double', 'fast')
+FAST_CDF_MAX_ERROR = 7.5e-8
+
+_AS_P = 0.2316419
+_AS_COEFFICIENTS = (1.330274429, -1.821255978, 1.781477937, -0.356563782, 0.319381530)
+
+
+def _fast_norm_cdf(x):
+    """Abramowitz-Stegun 26.2.17: N(x) for x >= 0, mirrored for x < 0"""
+    x = np.asarray(x, dtype=np.float64)
+    a = np.abs(x)
+    t = 1.0 / (1.0 + _AS_P * a)
+    poly = 0.0
+    for coefficient in _AS_COEFFICIENTS:
+        poly = (poly + coefficient) * t
+    tail = norm_pdf(a) * poly
+    return np.where(x >= 0, 1.0 - tail, tail)
+
+
+def norm_cdf(x, precision='double'):
+    """
+    Standard normal CDF
+
+    Calls the scipy.special.ndtr ufunc directly, avoiding the argument
+    checking and distribution machinery of scipy.stats.norm.cdf. scipy is
+    imported on the first call rather than with this module. Pass
+    precision='fast' for the scipy-free approximation (absolute error
+    below FAST_CDF_MAX_ERROR); the implied volatility solver always uses
+    'double'.
+
+    Parameters:
+    x (float or array): Evaluation points
+    precision (str): One of CDF_PRECISIONS
+
+    Returns:
+    np.ndarray: N(x)
+    """
+    global _ndtr
+    if precision == 'fast':
+        return _fast_norm_cdf(x)
+    if precision != 'double':
+        raise ValueError(f"Unknown CDF precision {precision!r}; expected one of {CDF_PRECISIONS}")
+    if _ndtr is None:
+        from scipy.special import ndtr
+        _ndtr = ndtr
+    return _ndtr(x)
+
+
+def norm_pdf(x):
+    """
+    Standard normal PDF
+
+    Parameters:
+    x (float or array): Evaluation points
+
+    Returns:
+    np.ndarray: n(x) = exp(-x^2 / 2) / sqrt(2 * pi)
+    """
+    return np.exp(-0.5 * np.square(x)) * _INV_SQRT_2PI
+
+
+def _broadcast_inputs(*values):
+    """
+    Convert inputs to float arrays broadcast against each other
+
+    Parameters:
+    *values: Scalars or array-likes
+
+    Returns:
+    list: Broadcast float64 arrays (0-d when every input is a scalar)
+    """
+    return np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in values])
+
+
+def _carry_yield(r, q, model):
+    """
+    Yield q to price with under the given model
+
+    Black-76 ignores q and uses the rate itself, so F * e^(-r*T) replaces
+    S * e^(-q*T) throughout.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown pricing model {model!r}; expected one of {MODELS}")
+    return r if model == 'black-76' else q
+
+
+def _d1_d2(S, K, T, r, sigma, q=0.0):
+    """
+    Calculate the Black-Scholes d1 and d2 terms
+
+    Inputs must already be arrays with T > 0 and sigma > 0 everywhere.
+
+    Returns:
+    tuple: (d1, d2)
+    """
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    return d1, d2
+
+
+def black_scholes_prices(S, K, T, r, sigma, q=0.0, model='black-scholes', precision='double'):
+    """
+    Calculate Black-Scholes call and put prices for arrays of contracts
+
+    All inputs broadcast against each other, so a grid can be priced by
+    passing e.g. S[:, None] and sigma[None, :]. Call and put share a single
+    d1/d2 and CDF evaluation. Contracts at expiry (T <= 0) or with zero
+    volatility (sigma <= 0) are valued at intrinsic value for the call, and
+    the put follows from put-call parity, matching the scalar functions.
+
+    Parameters:
+    S (float or array): Current stock/asset price (futures price for Black-76)
+    K (float or array): Strike price
+    T (float or array): Time to maturity (in years)
+    r (float or array): Risk-free interest rate (annualized)
+    sigma (float or array): Volatility (annualized)
+    q (float or array): Continuous dividend yield (annualized)
+    model (str): One of MODELS; 'black-76' ignores q
+    precision (str): One of CDF_PRECISIONS; with 'fast' prices are within
+        about FAST_CDF_MAX_ERROR * (S + K) of the 'double' ones
+
+    Returns:
+    tuple: (call_prices, put_prices) as numpy arrays of the broadcast shape
+    """
+    q = _carry_yield(r, q, model)
+    S, K, T, r, sigma, q = _broadcast_inputs(S, K, T, r, sigma, q)
+
+    live = (T > 0) & (sigma > 0)
+    # Substitute harmless values in degenerate cells so the closed form
+    # never divides by zero; those cells are overwritten below anyway
+    T_live = np.where(live, T, 1.0)
+    sigma_live = np.where(live, sigma, 1.0)
+
+    d1, d2 = _d1_d2(S, K, T_live, r, sigma_live, q)
+    discounted_strike = K * np.exp(-r * T)
+    discounted_spot = S * np.exp(-q * T)
+
+    call_prices = (discounted_spot * norm_cdf(d1, precision)
+                   - discounted_strike * norm_cdf(d2, precision))
+    call_prices = np.where(live, call_prices, S - K)
+    call_prices = np.maximum(call_prices, 0.0)  # Ensure non-negative
+
+    # Put-call parity: P = C - S * e^(-q*T) + K * e^(-r*T)
+    put_prices = np.maximum(call_prices - discounted_spot + discounted_strike, 0.0)
+
+    return call_prices, put_prices
+
+
+def calculate_option_prices(S, K, T, r, sigma, is_call=True, q=0.0, model='black-scholes'):
+    """
+    Calculate Black-Scholes prices for a mixed array of calls and puts
+
+    Parameters:
+    S (float or array): Current stock/asset price
+    K (float or array): Strike price
+    T (float or array): Time to maturity (in years)
+    r (float or array): Risk-free interest rate (annualized)
+    sigma (float or array): Volatility (annualized)
+    is_call (bool or array): True for calls, False for puts
+    q (float or array): Continuous dividend yield (annualized)
+    model (str): One of MODELS
+
+    Returns:
+    np.ndarray: Option prices of the broadcast shape
+    """
+    call_prices, put_prices = black_scholes_prices(S, K, T, r, sigma, q, model)
+    return np.where(is_call, call_prices, put_prices)
+
+
+def _grid_column_terms(volatilities, T, r, q=0.0):
+    """
+    Precompute the volatility-only terms of a spot x volatility grid
+
+    Parameters:
+    volatilities (np.ndarray): 1-D volatility axis
+    T (float): Time to maturity (in years)
+    r (float): Risk-free interest rate (annualized)
+    q (float): Continuous dividend yield, already resolved for the model
+
+    Returns:
+    tuple: (live, sigma_sqrt_T, drift) per column, where live marks columns
+        priced by the closed form and drift is (r - q + 0.5 * sigma^2) * T
+    """
+    live = (volatilities > 0) & (T > 0)
+    T_live = T if T > 0 else 1.0
+    sigma_live = np.where(live, volatilities, 1.0)
+    sigma_sqrt_T = sigma_live * np.sqrt(T_live)
+    drift = (r - q + 0.5 * sigma_live ** 2) * T_live
+    return live, sigma_sqrt_T, drift
+
+
+def _grid_prices_from_terms(spot_prices, K, T, r, column_terms, q=0.0):
+    """
+    Price a spot x volatility grid from precomputed column terms
+
+    Parameters:
+    spot_prices (np.ndarray): 1-D spot axis (grid rows)
+    K (float): Strike price
+    T (float): Time to maturity (in years)
+    r (float): Risk-free interest rate (annualized)
+    column_terms (tuple): Output of _grid_column_terms for the same q
+    q (float): Continuous dividend yield, already resolved for the model
+
+    Returns:
+    tuple: (call_prices, put_prices) of shape (n_spot, n_vol)
+    """
+    live, sigma_sqrt_T, drift = column_terms
+    S = spot_prices[:, np.newaxis]
+
+    # log(S/K) depends only on the row, the remaining terms only on the column
+    d1 = (np.log(S / K) + drift) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    discounted_strike = K * np.exp(-r * T)
+    discounted_spot = S * np.exp(-q * T)
+
+    call_prices = discounted_spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+    call_prices = np.where(live, call_prices, S - K)
+    call_prices = np.maximum(call_prices, 0.0)  # Ensure non-negative
+
+    # Put-call parity: P = C - S * e^(-q*T) + K * e^(-r*T)
+    put_prices = np.maximum(call_prices - discounted_spot + discounted_strike, 0.0)
+
+    return call_prices, put_prices
+
+
+def black_scholes_grid_prices(spot_prices, volatilities, K, T, r, q=0.0,
+                              model='black-scholes'):
+    """
+    Calculate call and put prices over a spot x volatility grid
+
+    Equivalent to black_scholes_prices(spot_prices[:, None], K, T, r,
+    volatilities[None, :], q, model) for scalar K, T, r and q, but the
+    volatility-only terms (sigma * sqrt(T) and the drift) are computed once
+    per column and log(S/K) once per row instead of once per cell.
+
+    Parameters:
+    spot_prices (array): 1-D spot price axis (grid rows)
+    volatilities (array): 1-D volatility axis (grid columns)
+    K (float): Strike price
+    T (float): Time to maturity (in years)
+    r (float): Risk-free interest rate (annualized)
+    q (float): Continuous dividend yield (annualized)
+    model (str): One of MODELS
+
+    Returns:
+    tuple: (call_prices, put_prices) of shape (n_spot, n_vol)
+    """
+    q = _carry_yield(r, q, model)
+    spot_prices = np.asarray(spot_prices, dtype=np.float64)
+    volatilities = np.asarray(volatilities, dtype=np.float64)
+    column_terms = _grid_column_terms(volatilities, T, r, q)
+    return _grid_prices_from_terms(spot_prices, K, T, r, column_terms, q)
+
+
+GREEK_NAMES = ('delta', 'gamma', 'vega', 'theta', 'rho', 'vanna', 'volga', 'charm')
+
+
+def calculate_greeks(S, K, T, r, sigma, is_call=True, greeks=None, q=0.0,
+                     model='black-scholes'):
+    """
+    Calculate analytic Black-Scholes Greeks for arrays of contracts
+
+    Every requested Greek is computed in one vectorized pass that reuses the
+    shared d1, d2, pdf(d1) and discount factor, and terms that no requested
+    Greek needs are skipped. Inputs broadcast like black_scholes_prices.
+    Units are per 1.0 change in the input: vega and volga per unit of
+    volatility, rho per unit of rate, theta and charm per year of calendar
+    time. Expired or zero-volatility contracts get their intrinsic delta and
+    zero for every other Greek. Under Black-76 delta, gamma and vanna are
+    with respect to the futures price, and rho holds the futures price fixed.
+
+    Parameters:
+    S (float or array): Current stock/asset price
+    K (float or array): Strike price
+    T (float or array): Time to maturity (in years)
+    r (float or array): Risk-free interest rate (annualized)
+    sigma (float or array): Volatility (annualized)
+    is_call (bool or array): True for calls, False for puts
+    greeks (iterable of str): Subset of GREEK_NAMES to compute (default all)
+    q (float or array): Continuous dividend yield (annualized)
+    model (str): One of MODELS
+
+    Returns:
+    dict: Mapping of Greek name to numpy array of the broadcast shape
+    """
+    requested = GREEK_NAMES if greeks is None else tuple(greeks)
+    unknown = set(requested) - set(GREEK_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown Greeks requested: {sorted(unknown)}")
+
+    black_76 = model == 'black-76'
+    q = _carry_yield(r, q, model)
+    S, K, T, r, sigma, is_call, q = _broadcast_inputs(S, K, T, r, sigma, is_call, q)
+    is_call = is_call.astype(bool)
+
+    live = (T > 0) & (sigma > 0)
+    T_live = np.where(live, T, 1.0)
+    sigma_live = np.where(live, sigma, 1.0)
+
+    sqrt_T = np.sqrt(T_live)
+    sigma_sqrt_T = sigma_live * sqrt_T
+    d1, d2 = _d1_d2(S, K, T_live, r, sigma_live, q)
+    # e^(-q*T) scales every Greek taken with respect to the underlying
+    yield_discount = np.exp(-q * T_live)
+
+    needs_pdf = set(requested) & {'gamma', 'vega', 'theta', 'vanna', 'volga', 'charm'}
+    pdf_d1 = yield_discount * norm_pdf(d1) if needs_pdf else None
+    if set(requested) & {'delta', 'theta', 'rho', 'charm'}:
+        # N(d1) for calls, -N(-d1) for puts
+        signed_cdf_d1 = norm_cdf(d1) - np.where(is_call, 0.0, 1.0)
+    if set(requested) & {'theta', 'rho'}:
+        discounted_strike = K * np.exp(-r * T_live)
+        # N(d2) for calls, -N(-d2) for puts
+        signed_cdf_d2 = np.where(is_call, norm_cdf(d2), -norm_cdf(-d2))
+
+    results = {}
+    for name in requested:
+        if name == 'delta':
+            value = yield_discount * signed_cdf_d1
+            intrinsic = np.where(is_call, 1.0 * (S > K), 0.0 - (S < K))
+            results[name] = np.where(live, value, intrinsic)
+            continue
+        if name == 'gamma':
+            value = pdf_d1 / (S * sigma_sqrt_T)
+        elif name == 'vega':
+            value = S * pdf_d1 * sqrt_T
+        elif name == 'theta':
+            value = (-S * pdf_d1 * sigma_live / (2 * sqrt_T)
+                     - r * discounted_strike * signed_cdf_d2
+                     + q * S * yield_discount * signed_cdf_d1)
+        elif name == 'rho':
+            if black_76:
+                # Only the discount factor depends on r: rho = -T * price
+                price = S * yield_discount * signed_cdf_d1 - discounted_strike * signed_cdf_d2
+                value = -T_live * price
+            else:
+                value = T_live * discounted_strike * signed_cdf_d2
+        elif name == 'vanna':
+            value = -pdf_d1 * d2 / sigma_live
+        elif name == 'volga':
+            value = S * pdf_d1 * sqrt_T * d1 * d2 / sigma_live
+        else:  # charm
+            value = (q * yield_discount * signed_cdf_d1
+                     - pdf_d1 * (2 * (r - q) * T_live - d2 * sigma_sqrt_T)
+                     / (2 * T_live * sigma_sqrt_T))
+        results[name] = np.where(live, value, 0.0)
+
+    return results
+
+
+def _to_output(values):
+    """Return a Python float for 0-d results and the array otherwise"""
+    return float(values) if np.ndim(values) == 0 else values
+
+
+def calculate_call_price(S, K, T, r, sigma, q=0.0, model='black-scholes'):
     """
     Calculate Black-Scholes call option price
-    
+
     Parameters:
     S (float): Current stock/asset price
     K (float): Strike price
     T (float): Time to maturity (in years)
     r (float): Risk-free interest rate (annualized)
     sigma (float): Volatility (annualized)
-    
+    q (float): Continuous dividend yield (annualized)
+    model (str): One of MODELS
+
     Returns:
     float: Call option price
     """
-    if T <= 0 or sigma <= 0:
-        return max(S - K, 0)
-    
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    
-    call_price = S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
-    
-    return max(call_price, 0)  # Ensure non-negative
+    call_price, _ = black_scholes_prices(S, K, T, r, sigma, q, model)
+    return _to_output(call_price)
 
 
-def calculate_put_price(S, K, T, r, sigma):
+def calculate_put_price(S, K, T, r, sigma, q=0.0, model='black-scholes'):
     """
     Calculate Black-Scholes put option price using put-call parity
-    
+
     Parameters:
     S (float): Current stock/asset price
     K (float): Strike price
     T (float): Time to maturity (in years)
     r (float): Risk-free interest rate (annualized)
     sigma (float): Volatility (annualized)
-    
+    q (float): Continuous dividend yield (annualized)
+    model (str): One of MODELS
+
     Returns:
     float: Put option price
     """
-    call_price = calculate_call_price(S, K, T, r, sigma)
-    
-    # Put-call parity: P = C - S + K * e^(-r*T)
-    put_price = call_price - S + K * np.exp(-r * T)
-    
-    return max(put_price, 0)  # Ensure non-negative
-
+    _, put_price = black_scholes_prices(S, K, T, r, sigma, q, model)
+    return _to_output(put_price)
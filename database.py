@@ -5,21 +5,122 @@ Handles SQLite database creation and data storage
 
 import sqlite3
 import os
+import zlib
+from itertools import repeat
 
+import numpy as np
+from utils.calculations import PricingResult
 
-def init_database(db_path='options.db'):
+# Database schema version, stored in PRAGMA user_version:
+#   0/1 - BlackScholesInput and row-per-cell BlackScholesOutput only
+#   2   - adds BlackScholesSurface, one row of binary grid blobs per calculation
+#   3   - adds BlackScholesInput.ExerciseStyle
+#   4   - adds BlackScholesInput.DividendYield and BlackScholesInput.Model
+SCHEMA_VERSION = 4
+
+# Layout version of the blobs in BlackScholesSurface
+SURFACE_FORMAT_VERSION = 1
+
+# 'rows' writes one BlackScholesOutput row per grid cell; 'blob' writes the
+# whole grid as binary arrays into BlackScholesSurface
+STORAGE_MODES = ('rows', 'blob')
+
+# Blob compression: None stores raw array bytes, readable zero-copy with
+# np.frombuffer; 'zlib' trades CPU time for a smaller file
+COMPRESSIONS = (None, 'zlib')
+
+
+# Connection PRAGMAs applied by init_database; override per key via `pragmas`
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,  # Negative values are KiB, i.e. ~20 MB of page cache
+}
+
+# BlackScholesInput parameter columns, in table order
+INPUT_COLUMNS = ('StockPrice', 'StrikePrice', 'InterestRate', 'Volatility', 'TimeToMaturity')
+
+# Columns added to BlackScholesInput after the first schema, in table order,
+# as (SQL type, value assumed for calculations saved before they existed)
+ADDED_INPUT_COLUMNS = {
+    'ExerciseStyle': ('TEXT', 'european'),
+    'DividendYield': ('REAL', 0.0),
+    'Model': ('TEXT', 'black-scholes'),
+}
+
+# Every input column, as selected by the read functions
+_INPUT_NAMES = INPUT_COLUMNS + tuple(ADDED_INPUT_COLUMNS)
+_INPUT_SELECT = ', '.join(_INPUT_NAMES)
+
+# Parameters compared by find_nearest_calculations, matching the column
+# order of idx_input_parameters
+NEAREST_COLUMNS = ('StockPrice', 'StrikePrice', 'Volatility', 'TimeToMaturity')
+
+# Statement texts are kept constant so sqlite3's statement cache reuses the
+# compiled (prepared) statement across calls
+INSERT_INPUT_SQL = '''
+    INSERT INTO BlackScholesInput 
+    (StockPrice, StrikePrice, InterestRate, Volatility, TimeToMaturity, ExerciseStyle,
+     DividendYield, Model)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_OUTPUT_SQL = '''
+    INSERT INTO BlackScholesOutput 
+    (VolatilityShock, StockPriceShock, OptionPrice, IsCall, CalculationID)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+INSERT_SURFACE_SQL = '''
+    INSERT INTO BlackScholesSurface 
+    (CalculationID, FormatVersion, DType, Compression, SpotCount, VolatilityCount,
+     SpotPrices, Volatilities, CallPrices, PutPrices)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def connect(db_path='options.db', pragmas=None, cached_statements=128):
     """
-    Initialize SQLite database and create tables if they don't exist
+    Open a connection with foreign keys enabled and PRAGMAs applied,
+    without touching the schema
     
     Parameters:
     db_path (str): Path to the database file
+    pragmas (dict): PRAGMA overrides merged over DEFAULT_PRAGMAS; a value of
+        None drops that PRAGMA
+    cached_statements (int): Size of sqlite3's prepared-statement cache
     
     Returns:
-    sqlite3.Connection: Database connection
+    sqlite3.Connection: Database connection, usable from any one thread at a time
     """
-    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn = sqlite3.connect(
+        db_path, check_same_thread=False, cached_statements=cached_statements
+    )
     # Enable foreign key constraints
     conn.execute("PRAGMA foreign_keys = ON")
+    
+    settings = dict(DEFAULT_PRAGMAS)
+    settings.update(pragmas or {})
+    for name, value in settings.items():
+        if value is not None:
+            conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def init_database(db_path='options.db', pragmas=None, cached_statements=128):
+    """
+    Initialize SQLite database and create tables if they don't exist
+    
+    Parameters:
+    db_path (str): Path to the database file
+    pragmas (dict): PRAGMA overrides merged over DEFAULT_PRAGMAS; a value of
+        None drops that PRAGMA
+    cached_statements (int): Size of sqlite3's prepared-statement cache
+    
+    Returns:
+    sqlite3.Connection: Database connection
+    """
+    conn = connect(db_path, pragmas, cached_statements)
     cursor = conn.cursor()
     
     # Create BlackScholesInput table
@@ -47,53 +148,407 @@ def init_database(db_path='options.db'):
         )
     ''')
     
+    # Index output rows by calculation so reading one back doesn't scan the table
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_output_calculation_id
+        ON BlackScholesOutput (CalculationID)
+    ''')
+    
+    # Index inputs for nearest-parameter searches, and for finding saved
+    # surfaces with the same grid-defining parameters
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_input_parameters
+        ON BlackScholesInput (StockPrice, StrikePrice, Volatility, TimeToMaturity)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_input_surface_lookup
+        ON BlackScholesInput (StrikePrice, TimeToMaturity, InterestRate)
+    ''')
+    
+    # Create BlackScholesSurface table (schema version 2)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS BlackScholesSurface (
+            CalculationID INTEGER PRIMARY KEY,
+            FormatVersion INTEGER,
+            DType TEXT,
+            Compression TEXT,
+            SpotCount INTEGER,
+            VolatilityCount INTEGER,
+            SpotPrices BLOB,
+            Volatilities BLOB,
+            CallPrices BLOB,
+            PutPrices BLOB,
+            FOREIGN KEY (CalculationID) REFERENCES BlackScholesInput(CalculationID)
+        )
+    ''')
+    
+    # Add input columns missing from older databases; existing rows take
+    # the column default
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(BlackScholesInput)")}
+    for name, (sql_type, default) in ADDED_INPUT_COLUMNS.items():
+        if name not in existing:
+            cursor.execute(
+                f"ALTER TABLE BlackScholesInput ADD COLUMN {name} {sql_type} NOT NULL "
+                f"DEFAULT {default!r}"
+            )
+    
+    # Older databases only gain new tables and columns; their rows stay as they are
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version < SCHEMA_VERSION:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
     conn.commit()
     return conn
 
 
-def save_calculation(conn, input_params, heatmap_data):
+def _output_rows(pricing_result, calculation_id):
     """
-    Save input parameters and heatmap data to database
+    Yield BlackScholesOutput rows column-wise from a priced grid
     
-    Parameters:
-    conn (sqlite3.Connection): Database connection
-    input_params (dict): Dictionary with keys: StockPrice, StrikePrice, InterestRate, Volatility, TimeToMaturity
-    heatmap_data (list): List of dictionaries with keys: VolatilityShock, StockPriceShock, OptionPrice, IsCall
+    Calls are emitted before puts, each in row-major (spot, volatility)
+    order, without building an intermediate per-cell structure.
+    """
+    n_spot, n_vol = pricing_result.shape
+    volatility_column = np.tile(pricing_result.volatilities, n_spot).tolist()
+    spot_column = np.repeat(pricing_result.spot_prices, n_vol).tolist()
     
-    Returns:
-    int: CalculationID of the saved calculation
+    for is_call, prices in ((1, pricing_result.call_prices), (0, pricing_result.put_prices)):
+        yield from zip(
+            volatility_column,
+            spot_column,
+            prices.ravel().tolist(),
+            repeat(is_call),
+            repeat(calculation_id)
+        )
+
+
+def _encode_array(values, dtype, compression):
+    """Serialize an array as little-endian bytes of dtype, optionally compressed"""
+    data = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<')).tobytes()
+    return zlib.compress(data, 1) if compression == 'zlib' else data
+
+
+def _decode_array(blob, dtype, shape, compression):
     """
-    cursor = conn.cursor()
+    Inverse of _encode_array
+    
+    Uncompressed blobs are wrapped with np.frombuffer without copying; the
+    result is then read-only.
+    """
+    if compression == 'zlib':
+        blob = zlib.decompress(blob)
+    return np.frombuffer(blob, dtype=dtype).reshape(shape)
+
+
+def _surface_row(pricing_result, calculation_id, dtype, compression):
+    """Build the BlackScholesSurface row for a priced grid"""
+    n_spot, n_vol = pricing_result.shape
+    return (
+        calculation_id,
+        SURFACE_FORMAT_VERSION,
+        np.dtype(dtype).newbyteorder('<').str,
+        compression or 'none',
+        n_spot,
+        n_vol,
+        _encode_array(pricing_result.spot_prices, np.float64, compression),
+        _encode_array(pricing_result.volatilities, np.float64, compression),
+        _encode_array(pricing_result.call_prices, dtype, compression),
+        _encode_array(pricing_result.put_prices, dtype, compression)
+    )
+
+
+def check_storage_options(storage, compression):
+    """Raise ValueError for an unknown storage mode or compression"""
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode {storage!r}; expected one of {STORAGE_MODES}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}; expected one of {COMPRESSIONS}")
+
+
+def insert_calculation(cursor, input_params, pricing_result, storage='rows',
+                       dtype=np.float64, compression=None):
+    """
+    Insert one calculation without committing
+    
+    Lets callers group several calculations into one transaction; see
+    save_calculation for the parameters.
     
+    Returns:
+    int: CalculationID of the inserted calculation
+    """
     # Insert input parameters
-    cursor.execute('''
-        INSERT INTO BlackScholesInput 
-        (StockPrice, StrikePrice, InterestRate, Volatility, TimeToMaturity)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (
+    cursor.execute(INSERT_INPUT_SQL, (
         input_params['StockPrice'],
         input_params['StrikePrice'],
         input_params['InterestRate'],
         input_params['Volatility'],
-        input_params['TimeToMaturity']
+        input_params['TimeToMaturity'],
+        *(input_params.get(name, default) for name, (_, default) in ADDED_INPUT_COLUMNS.items())
     ))
     
     calculation_id = cursor.lastrowid
     
     # Insert heatmap output data
-    for data_point in heatmap_data:
-        cursor.execute('''
-            INSERT INTO BlackScholesOutput 
-            (VolatilityShock, StockPriceShock, OptionPrice, IsCall, CalculationID)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            data_point['VolatilityShock'],
-            data_point['StockPriceShock'],
-            data_point['OptionPrice'],
-            1 if data_point['IsCall'] else 0,
-            calculation_id
-        ))
+    if storage == 'blob':
+        cursor.execute(
+            INSERT_SURFACE_SQL,
+            _surface_row(pricing_result, calculation_id, dtype, compression)
+        )
+    else:
+        cursor.executemany(INSERT_OUTPUT_SQL, _output_rows(pricing_result, calculation_id))
     
-    conn.commit()
     return calculation_id
 
+
+def save_calculation(conn, input_params, pricing_result, storage='rows',
+                     dtype=np.float64, compression=None):
+    """
+    Save input parameters and a priced grid to database
+    
+    Everything is written inside a single transaction, which is rolled back
+    if any insert fails. Prices are read straight from the grid arrays, so
+    nothing is repriced.
+    
+    Parameters:
+    conn (sqlite3.Connection): Database connection
+    input_params (dict): Dictionary with keys: StockPrice, StrikePrice, InterestRate, Volatility, TimeToMaturity,
+        and optionally the ADDED_INPUT_COLUMNS (ExerciseStyle, DividendYield, Model),
+        which take their defaults when absent
+    pricing_result (PricingResult): Grid from utils.calculations.calculate_pricing_grid
+    storage (str): 'rows' for one BlackScholesOutput row per cell (with
+        executemany), 'blob' for a single BlackScholesSurface row
+    dtype (np.dtype): Price precision for 'blob' storage, float64 or float32
+    compression (str): None or 'zlib', for 'blob' storage
+    
+    Returns:
+    int: CalculationID of the saved calculation
+    """
+    check_storage_options(storage, compression)
+    with conn:
+        calculation_id = insert_calculation(
+            conn.cursor(), input_params, pricing_result, storage, dtype, compression
+        )
+    
+    return calculation_id
+
+
+def _grid_from_rows(rows):
+    """
+    Rebuild a PricingResult from BlackScholesOutput rows
+    
+    Rows hold (VolatilityShock, StockPriceShock, OptionPrice, IsCall) in
+    insertion order: calls then puts, each row-major over (spot, volatility).
+    The number of volatilities is where the spot price first changes; if it
+    never does, the grid is taken as square, as the app always saved.
+    """
+    values = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    calls = values[values[:, 3] == 1]
+    puts = values[values[:, 3] == 0]
+    n_cells = len(calls)
+    
+    spot_changes = np.flatnonzero(calls[:, 1] != calls[0, 1]) if n_cells else []
+    if len(spot_changes):
+        n_vol = int(spot_changes[0])
+    else:
+        side = int(round(np.sqrt(n_cells)))
+        n_vol = side if side * side == n_cells else n_cells
+    shape = (n_cells // max(n_vol, 1), n_vol)
+    
+    return PricingResult(
+        spot_prices=calls[::max(n_vol, 1), 1],
+        volatilities=calls[:n_vol, 0],
+        call_prices=calls[:, 2].reshape(shape),
+        put_prices=puts[:, 2].reshape(shape)
+    )
+
+
+def _grid_from_surface(row):
+    """Rebuild a PricingResult from a BlackScholesSurface row"""
+    (format_version, dtype, compression, n_spot, n_vol,
+     spot_blob, volatility_blob, call_blob, put_blob) = row
+    if format_version > SURFACE_FORMAT_VERSION:
+        raise ValueError(
+            f"Surface format version {format_version} is newer than the "
+            f"supported version {SURFACE_FORMAT_VERSION}"
+        )
+    compression = None if compression == 'none' else compression
+    return PricingResult(
+        spot_prices=_decode_array(spot_blob, '<f8', (n_spot,), compression),
+        volatilities=_decode_array(volatility_blob, '<f8', (n_vol,), compression),
+        call_prices=_decode_array(call_blob, dtype, (n_spot, n_vol), compression),
+        put_prices=_decode_array(put_blob, dtype, (n_spot, n_vol), compression)
+    )
+
+
+def load_calculation(conn, calculation_id):
+    """
+    Load a saved calculation, whichever storage mode it was written with
+    
+    Parameters:
+    conn (sqlite3.Connection): Database connection
+    calculation_id (int): CalculationID returned by save_calculation
+    
+    Returns:
+    tuple: (input_params dict, PricingResult); the PricingResult has a
+        purchase price of 0, and blob-backed arrays may be read-only
+    
+    Raises:
+    KeyError: If no calculation has that ID
+    """
+    input_row = conn.execute(f'''
+        SELECT {_INPUT_SELECT}
+        FROM BlackScholesInput WHERE CalculationID = ?
+    ''', (calculation_id,)).fetchone()
+    if input_row is None:
+        raise KeyError(f"No calculation with ID {calculation_id}")
+    input_params = dict(zip(_INPUT_NAMES, input_row))
+    
+    surface_row = conn.execute('''
+        SELECT FormatVersion, DType, Compression, SpotCount, VolatilityCount,
+               SpotPrices, Volatilities, CallPrices, PutPrices
+        FROM BlackScholesSurface WHERE CalculationID = ?
+    ''', (calculation_id,)).fetchone()
+    if surface_row is not None:
+        return input_params, _grid_from_surface(surface_row)
+    
+    rows = conn.execute('''
+        SELECT VolatilityShock, StockPriceShock, OptionPrice, IsCall
+        FROM BlackScholesOutput WHERE CalculationID = ?
+        ORDER BY CalculationOutputID
+    ''', (calculation_id,)).fetchall()
+    return input_params, _grid_from_rows(rows)
+
+
+def list_calculations(conn, limit=20, before_id=None):
+    """
+    List saved calculations, newest first, one page at a time
+    
+    Pages are fetched by key (CalculationID < before_id) rather than with
+    OFFSET, so later pages cost the same as the first.
+    
+    Parameters:
+    conn (sqlite3.Connection): Database connection
+    limit (int): Maximum calculations per page
+    before_id (int): Only list calculations older than this ID; pass the
+        last CalculationID of the previous page, or None for the first page
+    
+    Returns:
+    list: Dicts with CalculationID, the input parameters and Storage
+        ('blob' or 'rows')
+    """
+    rows = conn.execute(f'''
+        SELECT i.CalculationID, {_INPUT_SELECT}, s.CalculationID IS NOT NULL
+        FROM BlackScholesInput i
+        LEFT JOIN BlackScholesSurface s ON s.CalculationID = i.CalculationID
+        WHERE i.CalculationID < ?
+        ORDER BY i.CalculationID DESC
+        LIMIT ?
+    ''', (before_id if before_id is not None else 2 ** 63 - 1, limit)).fetchall()
+    
+    names = ('CalculationID',) + _INPUT_NAMES
+    return [
+        dict(zip(names, row[:-1]), Storage='blob' if row[-1] else 'rows')
+        for row in rows
+    ]
+
+
+def find_nearest_calculations(conn, input_params, limit=5, tolerance=0.25):
+    """
+    Find saved calculations with parameters close to input_params
+    
+    Candidates are restricted to a window of +/- tolerance (relative) around
+    each of NEAREST_COLUMNS, which idx_input_parameters serves as a range
+    scan, then ranked by relative Euclidean distance over those columns.
+    
+    Parameters:
+    conn (sqlite3.Connection): Database connection
+    input_params (dict): Values for at least the NEAREST_COLUMNS keys
+    limit (int): Maximum number of matches
+    tolerance (float): Relative half-width of the search window per column
+    
+    Returns:
+    list: Dicts with CalculationID, the input parameters and Distance,
+        nearest first
+    """
+    targets = np.array([float(input_params[name]) for name in NEAREST_COLUMNS])
+    scales = np.where(targets != 0, np.abs(targets), 1.0)
+    bounds = []
+    for target, scale in zip(targets, scales):
+        bounds += [target - tolerance * scale, target + tolerance * scale]
+    
+    rows = conn.execute(f'''
+        SELECT CalculationID, {_INPUT_SELECT}
+        FROM BlackScholesInput
+        WHERE StockPrice BETWEEN ? AND ?
+          AND StrikePrice BETWEEN ? AND ?
+          AND Volatility BETWEEN ? AND ?
+          AND TimeToMaturity BETWEEN ? AND ?
+    ''', bounds).fetchall()
+    if not rows:
+        return []
+    
+    columns = [1 + INPUT_COLUMNS.index(name) for name in NEAREST_COLUMNS]
+    values = np.array([[row[c] for c in columns] for row in rows], dtype=np.float64)
+    distances = np.sqrt((((values - targets) / scales) ** 2).sum(axis=1))
+    nearest = np.argsort(distances, kind='stable')[:limit]
+    
+    names = ('CalculationID',) + _INPUT_NAMES
+    return [dict(zip(names, rows[i]), Distance=float(distances[i])) for i in nearest]
+
+
+def find_saved_surface(conn, strike_price, time_to_maturity, risk_free_rate,
+                       spot_prices, volatilities, tolerance=1e-9, exercise_style='european',
+                       dividend_yield=0.0, model='black-scholes'):
+    """
+    Find the newest saved surface priced on exactly this grid
+    
+    The grid only depends on the strike, maturity, rate, dividend yield,
+    model, exercise style and its two axes, so a match can be served with
+    load_calculation instead of being repriced.
+    Axes must match exactly; the scalar parameters within tolerance, since
+    saved inputs may be unrounded (e.g. days / 365) while the grid was
+    priced from rounded ones.
+    
+    Parameters:
+    conn (sqlite3.Connection): Database connection
+    strike_price (float): Strike price
+    time_to_maturity (float): Time to maturity in years
+    risk_free_rate (float): Risk-free interest rate
+    spot_prices (np.array): Spot price axis
+    volatilities (np.array): Volatility axis
+    tolerance (float): Absolute tolerance on strike, maturity, rate and yield
+    exercise_style (str): 'european' or 'american'
+    dividend_yield (float): Continuous dividend yield
+    model (str): 'black-scholes' or 'black-76'
+    
+    Returns:
+    int: CalculationID of the match, or None
+    """
+    spot_prices = np.asarray(spot_prices, dtype=np.float64)
+    volatilities = np.asarray(volatilities, dtype=np.float64)
+    candidates = conn.execute('''
+        SELECT s.CalculationID, s.Compression, s.SpotPrices, s.Volatilities
+        FROM BlackScholesInput i
+        JOIN BlackScholesSurface s ON s.CalculationID = i.CalculationID
+        WHERE i.StrikePrice BETWEEN ? AND ?
+          AND i.TimeToMaturity BETWEEN ? AND ?
+          AND i.InterestRate BETWEEN ? AND ?
+          AND i.DividendYield BETWEEN ? AND ?
+          AND i.ExerciseStyle = ? AND i.Model = ?
+          AND s.SpotCount = ? AND s.VolatilityCount = ?
+        ORDER BY i.CalculationID DESC
+    ''', (
+        float(strike_price) - tolerance, float(strike_price) + tolerance,
+        float(time_to_maturity) - tolerance, float(time_to_maturity) + tolerance,
+        float(risk_free_rate) - tolerance, float(risk_free_rate) + tolerance,
+        float(dividend_yield) - tolerance, float(dividend_yield) + tolerance,
+        exercise_style, model, len(spot_prices), len(volatilities)
+    ))
+    
+    for calculation_id, compression, spot_blob, volatility_blob in candidates:
+        compression = None if compression == 'none' else compression
+        if (np.array_equal(_decode_array(spot_blob, '<f8', spot_prices.shape, compression), spot_prices)
+                and np.array_equal(_decode_array(volatility_blob, '<f8', volatilities.shape, compression),
+                                   volatilities)):
+            return calculation_id
+    return None
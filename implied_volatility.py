@@ -0,0 +1,257 @@
+"""
+Implied Volatility Solver
+Inverts Black-Scholes prices to implied volatility for whole option chains
+"""
+
+import numpy as np
+from black_scholes import (
+    _broadcast_inputs, _carry_yield, _d1_d2, black_scholes_prices, norm_cdf, norm_pdf
+)
+
+# Volatility search interval; prices above the value at SIGMA_MAX are
+# reported as not converged rather than extrapolated
+SIGMA_MIN = 1e-9
+SIGMA_MAX = 10.0
+
+# A solution is accepted once the price error is below tol and the implied
+# volatility error it suggests (price error / vega) is below this; quotes
+# with almost no time value have tiny vega and need the second test
+VOL_TOL = 1e-12
+
+
+def _call_equivalent_prices(price, S, K, T, r, is_call):
+    """
+    Convert put quotes to call prices via put-call parity
+
+    Returns:
+    tuple: (call_prices, discounted_strike)
+    """
+    discounted_strike = K * np.exp(-r * T)
+    call_prices = np.where(is_call, price, price + S - discounted_strike)
+    return call_prices, discounted_strike
+
+
+def _prepaid_inputs(price, S, K, T, r, is_call, q, model):
+    """
+    Broadcast inputs with S replaced by the prepaid forward S * e^(-q*T)
+
+    Black-Scholes with yield q is Black-Scholes without a yield on the
+    prepaid forward, so the solvers below only handle q = 0.
+    """
+    q = _carry_yield(r, q, model)
+    price, S, K, T, r, is_call, q = _broadcast_inputs(price, S, K, T, r, is_call, q)
+    return price, S * np.exp(-q * np.maximum(T, 0.0)), K, T, r, is_call
+
+
+def arbitrage_violations(price, S, K, T, r, is_call=True, q=0.0, model='black-scholes'):
+    """
+    Flag option prices that lie outside the no-arbitrage bounds
+
+    A call must satisfy max(S * e^(-q*T) - K * e^(-r*T), 0) <= C < S * e^(-q*T),
+    and a put the equivalent bounds through put-call parity. Expired contracts (T <= 0)
+    carry no volatility information and are flagged as well.
+
+    Parameters:
+    price (float or array): Market option price
+    S (float or array): Current stock/asset price
+    K (float or array): Strike price
+    T (float or array): Time to maturity (in years)
+    r (float or array): Risk-free interest rate (annualized)
+    is_call (bool or array): True for calls, False for puts
+    q (float or array): Continuous dividend yield (annualized)
+    model (str): One of black_scholes.MODELS
+
+    Returns:
+    np.ndarray: Boolean mask, True where the price admits no implied volatility
+    """
+    price, S, K, T, r, is_call = _prepaid_inputs(price, S, K, T, r, is_call, q, model)
+    call_prices, discounted_strike = _call_equivalent_prices(
+        price, S, K, T, r, is_call.astype(bool)
+    )
+    lower_bound = np.maximum(S - discounted_strike, 0.0)
+    tolerance = 1e-12 * np.maximum(S, 1.0)
+    return (
+        (T <= 0)
+        | ~np.isfinite(call_prices)
+        | (call_prices < lower_bound - tolerance)
+        | (call_prices >= S)
+    )
+
+
+def _initial_guess(call_prices, S, discounted_strike, T):
+    """
+    Corrado-Miller rational approximation for the starting volatility
+
+    Falls back to the Manaster-Koehler guess where the approximation's
+    discriminant goes negative (deep in or out of the money).
+    """
+    moneyness = S - discounted_strike
+    centred = call_prices - 0.5 * moneyness
+    discriminant = centred ** 2 - moneyness ** 2 / np.pi
+    with np.errstate(invalid='ignore'):
+        guess = (np.sqrt(2 * np.pi / T) / (S + discounted_strike)
+                 * (centred + np.sqrt(discriminant)))
+    fallback = np.sqrt(2 * np.abs(np.log(S / discounted_strike)) / T)
+    guess = np.where((discriminant > 0) & (guess > 0), guess, fallback)
+    return np.clip(np.nan_to_num(guess, nan=0.2), 1e-3, SIGMA_MAX / 2)
+
+
+def implied_volatility(price, S, K, T, r, is_call=True, tol=1e-10, max_iter=50, q=0.0,
+                       model='black-scholes'):
+    """
+    Calculate Black-Scholes implied volatility for arrays of option quotes
+
+    Starts from a rational-approximation guess and runs safeguarded Halley
+    iterations on the whole array at once. Each element keeps a bracket on
+    the root and falls back to bisection whenever a step would leave it, and
+    converged elements are dropped from the working set every iteration.
+    Every quote is solved on the out-of-the-money side of its put-call pair,
+    whose price is the time value alone, so in-the-money quotes with very
+    little time value keep their precision.
+
+    Parameters:
+    price (float or array): Market option price
+    S (float or array): Current stock/asset price
+    K (float or array): Strike price
+    T (float or array): Time to maturity (in years)
+    r (float or array): Risk-free interest rate (annualized)
+    is_call (bool or array): True for calls, False for puts
+    tol (float): Absolute price tolerance for convergence
+    max_iter (int): Maximum number of iterations
+    q (float or array): Continuous dividend yield (annualized)
+    model (str): One of black_scholes.MODELS
+
+    Returns:
+    float or np.ndarray: Implied volatility; NaN where the price violates
+        the no-arbitrage bounds (see arbitrage_violations) or the solver
+        did not converge inside [SIGMA_MIN, SIGMA_MAX]
+    """
+    price, S, K, T, r, is_call = _prepaid_inputs(price, S, K, T, r, is_call, q, model)
+    shape = price.shape
+    price, S, K, T, r = (a.ravel() for a in (price, S, K, T, r))
+    is_call = is_call.ravel().astype(bool)
+
+    call_prices, discounted_strike = _call_equivalent_prices(price, S, K, T, r, is_call)
+    implied_vol = np.full(price.shape, np.nan)
+
+    valid = ~arbitrage_violations(price, S, K, T, r, is_call)
+
+    # Solve on the out-of-the-money side of the put-call pair: its price is
+    # the time value itself, free of the cancellation in an in-the-money
+    # price, so quotes with very little time value still resolve
+    use_put = S > discounted_strike
+    put_prices = np.where(is_call, price - S + discounted_strike, price)
+    otm_prices = np.where(use_put, put_prices, call_prices)
+
+    # Only prices exactly at the lower bound correspond to zero volatility;
+    # any time value above it, however small, is solved for
+    at_intrinsic = valid & (otm_prices <= 0.0)
+    implied_vol[at_intrinsic] = 0.0
+
+    idx = np.flatnonzero(valid & ~at_intrinsic)
+    sigma = _initial_guess(call_prices[idx], S[idx], discounted_strike[idx], T[idx])
+    target, S, K, T, r, discounted_strike = (
+        a[idx] for a in (otm_prices, S, K, T, r, discounted_strike)
+    )
+    # +1 prices calls, -1 puts
+    side = np.where(use_put[idx], -1.0, 1.0)
+    lower = np.full(idx.shape, SIGMA_MIN)
+    upper = np.full(idx.shape, SIGMA_MAX)
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+
+        d1, d2 = _d1_d2(S, K, T, r, sigma)
+        sqrt_T = np.sqrt(T)
+        model_price = side * (S * norm_cdf(side * d1) - discounted_strike * norm_cdf(side * d2))
+        diff = model_price - target
+        vega = S * norm_pdf(d1) * sqrt_T
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = diff / vega
+        done = (np.abs(diff) < tol) & (np.abs(newton) < VOL_TOL)
+
+        # Price is increasing in sigma, so the sign of diff tightens the bracket
+        upper = np.where(diff > 0, sigma, upper)
+        lower = np.where(diff < 0, sigma, lower)
+        # A bracket narrower than float resolution has converged in sigma
+        # even where the price is too flat to confirm it
+        done |= upper - lower <= 1e-15 * np.maximum(upper, 1.0)
+        implied_vol[idx[done]] = sigma[done]
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            volga_ratio = d1 * d2 / sigma
+            # Halley correction: divide by (1 - f * f'' / (2 * f'^2))
+            denominator = 1.0 - 0.5 * newton * volga_ratio
+            step = np.where(denominator > 0.5, newton / denominator, newton)
+            # Far from the root, out-of-the-money prices are close to
+            # exponential in sigma, so Newton on log(price) converges where
+            # steps on the price itself crawl
+            ratio = model_price / target
+            far = (ratio > 2.0) | (ratio < 0.5)
+            log_step = np.log(ratio) * model_price / vega
+            step = np.where(far & np.isfinite(log_step), log_step, step)
+            candidate = sigma - step
+
+        outside = ~np.isfinite(candidate) | (candidate <= lower) | (candidate >= upper)
+        sigma = np.where(outside, 0.5 * (lower + upper), candidate)
+
+        keep = ~done
+        if keep.all():
+            continue
+        idx, target, S, K, T, r, discounted_strike, side, sigma, lower, upper = (
+            a[keep] for a in (idx, target, S, K, T, r, discounted_strike, side, sigma, lower,
+                              upper)
+        )
+
+    if shape == ():
+        return float(implied_vol[0])
+    return implied_vol.reshape(shape)
+
+
+def implied_volatility_brentq(price, S, K, T, r, is_call=True, xtol=1e-14, q=0.0,
+                              model='black-scholes'):
+    """
+    Reference implied volatility using scipy's brentq root finder
+
+    Solves one contract at a time, so it is slow; it exists to check the
+    accuracy of implied_volatility.
+
+    Parameters:
+    price (float or array): Market option price
+    S (float or array): Current stock/asset price
+    K (float or array): Strike price
+    T (float or array): Time to maturity (in years)
+    r (float or array): Risk-free interest rate (annualized)
+    is_call (bool or array): True for calls, False for puts
+    xtol (float): Absolute volatility tolerance passed to brentq
+    q (float or array): Continuous dividend yield (annualized)
+    model (str): One of black_scholes.MODELS
+
+    Returns:
+    float or np.ndarray: Implied volatility, NaN where no root exists
+    """
+    from scipy.optimize import brentq
+
+    price, S, K, T, r, is_call = _prepaid_inputs(price, S, K, T, r, is_call, q, model)
+    violations = arbitrage_violations(price, S, K, T, r, is_call)
+    implied_vol = np.full(price.shape, np.nan)
+
+    for i in np.ndindex(price.shape):
+        if violations[i]:
+            continue
+
+        def objective(sigma):
+            call_price, put_price = black_scholes_prices(S[i], K[i], T[i], r[i], sigma)
+            return float(call_price if is_call[i] else put_price) - price[i]
+
+        low, high = objective(SIGMA_MIN), objective(SIGMA_MAX)
+        if low >= 0:
+            implied_vol[i] = 0.0
+        elif high > 0:
+            implied_vol[i] = brentq(objective, SIGMA_MIN, SIGMA_MAX, xtol=xtol)
+
+    if price.shape == ():
+        return float(implied_vol[()])
+    return implied_vol
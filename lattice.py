@@ -0,0 +1,238 @@
+"""
+Lattice Option Pricing
+Binomial (Cox-Ross-Rubinstein, Leisen-Reimer) and trinomial trees for
+American and European options, priced many contracts at a time
+"""
+
+import numpy as np
+from black_scholes import _broadcast_inputs, _carry_yield, _d1_d2
+
+LATTICE_METHODS = ('crr', 'leisen-reimer', 'trinomial')
+EXERCISE_STYLES = ('european', 'american')
+
+# Default time steps; Leisen-Reimer converges much faster than CRR and
+# rounds even step counts up to the next odd one
+DEFAULT_STEPS = 200
+
+# Lattice nodes (nodes per level x contracts) processed per chunk; keeping
+# the working arrays cache-sized is ~2x faster than one large chunk
+DEFAULT_MAX_NODES = 65_536
+
+
+def _peizer_pratt(z, steps):
+    """Peizer-Pratt method 2 inversion used by Leisen-Reimer"""
+    ratio = z / (steps + 1.0 / 3.0 + 0.1 / (steps + 1.0))
+    return 0.5 + np.copysign(0.5, z) * np.sqrt(1.0 - np.exp(-ratio ** 2 * (steps + 1.0 / 6.0)))
+
+
+def _exercise(values, prices, K, is_call, american, scratch):
+    """
+    Payoff at the nodes, or the early-exercise update of values in place
+
+    When values is None the intrinsic value is returned as a new array;
+    otherwise values is raised to the intrinsic value where that is higher
+    (American exercise only). Nodes are rows, contracts are columns.
+    """
+    if values is not None and not american:
+        return values
+    intrinsic = scratch if values is not None else np.empty_like(prices)
+    if is_call.all():
+        np.subtract(prices, K, out=intrinsic)
+    elif not is_call.any():
+        np.subtract(K, prices, out=intrinsic)
+    else:
+        np.subtract(prices, K, out=intrinsic)
+        np.negative(intrinsic, out=intrinsic, where=~is_call)
+    if values is None:
+        return np.maximum(intrinsic, 0.0, out=intrinsic)
+    return np.maximum(values, intrinsic, out=values)
+
+
+def _binomial_chunk(S, K, T, r, sigma, q, is_call, american, steps, method):
+    """Backward induction on a binomial tree for 1-D arrays of contracts"""
+    dt = T / steps
+    growth = np.exp((r - q) * dt)
+    volatility_step = sigma * np.sqrt(dt)
+    u = np.exp(volatility_step)
+    d = 1.0 / u
+    p = (growth - d) / (u - d)
+    # CRR needs d <= growth <= u; when the drift outruns the volatility
+    # (|r - q| * dt > sigma * sqrt(dt)) p leaves [0, 1] and the rollback
+    # blows up. Those contracts use the drift-centred tree instead: both
+    # moves carry the growth factor and p = 1 / (1 + e^(sigma * sqrt(dt)))
+    centred = (p < 0.0) | (p > 1.0)
+    if centred.any():
+        u = np.where(centred, growth * u, u)
+        d = np.where(centred, growth * d, d)
+        p = np.where(centred, 1.0 / (1.0 + np.exp(volatility_step)), p)
+    if method == 'leisen-reimer':
+        d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+        lr_p = _peizer_pratt(d2, steps)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lr_u = growth * _peizer_pratt(d1, steps) / lr_p
+            lr_d = (growth - lr_p * lr_u) / (1.0 - lr_p)
+        # Far from the strike the inversion rounds p to 0 or 1; those
+        # contracts are priced on the CRR (or drift-centred) tree instead
+        valid = (lr_p > 0.0) & (lr_p < 1.0) & (lr_d > 0.0) & np.isfinite(lr_u)
+        p, u, d = (np.where(valid, lr, crr) for lr, crr in ((lr_p, p), (lr_u, u), (lr_d, d)))
+    discount = np.exp(-r * dt)
+    p_up = discount * p
+    p_down = discount - p_up
+
+    # Node prices at expiry: S * u^j * d^(steps - j), one row per node so
+    # every level is a contiguous block of rows
+    j = np.arange(steps + 1)[:, None]
+    prices = S * np.exp(j * np.log(u) + (steps - j) * np.log(d))
+    values = _exercise(None, prices, K, is_call, american, None)
+    scratch = np.empty_like(values)
+
+    for i in range(steps - 1, -1, -1):
+        width = i + 1
+        level = values[:width]
+        np.multiply(values[1:width + 1], p_up, out=scratch[:width])
+        level *= p_down
+        level += scratch[:width]
+        if american:
+            # Node (i, j) sits one down-move before node (i + 1, j)
+            level_prices = prices[:width]
+            level_prices /= d
+            _exercise(level, level_prices, K, is_call, True, scratch[:width])
+    return values[0]
+
+
+def _trinomial_chunk(S, K, T, r, sigma, q, is_call, american, steps):
+    """Backward induction on a Boyle trinomial tree for 1-D arrays of contracts"""
+    dt = T / steps
+    half_step = np.exp(sigma * np.sqrt(dt / 2.0))
+    half_growth = np.exp((r - q) * dt / 2.0)
+    # Boyle's probabilities need 1/half_step <= half_growth <= half_step,
+    # or p_middle goes negative. Contracts whose drift outruns the
+    # volatility move the whole tree by the growth factor each step and
+    # use the driftless probabilities instead
+    centred = (half_growth < 1.0 / half_step) | (half_growth > half_step)
+    drift = np.where(centred, (r - q) * dt, 0.0)
+    half_growth = np.where(centred, 1.0, half_growth)
+    p_up = ((half_growth - 1.0 / half_step) / (half_step - 1.0 / half_step)) ** 2
+    p_down = ((half_step - half_growth) / (half_step - 1.0 / half_step)) ** 2
+    discount = np.exp(-r * dt)
+    p_up, p_middle, p_down = (discount * p for p in (p_up, 1.0 - p_up - p_down, p_down))
+
+    # Node k at expiry is S * e^(steps * drift) * u^(k - steps) with
+    # u = half_step^2; node k at level i has the price of expiry node
+    # k + (steps - i) divided by e^((steps - i) * drift), so each level
+    # reads a window of the expiry prices instead of recomputing them
+    k = np.arange(2 * steps + 1)[:, None]
+    prices = S * np.exp((k - steps) * 2.0 * np.log(half_step) + steps * drift)
+    any_centred = centred.any()
+    values = _exercise(None, prices, K, is_call, american, None)
+    scratch = np.empty_like(values)
+    middle = np.empty_like(values)
+
+    for i in range(steps - 1, -1, -1):
+        width = 2 * i + 1
+        level = values[:width]
+        np.multiply(values[2:width + 2], p_up, out=scratch[:width])
+        np.multiply(values[1:width + 1], p_middle, out=middle[:width])
+        scratch[:width] += middle[:width]
+        level *= p_down
+        level += scratch[:width]
+        if american:
+            offset = steps - i
+            level_prices = prices[offset:offset + width]
+            if any_centred:
+                level_prices = np.multiply(level_prices, np.exp(-offset * drift),
+                                           out=middle[:width])
+            _exercise(level, level_prices, K, is_call, True, scratch[:width])
+    return values[0]
+
+
+def lattice_prices(S, K, T, r, sigma, is_call=True, american=True, steps=DEFAULT_STEPS,
+                   method='crr', max_nodes=DEFAULT_MAX_NODES, q=0.0, model='black-scholes'):
+    """
+    Price arrays of options on a binomial or trinomial lattice
+
+    All contracts are rolled back together: each time step is a handful of
+    vectorized operations on preallocated (nodes x contracts) arrays, with
+    no per-node Python objects.
+    Inputs broadcast like black_scholes_prices, so a grid is priced by
+    passing e.g. S[:, None] and sigma[None, :]. Contracts at expiry or with
+    zero volatility are valued at intrinsic value. The yield q lowers the
+    risk-neutral drift to r - q, so American calls on a dividend-paying
+    underlying (or on a futures price, under Black-76) may exercise early.
+
+    Parameters:
+    S (float or array): Current stock/asset price (futures price for Black-76)
+    K (float or array): Strike price
+    T (float or array): Time to maturity (in years)
+    r (float or array): Risk-free interest rate (annualized)
+    sigma (float or array): Volatility (annualized)
+    is_call (bool or array): True for calls, False for puts
+    american (bool): Allow early exercise at every node
+    steps (int): Time steps in the lattice
+    method (str): One of LATTICE_METHODS
+    max_nodes (int): Nodes per level x contracts processed per chunk
+    q (float or array): Continuous dividend yield (annualized)
+    model (str): One of black_scholes.MODELS
+
+    Returns:
+    np.ndarray: Option prices of the broadcast shape
+    """
+    if method not in LATTICE_METHODS:
+        raise ValueError(f"Unknown lattice method {method!r}; expected one of {LATTICE_METHODS}")
+    steps = max(1, int(steps))
+    if method == 'leisen-reimer':
+        steps += 1 - steps % 2
+
+    q = _carry_yield(r, q, model)
+    S, K, T, r, sigma, q, is_call = _broadcast_inputs(S, K, T, r, sigma, q, is_call)
+    shape = S.shape
+    S, K, T, r, sigma, q = (v.ravel() for v in (S, K, T, r, sigma, q))
+    is_call = is_call.ravel().astype(bool)
+
+    live = (T > 0) & (sigma > 0)
+    intrinsic = np.maximum(np.where(is_call, S - K, K - S), 0.0)
+    prices = intrinsic.copy()
+
+    live_index = np.flatnonzero(live)
+    width = 2 * steps + 1 if method == 'trinomial' else steps + 1
+    chunk = max(1, int(max_nodes) // width)
+    for start in range(0, len(live_index), chunk):
+        rows = live_index[start:start + chunk]
+        args = (S[rows], K[rows], T[rows], r[rows], sigma[rows], q[rows], is_call[rows],
+                american, steps)
+        if method == 'trinomial':
+            prices[rows] = _trinomial_chunk(*args)
+        else:
+            prices[rows] = _binomial_chunk(*args, method)
+
+    if american:
+        # Rounding in the rollback can leave a value a hair below exercise
+        prices = np.maximum(prices, intrinsic)
+    return prices.reshape(shape)
+
+
+def lattice_grid_prices(spot_prices, volatilities, K, T, r, american=True,
+                        steps=DEFAULT_STEPS, method='crr', q=0.0, model='black-scholes'):
+    """
+    Lattice call and put prices over a spot x volatility grid
+
+    Parameters:
+    spot_prices (np.array): Spot prices (grid rows)
+    volatilities (np.array): Volatilities (grid columns)
+    K, T, r (float): Strike, time to maturity (years) and risk-free rate
+    american (bool): Allow early exercise
+    steps (int): Time steps in the lattice
+    method (str): One of LATTICE_METHODS
+    q (float): Continuous dividend yield (annualized)
+    model (str): One of black_scholes.MODELS
+
+    Returns:
+    tuple: (call_prices, put_prices), each of shape
+        (len(spot_prices), len(volatilities))
+    """
+    S = np.asarray(spot_prices, dtype=np.float64)[:, None]
+    sigma = np.asarray(volatilities, dtype=np.float64)[None, :]
+    return tuple(
+        lattice_prices(S, K, T, r, sigma, is_call, american, steps, method, q=q, model=model)
+        for is_call in (True, False)
+    )
@@ -0,0 +1,202 @@
+"""
+Monte Carlo Option Pricing
+Prices European and path-dependent options under the Black-Scholes GBM
+dynamics, with antithetic and control variates
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from black_scholes import _carry_yield, black_scholes_prices
+
+# 'european' pays on the terminal price, 'asian' on the arithmetic average
+# over the monitoring dates, 'lookback' on the path maximum (calls) or
+# minimum (puts) against the fixed strike, 'barrier' is a European payoff
+# knocked in or out by the path crossing the barrier
+PAYOFFS = ('european', 'asian', 'barrier', 'lookback')
+BARRIER_TYPES = ('up-and-out', 'down-and-out', 'up-and-in', 'down-and-in')
+
+# Normal draws generated per batch; bounds memory at a few arrays of this
+# many float64 values regardless of the number of paths
+DEFAULT_BATCH_ELEMENTS = 1_000_000
+
+
+@dataclass
+class MonteCarloResult:
+    """
+    Monte Carlo price estimate.
+
+    Attributes:
+        price (float): Estimated option price
+        std_error (float): Standard error of the estimate
+        n_paths (int): Simulated paths, counting antithetic pairs as two
+        control_beta (float): Control variate coefficient (0 when unused)
+    """
+    price: float
+    std_error: float
+    n_paths: int
+    control_beta: float = 0.0
+
+
+def _payoffs(paths, S, K, is_call, payoff, barrier, barrier_type):
+    """
+    Undiscounted payoff of each simulated path
+
+    Parameters:
+    paths (np.ndarray): Prices at the monitoring dates, shape (paths, steps)
+    S (float): Initial price, included in path extremes
+    """
+    if payoff == 'asian':
+        underlying = paths.mean(axis=1)
+    elif payoff == 'lookback':
+        underlying = np.maximum(paths.max(axis=1), S) if is_call else np.minimum(paths.min(axis=1), S)
+    else:
+        underlying = paths[:, -1]
+
+    values = np.maximum(underlying - K, 0.0) if is_call else np.maximum(K - underlying, 0.0)
+
+    if payoff == 'barrier':
+        direction, kind = barrier_type.split('-and-')
+        if direction == 'up':
+            crossed = np.maximum(paths.max(axis=1), S) >= barrier
+        else:
+            crossed = np.minimum(paths.min(axis=1), S) <= barrier
+        values = np.where(crossed if kind == 'in' else ~crossed, values, 0.0)
+    return values
+
+
+def _batch_sums(seed, n_samples, S, K, T, r, sigma, q, is_call, payoff, n_steps,
+                barrier, barrier_type, antithetic):
+    """
+    Simulate one batch and return its sufficient statistics
+
+    Each sample is one path, or the average of an antithetic pair. The
+    control is the discounted vanilla payoff of the same terminal price.
+
+    Returns:
+    np.ndarray: [n, sum(y), sum(y^2), sum(c), sum(c^2), sum(y*c)] for
+        discounted payoffs y and controls c
+    """
+    rng = np.random.default_rng(seed)
+    increments = rng.standard_normal((n_samples, n_steps))
+    if antithetic:
+        increments = np.concatenate([increments, -increments])
+
+    # Log-price increments, accumulated in place into the price paths
+    dt = T / n_steps
+    increments *= sigma * np.sqrt(dt)
+    increments += (r - q - 0.5 * sigma ** 2) * dt
+    paths = np.exp(np.cumsum(increments, axis=1, out=increments), out=increments)
+    paths *= S
+
+    discount = np.exp(-r * T)
+    y = discount * _payoffs(paths, S, K, is_call, payoff, barrier, barrier_type)
+    terminal = paths[:, -1]
+    c = discount * (np.maximum(terminal - K, 0.0) if is_call else np.maximum(K - terminal, 0.0))
+    if antithetic:
+        y = 0.5 * (y[:n_samples] + y[n_samples:])
+        c = 0.5 * (c[:n_samples] + c[n_samples:])
+
+    return np.array([n_samples, y.sum(), y @ y, c.sum(), c @ c, y @ c])
+
+
+def monte_carlo_price(S, K, T, r, sigma, is_call=True, payoff='european', n_paths=100_000,
+                      n_steps=252, barrier=None, barrier_type='up-and-out', antithetic=True,
+                      control_variate=True, seed=None, batch_elements=DEFAULT_BATCH_ELEMENTS,
+                      workers=1, q=0.0, model='black-scholes'):
+    """
+    Price one option by simulating GBM paths in memory-bounded batches
+
+    The underlying drifts at r - q (zero for a futures price under
+    Black-76). Paths are monitored at n_steps equally spaced dates (European payoffs
+    only need the terminal price and simulate a single exact step). The
+    control variate is the same-type European option, whose analytic price
+    comes from black_scholes_prices; for a European payoff it reproduces
+    the analytic price exactly, so disable it to cross-check the model.
+
+    Every batch draws from its own child of np.random.SeedSequence(seed),
+    so a given seed, n_paths and batch_elements give the same estimate
+    whether batches run serially or across worker processes. Independent
+    estimates for parallel runs come from distinct seeds, e.g. the children
+    of SeedSequence(base_seed).spawn(n).
+
+    Parameters:
+    S (float): Current stock/asset price (futures price for Black-76)
+    K (float): Strike price
+    T (float): Time to maturity (in years), must be positive
+    r (float): Risk-free interest rate (annualized)
+    sigma (float): Volatility (annualized)
+    is_call (bool): True for a call, False for a put
+    payoff (str): One of PAYOFFS
+    n_paths (int): Paths to simulate (rounded up to whole antithetic pairs)
+    n_steps (int): Monitoring dates for path-dependent payoffs
+    barrier (float): Barrier level, required for payoff='barrier'
+    barrier_type (str): One of BARRIER_TYPES
+    antithetic (bool): Pair every path with its mirror image
+    control_variate (bool): Adjust with the European control variate
+    seed (int or np.random.SeedSequence): Seed for reproducible results
+    batch_elements (int): Normal draws per batch, bounding memory use
+    workers (int): Worker processes for the batches; 1 runs in-process
+    q (float): Continuous dividend yield (annualized)
+    model (str): One of black_scholes.MODELS
+
+    Returns:
+    MonteCarloResult: Price, standard error, path count and control beta
+    """
+    if payoff not in PAYOFFS:
+        raise ValueError(f"Unknown payoff {payoff!r}; expected one of {PAYOFFS}")
+    if payoff == 'barrier':
+        if barrier is None:
+            raise ValueError("A barrier level is required for barrier payoffs")
+        if barrier_type not in BARRIER_TYPES:
+            raise ValueError(f"Unknown barrier type {barrier_type!r}; expected one of {BARRIER_TYPES}")
+    if T <= 0:
+        raise ValueError("Time to maturity must be positive")
+    q = _carry_yield(r, q, model)
+
+    n_steps = 1 if payoff == 'european' else max(1, int(n_steps))
+    paths_per_sample = 2 if antithetic else 1
+    n_samples = -(-int(n_paths) // paths_per_sample)
+    samples_per_batch = max(1, int(batch_elements) // (n_steps * paths_per_sample))
+    batch_sizes = [
+        min(samples_per_batch, n_samples - start)
+        for start in range(0, n_samples, samples_per_batch)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    params = (float(S), float(K), float(T), float(r), float(sigma), float(q), bool(is_call),
+              payoff, n_steps, barrier, barrier_type, antithetic)
+
+    if workers == 1 or len(batch_sizes) == 1:
+        totals = sum(_batch_sums(s, size, *params) for s, size in zip(seeds, batch_sizes))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_batch_sums, s, size, *params)
+                for s, size in zip(seeds, batch_sizes)
+            ]
+            totals = sum(future.result() for future in futures)
+
+    n, sum_y, sum_yy, sum_c, sum_cc, sum_yc = totals
+    mean_y = sum_y / n
+    var_y = max(sum_yy / n - mean_y ** 2, 0.0) * n / max(n - 1, 1)
+    beta = 0.0
+    price = mean_y
+    variance = var_y
+    if control_variate:
+        mean_c = sum_c / n
+        var_c = max(sum_cc / n - mean_c ** 2, 0.0) * n / max(n - 1, 1)
+        cov_yc = (sum_yc / n - mean_y * mean_c) * n / max(n - 1, 1)
+        if var_c > 0:
+            call_price, put_price = black_scholes_prices(S, K, T, r, sigma, q)
+            control_price = float(call_price if is_call else put_price)
+            beta = cov_yc / var_c
+            price = mean_y - beta * (mean_c - control_price)
+            variance = max(var_y - cov_yc ** 2 / var_c, 0.0)
+
+    return MonteCarloResult(
+        price=float(price),
+        std_error=float(np.sqrt(variance / n)),
+        n_paths=int(n) * paths_per_sample,
+        control_beta=float(beta)
+    )
@@ -0,0 +1,468 @@
+"""
+Precomputed Price Surface Index
+Tabulates normalized call and put prices over normalized moneyness x total
+variance once, keeps the table in a memory-mapped .npy file and answers large
+batches of price and Greek queries by vectorized cubic interpolation
+"""
+
+import json
+import os
+
+import numpy as np
+from black_scholes import (
+    _broadcast_inputs, _carry_yield, black_scholes_prices, calculate_greeks
+)
+from lattice import EXERCISE_STYLES, lattice_prices
+from utils.calculations import LATTICE_METHOD, LATTICE_STEPS
+
+# Layout version of the table and its metadata file
+INDEX_FORMAT_VERSION = 1
+
+# Table axes: normalized moneyness z = ln(F/K) / (sigma * sqrt(T)), with
+# forward F = S * e^((r-q)*T), and total volatility v = sigma * sqrt(T), the
+# square root of total variance. Dividing European calls by S * e^(-q*T)
+# and puts by K * e^(-r*T) leaves functions of z and v alone, so a European
+# table serves every strike, maturity, rate and yield; an American table is
+# only valid for the maturity, rate and yield it was built with
+DEFAULT_SHAPE = (801, 401)
+DEFAULT_MONEYNESS_LIMIT = 6.0
+DEFAULT_MAX_TOTAL_VOL = 2.0
+
+# Queries with a smaller total volatility fall back to the exact pricer: the
+# Greeks divide by v, and near v = 0 prices approach the payoff kink
+DEFAULT_MIN_TOTAL_VOL = 0.02
+
+# Cell midpoints, the worst case for interpolation, checked against the
+# exact pricer when a table is built
+DEFAULT_ERROR_SAMPLES = 10_000
+
+# Greeks available from the index (derivatives of the interpolant)
+INDEX_GREEKS = ('delta', 'gamma', 'vega')
+
+# Table nodes priced per chunk while building
+_BUILD_CHUNK_NODES = 65_536
+
+
+def _metadata_path(path):
+    """Metadata file stored next to the table"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _normalized_prices(z, v, metadata):
+    """
+    Exact normalized call and put prices at table coordinates
+
+    Returns:
+    tuple: (call / (S * e^(-q*T)), put / (K * e^(-r*T))) with K = 1
+    """
+    x = z * v
+    if metadata['exercise'] == 'european':
+        # Any maturity works once normalized; T = 1, r = q = 0 makes S = F
+        S = np.exp(x)
+        call_prices, put_prices = black_scholes_prices(S, 1.0, 1.0, 0.0, v)
+        return call_prices / S, put_prices
+
+    T, r, q = metadata['T'], metadata['r'], metadata['q']
+    S = np.exp(x - (r - q) * T)
+    sigma = v / np.sqrt(T)
+    call_prices, put_prices = (
+        lattice_prices(S, 1.0, T, r, sigma, is_call, True, metadata['steps'],
+                       metadata['method'], q=q)
+        for is_call in (True, False)
+    )
+    return call_prices / (S * np.exp(-q * T)), put_prices / np.exp(-r * T)
+
+
+def _cubic_weights(t, derivative=0):
+    """
+    4-point Lagrange weights for nodes at -1, 0, 1, 2, or their derivatives
+
+    Parameters:
+    t (np.ndarray): Offsets from node 0 in grid steps
+    derivative (int): 0, 1 or 2
+    """
+    if derivative == 0:
+        return (-t * (t - 1) * (t - 2) / 6, (t + 1) * (t - 1) * (t - 2) / 2,
+                -(t + 1) * t * (t - 2) / 2, (t + 1) * t * (t - 1) / 6)
+    if derivative == 1:
+        return (-(3 * t ** 2 - 6 * t + 2) / 6, (3 * t ** 2 - 4 * t - 1) / 2,
+                -(3 * t ** 2 - 2 * t - 2) / 2, (3 * t ** 2 - 1) / 6)
+    return (1 - t, 3 * t - 2, 1 - 3 * t, t)
+
+
+class SurfaceIndex:
+    """
+    Interpolated European or American prices and Greeks from a prebuilt table.
+
+    The table holds the normalized call and put price at every node of a
+    uniform (z, v) grid; see build_surface_index. A query is answered from
+    the 4 x 4 nodes around it with one set of cubic weights shared by the
+    call and put fields. Queries outside the table (|z| beyond the
+    moneyness limit, v outside [min_total_vol, max_total_vol], expired
+    contracts, or, for American tables, a different maturity, rate or
+    yield) are priced exactly instead.
+
+    Accuracy: metadata['max_error'] is the largest interpolation error found
+    at cell midpoints when the table was built, in units of S * e^(-q*T)
+    for calls and K * e^(-r*T) for puts. Greeks are derivatives of the
+    interpolant and lose roughly one order of the grid step per derivative.
+
+    Speed: with NumPy a lookup costs about as much as three closed-form
+    Black-Scholes evaluations, so for European exercise black_scholes is
+    the faster path; the index pays off for American exercise, where each
+    exact price is a lattice rollback. The app's American grids are served
+    from it through utils.surface_grid.SurfaceGridEngine.
+
+    Args:
+        table (np.ndarray): (2, n_z, n_v) normalized call and put prices,
+            usually a read-only memory map
+        metadata (dict): Table description written by build_surface_index
+
+    Attributes:
+        queries (int): Contracts priced since creation
+        fallbacks (int): Contracts priced exactly because they fell outside
+    """
+
+    def __init__(self, table, metadata):
+        self.table = table
+        self.metadata = metadata
+        self.queries = 0
+        self.fallbacks = 0
+        n_z, n_v = metadata['shape']
+        self._z_step = 2 * metadata['moneyness_limit'] / (n_z - 1)
+        self._v_step = metadata['max_total_vol'] / (n_v - 1)
+        self._fields = [field.reshape(-1) for field in table]
+
+    @property
+    def exercise(self):
+        """str: Exercise style the table was built for"""
+        return self.metadata['exercise']
+
+    def _coordinates(self, S, K, T, r, sigma, q):
+        """Table coordinates of every contract and the mask of those inside"""
+        metadata = self.metadata
+        with np.errstate(divide='ignore', invalid='ignore'):
+            v = sigma * np.sqrt(np.maximum(T, 0.0))
+            z = (np.log(S / K) + (r - q) * T) / v
+        inside = (
+            (T > 0) & (v >= metadata['min_total_vol']) & (v <= metadata['max_total_vol'])
+            & (np.abs(z) <= metadata['moneyness_limit'])
+        )
+        if self.exercise == 'american':
+            inside &= ((np.abs(T - metadata['T']) <= 1e-12) & (np.abs(r - metadata['r']) <= 1e-12)
+                       & (np.abs(q - metadata['q']) <= 1e-12))
+        return z, v, inside
+
+    def _stencil(self, z, v):
+        """Flat index of each query's first stencil node and its offsets"""
+        n_z, n_v = self.metadata['shape']
+        z_position = (z + self.metadata['moneyness_limit']) / self._z_step
+        v_position = v / self._v_step
+        z_start = np.clip(z_position.astype(np.intp) - 1, 0, n_z - 4)
+        v_start = np.clip(v_position.astype(np.intp) - 1, 0, n_v - 4)
+        return z_start * n_v + v_start, z_position - z_start - 1, v_position - v_start - 1
+
+    def _interpolate(self, field, stencil, z_derivative=0, v_derivative=0):
+        """Interpolate one table field, or a derivative in grid steps"""
+        base, z_offset, v_offset = stencil
+        n_v = self.metadata['shape'][1]
+        values = self._fields[field]
+        z_weights = _cubic_weights(z_offset, z_derivative)
+        v_weights = _cubic_weights(v_offset, v_derivative)
+        result = 0.0
+        for i, z_weight in enumerate(z_weights):
+            row = base + i * n_v
+            result = result + z_weight * (
+                v_weights[0] * values[row] + v_weights[1] * values[row + 1]
+                + v_weights[2] * values[row + 2] + v_weights[3] * values[row + 3]
+            )
+        return result
+
+    def _exact_prices(self, S, K, T, r, sigma, q):
+        """Exact call and put prices for contracts outside the table"""
+        if self.exercise == 'european':
+            return black_scholes_prices(S, K, T, r, sigma, q)
+        return tuple(
+            lattice_prices(S, K, T, r, sigma, is_call, True, self.metadata['steps'],
+                           self.metadata['method'], q=q)
+            for is_call in (True, False)
+        )
+
+    def prices(self, S, K, T, r, sigma, q=0.0, model='black-scholes'):
+        """
+        Call and put prices for arrays of contracts
+
+        Inputs broadcast like black_scholes.black_scholes_prices.
+
+        Parameters:
+        S (float or array): Current stock/asset price (futures price for Black-76)
+        K (float or array): Strike price
+        T (float or array): Time to maturity (in years)
+        r (float or array): Risk-free interest rate (annualized)
+        sigma (float or array): Volatility (annualized)
+        q (float or array): Continuous dividend yield (annualized)
+        model (str): One of black_scholes.MODELS
+
+        Returns:
+        tuple: (call_prices, put_prices) as numpy arrays of the broadcast shape
+        """
+        q = _carry_yield(r, q, model)
+        S, K, T, r, sigma, q = _broadcast_inputs(S, K, T, r, sigma, q)
+        shape = S.shape
+        S, K, T, r, sigma, q = (a.ravel() for a in (S, K, T, r, sigma, q))
+        z, v, inside = self._coordinates(S, K, T, r, sigma, q)
+        call_prices = np.empty(S.shape)
+        put_prices = np.empty(S.shape)
+
+        index = np.nonzero(inside)
+        stencil = self._stencil(z[index], v[index])
+        call_scale = S[index] * np.exp(-q[index] * T[index])
+        put_scale = K[index] * np.exp(-r[index] * T[index])
+        # Interpolation can undershoot by up to max_error near zero
+        call_prices[index] = np.maximum(call_scale * self._interpolate(0, stencil), 0.0)
+        put_prices[index] = np.maximum(put_scale * self._interpolate(1, stencil), 0.0)
+
+        outside = np.nonzero(~inside)
+        if outside[0].size:
+            call_prices[outside], put_prices[outside] = self._exact_prices(
+                *(a[outside] for a in (S, K, T, r, sigma, q))
+            )
+
+        self.queries += S.size
+        self.fallbacks += int((~inside).sum())
+        return call_prices.reshape(shape), put_prices.reshape(shape)
+
+    def _exact_greeks(self, S, K, T, r, sigma, q, is_call, greeks):
+        """Exact Greeks for contracts outside the table"""
+        if self.exercise == 'european':
+            return calculate_greeks(S, K, T, r, sigma, is_call, greeks, q)
+
+        # No closed form for American Greeks: bump and reprice on the lattice
+        def price(S, sigma):
+            call_prices, put_prices = self._exact_prices(S, K, T, r, sigma, q)
+            return np.where(is_call, call_prices, put_prices)
+
+        results = {}
+        spot_bump = 1e-3 * S
+        if {'delta', 'gamma'} & set(greeks):
+            up, down = price(S + spot_bump, sigma), price(S - spot_bump, sigma)
+            if 'delta' in greeks:
+                results['delta'] = (up - down) / (2 * spot_bump)
+            if 'gamma' in greeks:
+                results['gamma'] = (up - 2 * price(S, sigma) + down) / spot_bump ** 2
+        if 'vega' in greeks:
+            results['vega'] = (price(S, sigma + 1e-3) - price(S, np.maximum(sigma - 1e-3, 0.0))) / (
+                sigma + 1e-3 - np.maximum(sigma - 1e-3, 0.0)
+            )
+        return results
+
+    def greeks(self, S, K, T, r, sigma, is_call=True, greeks=None, q=0.0, model='black-scholes'):
+        """
+        Delta, gamma and vega for arrays of contracts
+
+        Taken from the derivatives of the interpolated surface, in the same
+        units as black_scholes.calculate_greeks. Contracts outside the table
+        get analytic Greeks (European) or lattice bump-and-reprice Greeks
+        (American).
+
+        Parameters:
+        S, K, T, r, sigma, q, model: As for prices
+        is_call (bool or array): True for calls, False for puts
+        greeks (iterable of str): Subset of INDEX_GREEKS (default all)
+
+        Returns:
+        dict: Mapping of Greek name to numpy array of the broadcast shape
+        """
+        requested = INDEX_GREEKS if greeks is None else tuple(greeks)
+        unknown = set(requested) - set(INDEX_GREEKS)
+        if unknown:
+            raise ValueError(f"Greeks not available from the index: {sorted(unknown)}")
+
+        q = _carry_yield(r, q, model)
+        S, K, T, r, sigma, q, is_call = _broadcast_inputs(S, K, T, r, sigma, q, is_call)
+        shape = S.shape
+        S, K, T, r, sigma, q = (a.ravel() for a in (S, K, T, r, sigma, q))
+        is_call = is_call.ravel().astype(bool)
+        z, v, inside = self._coordinates(S, K, T, r, sigma, q)
+        results = {name: np.empty(S.shape) for name in requested}
+
+        index = np.nonzero(inside)
+        stencil = self._stencil(z[index], v[index])
+        S_in, T_in, z_in, v_in, calls = S[index], T[index], z[index], v[index], is_call[index]
+        # Calls are normalized by S * e^(-q*T), puts by K * e^(-r*T)
+        call_scale = np.exp(-q[index] * T_in)
+        put_scale = K[index] * np.exp(-r[index] * T_in)
+
+        def field_derivative(z_derivative=0, v_derivative=0):
+            values = [self._interpolate(field, stencil, z_derivative, v_derivative)
+                      for field in (0, 1)]
+            scale = self._z_step ** z_derivative * self._v_step ** v_derivative
+            return np.where(calls, values[0], values[1]) / scale
+
+        h_z = field_derivative(z_derivative=1)
+        if 'delta' in requested:
+            h = field_derivative()
+            results['delta'][index] = np.where(
+                calls, call_scale * (h + h_z / v_in), put_scale * h_z / (S_in * v_in)
+            )
+        if 'gamma' in requested:
+            h_zz = field_derivative(z_derivative=2)
+            results['gamma'][index] = np.where(
+                calls,
+                call_scale * (h_z + h_zz / v_in) / (S_in * v_in),
+                put_scale * (h_zz - v_in * h_z) / (S_in * v_in) ** 2
+            )
+        if 'vega' in requested:
+            h_v = field_derivative(v_derivative=1)
+            scale = np.where(calls, call_scale * S_in, put_scale)
+            results['vega'][index] = scale * np.sqrt(T_in) * (h_v - z_in * h_z / v_in)
+
+        outside = np.nonzero(~inside)
+        if outside[0].size:
+            exact = self._exact_greeks(
+                *(a[outside] for a in (S, K, T, r, sigma, q, is_call)), requested
+            )
+            for name in requested:
+                results[name][outside] = exact[name]
+
+        self.queries += S.size
+        self.fallbacks += int((~inside).sum())
+        return {name: values.reshape(shape) for name, values in results.items()}
+
+    def stats(self):
+        """
+        Returns:
+            dict: queries, fallbacks and fallback_rate
+        """
+        return {
+            'queries': self.queries,
+            'fallbacks': self.fallbacks,
+            'fallback_rate': self.fallbacks / self.queries if self.queries else 0.0,
+        }
+
+
+def _measure_error(index, samples, seed=0):
+    """
+    Largest interpolation error at cell midpoints, per field
+
+    Midpoints are where cubic interpolation is least accurate; with more
+    cells than samples a random subset is checked.
+    """
+    metadata = index.metadata
+    n_z, n_v = metadata['shape']
+    first_cell = int(np.ceil(metadata['min_total_vol'] / index._v_step))
+    cells = (n_z - 1) * (n_v - 1 - first_cell)
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(cells, size=min(samples, cells), replace=False)
+    z_cell, v_cell = np.divmod(chosen, n_v - 1 - first_cell)
+    z = (z_cell + 0.5) * index._z_step - metadata['moneyness_limit']
+    v = (v_cell + first_cell + 0.5) * index._v_step
+
+    exact = _normalized_prices(z, v, metadata)
+    stencil = index._stencil(z, v)
+    return {
+        name: float(np.abs(index._interpolate(field, stencil) - exact[field]).max())
+        for field, name in enumerate(('call', 'put'))
+    }
+
+
+def build_surface_index(path, exercise='european', T=None, r=None, q=0.0, model='black-scholes',
+                        shape=DEFAULT_SHAPE, moneyness_limit=DEFAULT_MONEYNESS_LIMIT,
+                        max_total_vol=DEFAULT_MAX_TOTAL_VOL, min_total_vol=DEFAULT_MIN_TOTAL_VOL,
+                        steps=LATTICE_STEPS, method=LATTICE_METHOD,
+                        error_samples=DEFAULT_ERROR_SAMPLES):
+    """
+    Price the (z, v) table, write it to path and measure its error bound
+
+    The table is written to a memory-mapped .npy file in chunks of rows, so
+    it never has to fit in memory twice, and its description (axes,
+    exercise style, parameters and max_error) to a .json file of the same
+    name. European tables come from the closed form; American ones from
+    the lattice and take far longer to build.
+
+    Parameters:
+    path (str): Table file, conventionally ending in .npy
+    exercise (str): One of lattice.EXERCISE_STYLES
+    T (float): Time to maturity (in years); American tables only
+    r (float): Risk-free interest rate; American tables only
+    q (float): Continuous dividend yield; American tables only
+    model (str): One of black_scholes.MODELS; American tables only
+    shape (tuple): Nodes along (z, v), at least 4 each
+    moneyness_limit (float): Table covers -limit <= z <= limit
+    max_total_vol (float): Table covers 0 <= v <= max_total_vol
+    min_total_vol (float): Smallest v answered from the table
+    steps (int): Lattice time steps; American tables only
+    method (str): One of lattice.LATTICE_METHODS; American tables only
+    error_samples (int): Cell midpoints checked against the exact pricer
+
+    Returns:
+    SurfaceIndex: Index backed by the new file
+    """
+    if exercise not in EXERCISE_STYLES:
+        raise ValueError(f"Unknown exercise style {exercise!r}; expected one of {EXERCISE_STYLES}")
+    n_z, n_v = (int(n) for n in shape)
+    if min(n_z, n_v) < 4:
+        raise ValueError("A surface index needs at least 4 nodes along each axis")
+
+    metadata = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'exercise': exercise,
+        'shape': [n_z, n_v],
+        'moneyness_limit': float(moneyness_limit),
+        'max_total_vol': float(max_total_vol),
+        'min_total_vol': float(min_total_vol),
+    }
+    if exercise == 'american':
+        if T is None or r is None or T <= 0:
+            raise ValueError("American tables need a positive maturity T and a rate r")
+        metadata.update(T=float(T), r=float(r), q=float(_carry_yield(r, q, model)),
+                        steps=int(steps), method=method)
+
+    z_axis = np.linspace(-moneyness_limit, moneyness_limit, n_z)
+    v_axis = np.linspace(0.0, max_total_vol, n_v)
+    table = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(2, n_z, n_v))
+    rows_per_chunk = max(1, _BUILD_CHUNK_NODES // n_v)
+    for start in range(0, n_z, rows_per_chunk):
+        rows = slice(start, start + rows_per_chunk)
+        table[0, rows], table[1, rows] = _normalized_prices(
+            z_axis[rows, np.newaxis], v_axis[np.newaxis, :], metadata
+        )
+    table.flush()
+    del table
+
+    index = SurfaceIndex(np.load(path, mmap_mode='r'), metadata)
+    metadata['max_error'] = _measure_error(index, error_samples)
+    with open(_metadata_path(path), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return index
+
+
+def load_surface_index(path):
+    """
+    Open a table written by build_surface_index as a read-only memory map
+
+    Only the pages a query touches are read from disk, so opening even a
+    large table is immediate and processes share one copy in the page cache.
+
+    Parameters:
+    path (str): Table file passed to build_surface_index
+
+    Returns:
+    SurfaceIndex: Index backed by the file
+
+    Raises:
+    ValueError: If the files were written with another format version or
+        do not match each other
+    """
+    with open(_metadata_path(path)) as f:
+        metadata = json.load(f)
+    if metadata.get('format_version') != INDEX_FORMAT_VERSION:
+        raise ValueError(
+            f"Surface index format {metadata.get('format_version')} is not supported; "
+            f"expected {INDEX_FORMAT_VERSION}"
+        )
+    table = np.load(path, mmap_mode='r')
+    if table.shape != (2, *metadata['shape']):
+        raise ValueError(f"Surface index table has shape {table.shape}; "
+                         f"metadata describes {(2, *metadata['shape'])}")
+    return SurfaceIndex(table, metadata)
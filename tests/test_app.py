@@ -0,0 +1,65 @@
+"""
+End-to-end tests of the Streamlit app through streamlit.testing, run
+against a fresh database in a temporary directory
+"""
+
+import os
+
+import pytest
+
+from ui.sidebar import AMERICAN_MAX_GRID_RESOLUTION, GRID_RESOLUTION_OPTIONS
+
+AppTest = pytest.importorskip('streamlit.testing.v1').AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app after its first run, saving to options.db in tmp_path"""
+    import streamlit as st
+
+    monkeypatch.chdir(tmp_path)
+    # The read pool and writer are process-wide resources bound to a path
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP_PATH, default_timeout=120).run()
+    assert not at.exception
+    yield at
+    st.cache_resource.clear()
+
+
+def _widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+@pytest.mark.parametrize('resolution', GRID_RESOLUTION_OPTIONS)
+def test_grid_resolution_gives_exactly_n_by_n(app, resolution):
+    _widget(app.select_slider, 'Grid Resolution').set_value(resolution).run()
+    assert not app.exception
+    assert app.caption[0].value.startswith(f"Computed {resolution}×{resolution} grid")
+
+
+def test_american_grid_resolution_gives_exactly_n_by_n(app):
+    _widget(app.radio, 'Exercise Style').set_value('American').run()
+    _widget(app.select_slider, 'Grid Resolution').set_value(AMERICAN_MAX_GRID_RESOLUTION).run()
+    assert not app.exception
+    size = AMERICAN_MAX_GRID_RESOLUTION
+    assert app.caption[0].value.startswith(f"Computed {size}×{size} grid")
+
+
+def test_save_reports_success_on_the_same_rerun(app):
+    _widget(app.button, 'Save to Database').click().run()
+    assert not app.exception
+    assert any('saved successfully' in message.value for message in app.success)
+    assert not app.info
+
+
+def test_save_reports_failure_on_the_same_rerun(app, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr('utils.persistence.insert_calculation', fail)
+    _widget(app.button, 'Save to Database').click().run()
+    assert not app.exception
+    assert any('disk full' in message.value for message in app.error)
+    assert not app.success
@@ -0,0 +1,112 @@
+"""
+Batch pricing tests: CSV and Parquet round trips through both CSV backends,
+chunk boundaries and re-pricing files that already hold priced columns
+"""
+
+import csv
+
+import numpy as np
+import pytest
+
+import batch_pricing
+from batch_pricing import OUTPUT_COLUMNS, iter_csv_chunks, price_chunk, run_batch
+
+GREEKS = ('delta', 'gamma', 'vega')
+
+
+@pytest.fixture(params=('pyarrow', 'numpy'))
+def csv_backend(request, monkeypatch):
+    """Run the test with pyarrow.csv and again with the np.loadtxt/savetxt fallback"""
+    if request.param == 'pyarrow':
+        pytest.importorskip('pyarrow.csv')
+    else:
+        monkeypatch.setattr(batch_pricing, '_pyarrow_csv', lambda: None)
+    return request.param
+
+
+def _write_input(path, n_rows, seed=0):
+    """Write a CSV of random contracts with an id column and mixed option types"""
+    rng = np.random.default_rng(seed)
+    columns = {
+        'id': [f'row {i}, "quoted"' if i % 7 == 0 else f'row {i}' for i in range(n_rows)],
+        'spot': np.round(rng.uniform(50.0, 150.0, n_rows), 4),
+        'strike': np.full(n_rows, 100),
+        'expiry': np.round(rng.uniform(0.1, 2.0, n_rows), 3),
+        'rate': np.full(n_rows, 0.05),
+        'volatility': np.round(rng.uniform(0.1, 0.5, n_rows), 3),
+        'option_type': ['call' if i % 2 else 'put' for i in range(n_rows)],
+    }
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+    return columns
+
+
+def _read_output(path):
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    return {name: [row[name] for row in rows] for name in rows[0]}
+
+
+@pytest.mark.parametrize('n_rows, chunk_size', [(25, 10), (30, 10), (7, 100)])
+def test_csv_round_trip_matches_price_chunk(tmp_path, csv_backend, n_rows, chunk_size):
+    columns = _write_input(tmp_path / 'in.csv', n_rows)
+    rows = run_batch(str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv'),
+                     chunk_size=chunk_size, greeks=GREEKS, progress=None)
+    assert rows == n_rows
+
+    output = _read_output(tmp_path / 'out.csv')
+    expected = price_chunk(columns, GREEKS)
+    assert list(output) == list(columns) + list(expected)
+    assert output['id'] == columns['id']
+    assert output['option_type'] == columns['option_type']
+    np.testing.assert_allclose(np.asarray(output['spot'], dtype=float), columns['spot'])
+    for name, values in expected.items():
+        # Floats are written with round-trip precision
+        np.testing.assert_array_equal(np.asarray(output[name], dtype=float), values)
+
+
+def test_csv_chunks_hold_chunk_size_rows(tmp_path, csv_backend):
+    _write_input(tmp_path / 'in.csv', 25)
+    chunks = list(iter_csv_chunks(str(tmp_path / 'in.csv'), chunk_size=10))
+    assert [len(chunk['spot']) for chunk in chunks] == [10, 10, 5]
+    assert all(isinstance(column, np.ndarray) for chunk in chunks for column in chunk.values())
+
+
+def test_repricing_a_csv_replaces_the_earlier_priced_columns(tmp_path, csv_backend):
+    _write_input(tmp_path / 'in.csv', 12)
+    run_batch(str(tmp_path / 'in.csv'), str(tmp_path / 'first.csv'),
+              greeks=('delta', 'gamma', 'rho'), progress=None)
+    run_batch(str(tmp_path / 'first.csv'), str(tmp_path / 'second.csv'),
+              greeks=('delta',), progress=None)
+
+    first = _read_output(tmp_path / 'first.csv')
+    second = _read_output(tmp_path / 'second.csv')
+    assert [name for name in second if name in OUTPUT_COLUMNS] == ['call_price', 'put_price', 'delta']
+    assert second['delta'] == first['delta']
+
+
+def test_repricing_a_parquet_file_drops_stale_greeks(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    n_rows = 10
+    columns = _write_input(tmp_path / 'in.csv', n_rows)
+    stale = {'call_price': np.full(n_rows, -1.0), 'gamma': np.full(n_rows, 123.0)}
+    pq.write_table(pa.table({**columns, **stale}), tmp_path / 'in.parquet')
+    run_batch(str(tmp_path / 'in.parquet'), str(tmp_path / 'out.parquet'),
+              greeks=('delta',), progress=None)
+
+    output = pq.read_table(tmp_path / 'out.parquet').to_pydict()
+    assert 'gamma' not in output
+    for name, values in price_chunk(columns, ('delta',)).items():
+        np.testing.assert_array_equal(output[name], values)
+
+
+def test_unknown_greek_is_rejected_before_the_output_is_touched(tmp_path):
+    _write_input(tmp_path / 'in.csv', 3)
+    output = tmp_path / 'out.csv'
+    output.write_text('keep me')
+    with pytest.raises(ValueError):
+        run_batch(str(tmp_path / 'in.csv'), str(output), greeks=('speed',), progress=None)
+    assert output.read_text() == 'keep me'
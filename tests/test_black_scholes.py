@@ -0,0 +1,154 @@
+"""
+Accuracy tests for the normal CDF/PDF kernel, the Black-Scholes prices and
+the analytic Greeks
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from black_scholes import (
+    FAST_CDF_MAX_ERROR, GREEK_NAMES, black_scholes_prices, calculate_call_price, calculate_greeks,
+    calculate_put_price, norm_cdf, norm_pdf
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _reference_call_price(S, K, T, r, sigma):
+    """Scalar call price as the original implementation computed it"""
+    if T <= 0 or sigma <= 0:
+        return max(S - K, 0)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
+    d2 = d1 - sigma * np.sqrt(T)
+    return max(S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2), 0)
+
+
+def _reference_put_price(S, K, T, r, sigma):
+    """Scalar put price from put-call parity, as originally computed"""
+    call_price = _reference_call_price(S, K, T, r, sigma)
+    return max(call_price - S + K * np.exp(-r * T), 0)
+
+
+@pytest.fixture(scope='module')
+def contracts():
+    """Random contracts covering deep in- and out-of-the-money strikes"""
+    rng = np.random.default_rng(12)
+    n = 500
+    return (rng.uniform(10.0, 200.0, n), rng.uniform(10.0, 200.0, n),
+            rng.uniform(0.01, 3.0, n), rng.uniform(0.0, 0.1, n), rng.uniform(0.05, 1.0, n))
+
+
+def test_norm_cdf_matches_scipy():
+    x = np.linspace(-38.0, 38.0, 20_001)
+    np.testing.assert_allclose(norm_cdf(x), norm.cdf(x), rtol=1e-14, atol=0)
+
+
+def test_norm_cdf_scalar_matches_scipy():
+    for x in (-8.5, -1.0, 0.0, 0.3, 6.0):
+        assert abs(float(norm_cdf(x)) - norm.cdf(x)) <= 1e-14
+
+
+def test_norm_pdf_matches_scipy():
+    x = np.linspace(-38.0, 38.0, 20_001)
+    np.testing.assert_allclose(norm_pdf(x), norm.pdf(x), rtol=1e-14, atol=1e-300)
+
+
+def test_fast_norm_cdf_is_within_its_error_bound():
+    x = np.linspace(-40.0, 40.0, 400_001)
+    fast = norm_cdf(x, precision='fast')
+    assert np.abs(fast - norm.cdf(x)).max() < FAST_CDF_MAX_ERROR
+    assert np.all((fast >= 0.0) & (fast <= 1.0))
+    assert np.all(np.diff(fast) >= 0.0)
+    assert float(norm_cdf(0.3, precision='fast')) == pytest.approx(norm.cdf(0.3), abs=FAST_CDF_MAX_ERROR)
+
+
+def test_fast_prices_are_within_the_cdf_error_bound(contracts):
+    S, K = contracts[:2]
+    for fast, exact in zip(black_scholes_prices(*contracts, precision='fast'),
+                           black_scholes_prices(*contracts)):
+        assert np.all(np.abs(fast - exact) <= 2 * FAST_CDF_MAX_ERROR * (S + K))
+
+
+def test_fast_precision_does_not_import_scipy():
+    code = ("import sys, black_scholes; "
+            "black_scholes.black_scholes_prices(100.0, 100.0, 1.0, 0.05, 0.2, precision='fast'); "
+            "sys.exit('scipy' in sys.modules)")
+    assert subprocess.run([sys.executable, '-c', code], cwd=ROOT).returncode == 0
+
+
+def test_unknown_precision_raises_value_error():
+    with pytest.raises(ValueError):
+        norm_cdf(0.0, precision='half')
+
+
+def test_scalar_prices_match_original_formula(contracts):
+    for S, K, T, r, sigma in zip(*contracts):
+        assert calculate_call_price(S, K, T, r, sigma) == pytest.approx(
+            _reference_call_price(S, K, T, r, sigma), rel=1e-12, abs=1e-12)
+        assert calculate_put_price(S, K, T, r, sigma) == pytest.approx(
+            _reference_put_price(S, K, T, r, sigma), rel=1e-12, abs=1e-12)
+
+
+def test_array_prices_match_original_formula(contracts):
+    call_prices, put_prices = black_scholes_prices(*contracts)
+    expected_calls = [_reference_call_price(*c) for c in zip(*contracts)]
+    expected_puts = [_reference_put_price(*c) for c in zip(*contracts)]
+    np.testing.assert_allclose(call_prices, expected_calls, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(put_prices, expected_puts, rtol=1e-12, atol=1e-12)
+
+
+def test_expired_and_zero_vol_contracts_are_intrinsic():
+    call_prices, put_prices = black_scholes_prices([110.0, 90.0], 100.0, [0.0, 1.0], 0.05, [0.2, 0.0])
+    assert call_prices[0] == _reference_call_price(110.0, 100.0, 0.0, 0.05, 0.2)
+    assert put_prices[0] == _reference_put_price(110.0, 100.0, 0.0, 0.05, 0.2)
+    assert call_prices[1] == _reference_call_price(90.0, 100.0, 1.0, 0.05, 0.0)
+
+
+def _bumped_price(S, K, T, r, sigma, is_call, q, model):
+    call_prices, put_prices = black_scholes_prices(S, K, T, r, sigma, q, model)
+    return np.where(is_call, call_prices, put_prices)
+
+
+def _finite_difference_greeks(S, K, T, r, sigma, is_call, q, model):
+    """Every Greek from central differences of black_scholes_prices"""
+    def price(dS=0.0, dT=0.0, dr=0.0, dsigma=0.0):
+        return _bumped_price(S + dS, K, T + dT, r + dr, sigma + dsigma, is_call, q, model)
+
+    hS, hT, hr, hsigma = 1e-4 * S, 1e-5, 1e-5, 1e-4
+
+    def delta(dT=0.0):
+        return (price(hS, dT) - price(-hS, dT)) / (2 * hS)
+
+    return {
+        'delta': delta(),
+        'gamma': (price(hS) - 2 * price() + price(-hS)) / hS ** 2,
+        'vega': (price(dsigma=hsigma) - price(dsigma=-hsigma)) / (2 * hsigma),
+        # Theta and charm are per year of calendar time, i.e. -d/dT
+        'theta': -(price(dT=hT) - price(dT=-hT)) / (2 * hT),
+        'rho': (price(dr=hr) - price(dr=-hr)) / (2 * hr),
+        'vanna': (price(hS, dsigma=hsigma) - price(hS, dsigma=-hsigma)
+                  - price(-hS, dsigma=hsigma) + price(-hS, dsigma=-hsigma)) / (4 * hS * hsigma),
+        'volga': (price(dsigma=hsigma) - 2 * price() + price(dsigma=-hsigma)) / hsigma ** 2,
+        'charm': -(delta(hT) - delta(-hT)) / (2 * hT),
+    }
+
+
+@pytest.mark.parametrize('q, model', [(0.0, 'black-scholes'), (0.03, 'black-scholes'),
+                                      (0.0, 'black-76')])
+@pytest.mark.parametrize('is_call', (True, False))
+def test_greeks_match_finite_differences(q, model, is_call):
+    rng = np.random.default_rng(5)
+    n = 200
+    S, K = rng.uniform(60.0, 140.0, n), rng.uniform(80.0, 120.0, n)
+    T, r, sigma = rng.uniform(0.1, 2.0, n), rng.uniform(0.0, 0.08, n), rng.uniform(0.1, 0.6, n)
+    greeks = calculate_greeks(S, K, T, r, sigma, is_call=is_call, q=q, model=model)
+    expected = _finite_difference_greeks(S, K, T, r, sigma, is_call, q, model)
+    assert set(greeks) == set(GREEK_NAMES)
+    for name in GREEK_NAMES:
+        np.testing.assert_allclose(greeks[name], expected[name], rtol=1e-4, atol=1e-5,
+                                   err_msg=name)
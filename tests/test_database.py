@@ -0,0 +1,307 @@
+"""
+Database tests: saving and loading calculations through a temporary database
+"""
+
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from black_scholes import black_scholes_prices
+from database import (
+    ADDED_INPUT_COLUMNS, SCHEMA_VERSION, SURFACE_FORMAT_VERSION, find_nearest_calculations,
+    find_saved_surface, init_database, list_calculations, load_calculation, save_calculation
+)
+from utils.calculations import calculate_pricing_grid
+from utils.persistence import ConnectionPool
+
+INPUT_PARAMS = {
+    'StockPrice': 100.0, 'StrikePrice': 100.0, 'InterestRate': 0.05,
+    'Volatility': 0.2, 'TimeToMaturity': 1.0,
+}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_database(str(tmp_path / 'options.db'))
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope='module')
+def pricing_result():
+    """A non-square grid, so rows and columns cannot be confused"""
+    return calculate_pricing_grid(np.linspace(80.0, 120.0, 7), np.linspace(0.1, 0.4, 5),
+                                  100.0, 1.0, 0.05)
+
+
+def _assert_same_grid(loaded, expected):
+    for name in ('spot_prices', 'volatilities', 'call_prices', 'put_prices'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(expected, name))
+
+
+def test_connection_uses_wal_pragmas(conn):
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+def test_rows_round_trip(conn, pricing_result):
+    calculation_id = save_calculation(conn, INPUT_PARAMS, pricing_result)
+    input_params, loaded = load_calculation(conn, calculation_id)
+    assert {name: input_params[name] for name in INPUT_PARAMS} == INPUT_PARAMS
+    assert input_params['ExerciseStyle'] == 'european'
+    _assert_same_grid(loaded, pricing_result)
+    assert conn.execute("SELECT COUNT(*) FROM BlackScholesOutput").fetchone()[0] == 2 * 7 * 5
+
+
+def test_several_saves_keep_their_own_rows(conn, pricing_result):
+    other = pricing_result.with_purchase_price(3.0)
+    first = save_calculation(conn, INPUT_PARAMS, pricing_result)
+    second = save_calculation(conn, {**INPUT_PARAMS, 'StockPrice': 101.0}, other)
+    assert second != first
+    _assert_same_grid(load_calculation(conn, first)[1], pricing_result)
+    assert load_calculation(conn, second)[0]['StockPrice'] == 101.0
+
+
+def test_failed_save_rolls_back(conn):
+    with pytest.raises(AttributeError):
+        save_calculation(conn, INPUT_PARAMS, None)
+    assert conn.execute("SELECT COUNT(*) FROM BlackScholesInput").fetchone()[0] == 0
+
+
+def test_missing_calculation_raises_key_error(conn):
+    with pytest.raises(KeyError):
+        load_calculation(conn, 42)
+
+
+@pytest.mark.parametrize('compression', (None, 'zlib'))
+def test_blob_round_trip_is_exact(conn, pricing_result, compression):
+    calculation_id = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob',
+                                      compression=compression)
+    _assert_same_grid(load_calculation(conn, calculation_id)[1], pricing_result)
+    stored = conn.execute("SELECT Compression FROM BlackScholesSurface").fetchone()[0]
+    assert stored == (compression or 'none')
+    assert conn.execute("SELECT COUNT(*) FROM BlackScholesOutput").fetchone()[0] == 0
+
+
+def test_rows_and_blob_load_the_same_grid(conn, pricing_result):
+    rows_id = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='rows')
+    blob_id = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob',
+                               compression='zlib')
+    _assert_same_grid(load_calculation(conn, blob_id)[1], load_calculation(conn, rows_id)[1])
+
+
+def test_compressed_blobs_are_smaller_for_smooth_grids(conn):
+    grid = calculate_pricing_grid(np.full(200, 100.0), np.full(200, 0.2), 100.0, 1.0, 0.05)
+    sizes = []
+    for compression in (None, 'zlib'):
+        calculation_id = save_calculation(conn, INPUT_PARAMS, grid, storage='blob',
+                                          compression=compression)
+        sizes.append(conn.execute(
+            "SELECT LENGTH(CallPrices) FROM BlackScholesSurface WHERE CalculationID = ?",
+            (calculation_id,)
+        ).fetchone()[0])
+        _assert_same_grid(load_calculation(conn, calculation_id)[1], grid)
+    assert sizes[1] < sizes[0]
+
+
+def test_float32_blobs_round_to_single_precision(conn, pricing_result):
+    calculation_id = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob',
+                                      dtype=np.float32)
+    loaded = load_calculation(conn, calculation_id)[1]
+    assert loaded.call_prices.dtype == np.float32
+    np.testing.assert_array_equal(loaded.call_prices, pricing_result.call_prices.astype(np.float32))
+    np.testing.assert_array_equal(loaded.spot_prices, pricing_result.spot_prices)
+
+
+def test_newer_surface_format_is_rejected(conn, pricing_result):
+    calculation_id = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob')
+    with conn:
+        conn.execute("UPDATE BlackScholesSurface SET FormatVersion = ?",
+                     (SURFACE_FORMAT_VERSION + 1,))
+    with pytest.raises(ValueError):
+        load_calculation(conn, calculation_id)
+
+
+def _baseline_database(path, pricing_result):
+    """A database written by the original schema: one output row per cell"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE BlackScholesInput (
+            CalculationID INTEGER PRIMARY KEY AUTOINCREMENT,
+            StockPrice REAL, StrikePrice REAL, InterestRate REAL,
+            Volatility REAL, TimeToMaturity REAL
+        );
+        CREATE TABLE BlackScholesOutput (
+            CalculationOutputID INTEGER PRIMARY KEY AUTOINCREMENT,
+            VolatilityShock REAL, StockPriceShock REAL, OptionPrice REAL, IsCall INTEGER,
+            CalculationID INTEGER,
+            FOREIGN KEY (CalculationID) REFERENCES BlackScholesInput(CalculationID)
+        );
+    ''')
+    cursor = conn.execute(
+        "INSERT INTO BlackScholesInput (StockPrice, StrikePrice, InterestRate, Volatility, "
+        "TimeToMaturity) VALUES (?, ?, ?, ?, ?)",
+        tuple(INPUT_PARAMS.values())
+    )
+    calculation_id = cursor.lastrowid
+    # The original app looped over calls then puts, spot-major
+    for is_call, prices in ((1, pricing_result.call_prices), (0, pricing_result.put_prices)):
+        for i, spot in enumerate(pricing_result.spot_prices):
+            for j, vol in enumerate(pricing_result.volatilities):
+                conn.execute(
+                    "INSERT INTO BlackScholesOutput (VolatilityShock, StockPriceShock, "
+                    "OptionPrice, IsCall, CalculationID) VALUES (?, ?, ?, ?, ?)",
+                    (float(vol), float(spot), float(prices[i, j]), is_call, calculation_id)
+                )
+    conn.commit()
+    conn.close()
+    return calculation_id
+
+
+def test_baseline_database_is_migrated_in_place(tmp_path, pricing_result):
+    path = str(tmp_path / 'baseline.db')
+    old_id = _baseline_database(path, pricing_result)
+
+    conn = init_database(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(BlackScholesInput)")}
+        assert set(ADDED_INPUT_COLUMNS) <= columns
+
+        input_params, loaded = load_calculation(conn, old_id)
+        for name, (_, default) in ADDED_INPUT_COLUMNS.items():
+            assert input_params[name] == default
+        _assert_same_grid(loaded, pricing_result)
+
+        new_id = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob')
+        assert new_id > old_id
+        _assert_same_grid(load_calculation(conn, new_id)[1], pricing_result)
+    finally:
+        conn.close()
+
+    # Opening an up-to-date database again changes nothing
+    conn = init_database(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM BlackScholesInput").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+
+def test_shipped_database_migrates_and_loads(tmp_path):
+    path = tmp_path / 'options.db'
+    path.write_bytes((Path(__file__).resolve().parent.parent / 'options.db').read_bytes())
+    conn = init_database(str(path))
+    try:
+        (calculation_id,) = conn.execute(
+            "SELECT MIN(CalculationID) FROM BlackScholesInput").fetchone()
+        input_params, loaded = load_calculation(conn, calculation_id)
+        assert loaded.shape == (len(loaded.spot_prices), len(loaded.volatilities))
+        call_prices, put_prices = black_scholes_prices(
+            loaded.spot_prices[:, None], input_params['StrikePrice'],
+            input_params['TimeToMaturity'], input_params['InterestRate'],
+            loaded.volatilities[None, :]
+        )
+        np.testing.assert_allclose(loaded.call_prices, call_prices, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(loaded.put_prices, put_prices, rtol=1e-9, atol=1e-9)
+    finally:
+        conn.close()
+
+
+def test_queries_on_an_empty_database(conn, pricing_result):
+    assert list_calculations(conn) == []
+    assert find_nearest_calculations(conn, INPUT_PARAMS) == []
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, pricing_result.spot_prices,
+                              pricing_result.volatilities) is None
+
+
+def test_list_calculations_pages_newest_first(conn, pricing_result):
+    ids = [save_calculation(conn, {**INPUT_PARAMS, 'StockPrice': 90.0 + i}, pricing_result,
+                            storage='blob' if i % 2 else 'rows') for i in range(5)]
+    first_page = list_calculations(conn, limit=3)
+    assert [row['CalculationID'] for row in first_page] == ids[::-1][:3]
+    assert [row['Storage'] for row in first_page] == ['rows', 'blob', 'rows']
+    second_page = list_calculations(conn, limit=3, before_id=first_page[-1]['CalculationID'])
+    assert [row['CalculationID'] for row in second_page] == ids[1::-1]
+
+
+def test_find_nearest_ranks_by_relative_distance(conn, pricing_result):
+    near = save_calculation(conn, {**INPUT_PARAMS, 'StockPrice': 101.0}, pricing_result)
+    nearer = save_calculation(conn, {**INPUT_PARAMS, 'Volatility': 0.201}, pricing_result)
+    far = save_calculation(conn, {**INPUT_PARAMS, 'StrikePrice': 110.0}, pricing_result)
+    matches = find_nearest_calculations(conn, INPUT_PARAMS)
+    assert [match['CalculationID'] for match in matches] == [nearer, near, far]
+    assert matches[0]['Distance'] == pytest.approx(0.005)
+    assert matches[1]['Distance'] == pytest.approx(0.01)
+    assert [m['CalculationID'] for m in find_nearest_calculations(conn, INPUT_PARAMS, limit=1)] \
+        == [nearer]
+
+
+def test_find_nearest_skips_calculations_outside_the_tolerance(conn, pricing_result):
+    save_calculation(conn, {**INPUT_PARAMS, 'StockPrice': 130.0}, pricing_result)
+    inside = save_calculation(conn, {**INPUT_PARAMS, 'TimeToMaturity': 1.2}, pricing_result)
+    assert [m['CalculationID'] for m in find_nearest_calculations(conn, INPUT_PARAMS)] == [inside]
+    assert find_nearest_calculations(conn, INPUT_PARAMS, tolerance=0.1) == []
+
+
+def test_find_saved_surface_matches_only_the_same_grid(conn, pricing_result):
+    spot_prices, volatilities = pricing_result.spot_prices, pricing_result.volatilities
+    save_calculation(conn, INPUT_PARAMS, pricing_result, storage='rows')
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, spot_prices, volatilities) is None
+
+    older = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob')
+    newer = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob',
+                             compression='zlib')
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, spot_prices, volatilities) == newer
+    assert older < newer
+    # Scalars match within the tolerance, axes exactly
+    assert find_saved_surface(conn, 100.0 + 1e-12, 1.0, 0.05, spot_prices, volatilities) == newer
+    assert find_saved_surface(conn, 100.5, 1.0, 0.05, spot_prices, volatilities) is None
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, spot_prices + 1e-6, volatilities) is None
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, spot_prices[:-1], volatilities) is None
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, spot_prices, volatilities,
+                              exercise_style='american') is None
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, spot_prices, volatilities,
+                              dividend_yield=0.02) is None
+    assert find_saved_surface(conn, 100.0, 1.0, 0.05, spot_prices, volatilities,
+                              model='black-76') is None
+
+
+def test_pool_connections_read_saved_calculations_only(tmp_path, pricing_result):
+    path = str(tmp_path / 'options.db')
+    conn = init_database(path)
+    calculation_id = save_calculation(conn, INPUT_PARAMS, pricing_result, storage='blob')
+    conn.close()
+
+    pool = ConnectionPool(path, size=1, timeout=0.1)
+    try:
+        with pool.connection() as read_conn:
+            _assert_same_grid(load_calculation(read_conn, calculation_id)[1], pricing_result)
+            with pytest.raises(sqlite3.OperationalError):
+                save_calculation(read_conn, INPUT_PARAMS, pricing_result)
+
+            # The only connection is borrowed, so another thread times out
+            errors = []
+
+            def borrow():
+                try:
+                    with pool.connection():
+                        pass
+                except queue.Empty as e:
+                    errors.append(e)
+
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            thread.join()
+            assert len(errors) == 1
+
+        # Returned connections are reused
+        with pool.connection() as again:
+            assert again is read_conn
+    finally:
+        pool.close()
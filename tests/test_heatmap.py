@@ -0,0 +1,46 @@
+"""
+Heatmap figure tests: hover and label templates for money and non-money
+values and for other axis pairs
+"""
+
+import numpy as np
+import pytest
+
+from utils.heatmap import HOVER_TEMPLATE, create_heatmap_figure
+
+pytest.importorskip('plotly')
+
+SPOT_PRICES = np.linspace(80.0, 120.0, 5)
+VOLATILITIES = np.linspace(0.1, 0.5, 5)
+GRID = np.linspace(-1.0, 1.0, 25).reshape(5, 5)
+
+
+def test_pnl_figure_keeps_the_dollar_templates():
+    trace = create_heatmap_figure(GRID, SPOT_PRICES, VOLATILITIES).data[0]
+    assert trace.hovertemplate == HOVER_TEMPLATE
+    assert trace.texttemplate == '$%{z:.2f}'
+    assert trace.colorbar.title.text == 'PnL ($)'
+
+
+def test_unitless_values_get_no_dollar_sign():
+    trace = create_heatmap_figure(GRID, SPOT_PRICES, VOLATILITIES, value_label='Delta',
+                                  value_unit='', value_format='.4f').data[0]
+    assert '$%{z' not in trace.hovertemplate
+    assert 'Delta: %{z:.4f}' in trace.hovertemplate
+    assert trace.texttemplate == '%{z:.4f}'
+    assert trace.colorbar.title.text == 'Delta'
+
+
+def test_other_axes_and_units_are_used_on_hover():
+    trace = create_heatmap_figure(GRID, SPOT_PRICES, np.linspace(0.25, 2.0, 5), x_axis='maturity',
+                                  value_label='Price', value_unit='EUR', value_format='.3f').data[0]
+    assert 'Time to Maturity: %{x:.2f}' in trace.hovertemplate
+    assert 'Price: %{z:.3f}' in trace.hovertemplate
+    assert trace.colorbar.title.text == 'Price (EUR)'
+
+
+def test_dollar_format_other_than_the_default_keeps_the_prefix():
+    trace = create_heatmap_figure(GRID, SPOT_PRICES, VOLATILITIES, value_label='Price',
+                                  value_format='$.4f').data[0]
+    assert 'Price: $%{z:.4f}' in trace.hovertemplate
+    assert trace.texttemplate == '$%{z:.4f}'
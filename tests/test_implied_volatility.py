@@ -0,0 +1,86 @@
+"""
+Accuracy tests for the vectorized implied volatility solver, using the
+brentq solver as the reference
+"""
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from black_scholes import black_scholes_prices, calculate_greeks
+from implied_volatility import implied_volatility, implied_volatility_brentq
+
+
+@pytest.fixture(scope='module')
+def quotes():
+    """Random call and put quotes priced from known volatilities"""
+    rng = np.random.default_rng(4)
+    n = 5000
+    S, K = rng.uniform(50.0, 150.0, n), rng.uniform(50.0, 150.0, n)
+    T, r = rng.uniform(0.01, 2.0, n), rng.uniform(0.0, 0.1, n)
+    sigma = rng.uniform(0.05, 1.0, n)
+    is_call = rng.random(n) < 0.5
+    call_prices, put_prices = black_scholes_prices(S, K, T, r, sigma)
+    return np.where(is_call, call_prices, put_prices), S, K, T, r, sigma, is_call
+
+
+def test_matches_brentq(quotes):
+    price, S, K, T, r, sigma, is_call = quotes
+    # Price rounding (~1e-14) moves the implied vol by ~1e-14 / vega, so
+    # compare where vega makes the quote determine sigma tightly
+    vega = calculate_greeks(S, K, T, r, sigma, True, ['vega'])['vega']
+    determined = vega >= 1e-4
+    implied_vol = implied_volatility(price, S, K, T, r, is_call)
+    reference = implied_volatility_brentq(price[determined], S[determined], K[determined],
+                                          T[determined], r[determined], is_call[determined])
+    np.testing.assert_allclose(implied_vol[determined], reference, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(implied_vol[determined], sigma[determined], rtol=0, atol=1e-9)
+
+
+def test_every_valid_quote_is_solved(quotes):
+    price, S, K, T, r, _, is_call = quotes
+    assert not np.isnan(implied_volatility(price, S, K, T, r, is_call)).any()
+
+
+def test_small_time_value_is_not_zero_vol():
+    S, K, T, r, sigma = 140.56, 50.37, 0.065, 0.05, 0.623
+    call_price, _ = black_scholes_prices(S, K, T, r, sigma)
+    # The out-of-the-money put priced directly, not through parity
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
+    d2 = d1 - sigma * np.sqrt(T)
+    put_price = K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+    assert implied_volatility(put_price, S, K, T, r, False) == pytest.approx(sigma, abs=1e-9)
+    # The call's time value is below its price resolution, so only the put
+    # pins sigma down tightly; the call must still not collapse to zero
+    assert implied_volatility(call_price, S, K, T, r, True) == pytest.approx(sigma, abs=1e-3)
+
+
+def test_deep_out_of_the_money_quotes():
+    S, K, T, r, sigma = 54.0, 150.0, 0.12, 0.06, 0.2
+    call_price, _ = black_scholes_prices(S, K, T, r, sigma)
+    assert 0.0 < call_price < 1e-40
+    assert implied_volatility(call_price, S, K, T, r) == pytest.approx(sigma, rel=1e-9)
+
+
+def test_prices_at_the_lower_bound_are_zero_vol():
+    S, K, T, r = 110.0, 100.0, 1.0, 0.05
+    intrinsic_call = S - K * np.exp(-r * T)
+    assert implied_volatility(intrinsic_call, S, K, T, r, True) == 0.0
+    assert implied_volatility(0.0, S, K, T, r, False) == 0.0
+
+
+def test_arbitrage_violations_are_nan():
+    assert np.isnan(implied_volatility(120.0, 100.0, 100.0, 1.0, 0.05, True))
+    assert np.isnan(implied_volatility(1.0, 110.0, 100.0, 1.0, 0.05, True))
+    assert np.isnan(implied_volatility(5.0, 100.0, 100.0, 0.0, 0.05, True))
+
+
+@pytest.mark.parametrize('model, q', [('black-scholes', 0.03), ('black-76', 0.0)])
+def test_dividend_yield_and_black_76_round_trip(model, q):
+    S, K, T, r, sigma = 100.0, np.array([80.0, 100.0, 125.0]), 0.75, 0.04, 0.3
+    call_prices, put_prices = black_scholes_prices(S, K, T, r, sigma, q, model)
+    for price, is_call in ((call_prices, True), (put_prices, False)):
+        implied_vol = implied_volatility(price, S, K, T, r, is_call, q=q, model=model)
+        reference = implied_volatility_brentq(price, S, K, T, r, is_call, q=q, model=model)
+        np.testing.assert_allclose(implied_vol, sigma, atol=1e-10)
+        np.testing.assert_allclose(implied_vol, reference, atol=1e-10)
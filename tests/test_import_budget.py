@@ -0,0 +1,35 @@
+"""
+Import-time budget: library modules must not load scipy, Plotly, Streamlit,
+pandas or pyarrow at import time, and must import within their budgets.
+Set OPTIONS_IMPORT_BUDGET_SCALE to scale the budgets on slow machines, or
+to 0 to skip the timing check
+"""
+
+import importlib.util
+import os
+
+import pytest
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'benchmarks', 'import_budget.py')
+_spec = importlib.util.spec_from_file_location('import_budget', _SCRIPT)
+import_budget = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(import_budget)
+
+
+@pytest.mark.parametrize('module', import_budget.MODULE_BUDGETS_MS)
+def test_import_does_not_load_deferred_modules(module):
+    _, loaded, _ = import_budget.measure_import(module, runs=1)
+    assert loaded == [], f"{module} imports {loaded} at import time"
+
+
+@pytest.mark.parametrize('module, budget', import_budget.MODULE_BUDGETS_MS.items())
+def test_import_time_within_budget(module, budget):
+    scale = float(os.environ.get(import_budget.SCALE_ENV_VAR, 1.0))
+    if scale <= 0:
+        pytest.skip(f"{import_budget.SCALE_ENV_VAR}=0 disables the timing check")
+    milliseconds, _, slowest = import_budget.measure_import(module, runs=3)
+    assert milliseconds <= budget * scale, (
+        f"{module} imports in {milliseconds:.1f}ms, over its {budget * scale:.1f}ms budget; "
+        f"slowest imports: {slowest}"
+    )
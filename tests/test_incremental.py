@@ -0,0 +1,102 @@
+"""
+IncrementalGridEngine tests: every grid matches a from-scratch
+calculate_pricing_grid, and only cells that line up exactly are reused
+"""
+
+import numpy as np
+import pytest
+
+from utils.cache import quantize
+from utils.calculations import calculate_pricing_grid
+from utils.incremental import IncrementalGridEngine
+
+DEFAULTS = {
+    'min_spot': 80.0, 'max_spot': 120.0, 'min_vol': 0.04, 'max_vol': 0.30, 'points': 10,
+    'K': 100.0, 'T': 1.0, 'r': 0.05, 'q': 0.0, 'model': 'black-scholes',
+}
+
+# Slider and range changes applied one after another, as a session would
+SETTINGS_SEQUENCE = [
+    {},
+    {'purchase_price': 5.0},
+    {'max_spot': 121.0},
+    {'min_vol': 0.10},
+    {'points': 25},
+    {'points': 1000},
+    {'min_spot': 60.0, 'max_spot': 140.0, 'points': 100},
+    {'K': 105.0},
+    {'q': 0.02},
+    {'model': 'black-76'},
+    {'r': 0.08, 'model': 'black-76'},
+    {'T': 0.25},
+    {'min_vol': 0.3, 'max_vol': 0.3},
+    {},
+]
+
+
+def _axes(settings):
+    """Quantized uniform axes, as the app builds them"""
+    return (quantize(np.linspace(settings['min_spot'], settings['max_spot'], settings['points'])),
+            quantize(np.linspace(settings['min_vol'], settings['max_vol'], settings['points'])))
+
+
+def _compute(engine, settings):
+    spot_prices, volatilities = _axes(settings)
+    return engine.compute(
+        spot_prices, volatilities, settings['K'], settings['T'], settings['r'],
+        settings.get('purchase_price', 0.0), settings['q'], settings['model']
+    )
+
+
+def test_engine_matches_full_computation_across_setting_changes():
+    engine = IncrementalGridEngine()
+    for change in SETTINGS_SEQUENCE:
+        settings = {**DEFAULTS, **change}
+        result = _compute(engine, settings)
+        spot_prices, volatilities = _axes(settings)
+        expected = calculate_pricing_grid(
+            spot_prices, volatilities, settings['K'], settings['T'], settings['r'],
+            settings.get('purchase_price', 0.0), dividend_yield=settings['q'],
+            model=settings['model']
+        )
+        assert result.shape == (settings['points'], settings['points'])
+        np.testing.assert_array_equal(result.spot_prices, spot_prices)
+        np.testing.assert_array_equal(result.volatilities, volatilities)
+        np.testing.assert_allclose(result.call_prices, expected.call_prices, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(result.put_prices, expected.put_prices, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(result.call_pnl, expected.call_pnl, rtol=1e-12, atol=1e-12)
+
+
+def test_unchanged_axes_are_fully_reused():
+    engine = IncrementalGridEngine()
+    _compute(engine, DEFAULTS)
+    _compute(engine, {**DEFAULTS, 'purchase_price': 12.0})
+    assert engine.cells_computed == 100
+    assert engine.cells_reused == 100
+
+
+def test_extending_a_range_by_whole_steps_reuses_aligned_rows():
+    engine = IncrementalGridEngine()
+    volatilities = quantize(np.linspace(0.04, 0.30, 10))
+    # Step 5 in both cases, so the first 9 spot values line up exactly
+    for max_spot, points in ((120.0, 9), (125.0, 10)):
+        engine.compute(quantize(np.linspace(80.0, max_spot, points)), volatilities, 100.0, 1.0, 0.05)
+    assert engine.cells_reused == 9 * 10
+    assert engine.cells_computed == 9 * 10 + 10
+
+
+def test_moving_an_end_of_a_uniform_axis_reuses_only_the_other_end():
+    engine = IncrementalGridEngine()
+    _compute(engine, DEFAULTS)
+    _compute(engine, {**DEFAULTS, 'max_spot': 121.0})
+    # Only the first spot value is shared once the step changes
+    assert engine.cells_reused == 10
+
+
+@pytest.mark.parametrize('change', [{'K': 101.0}, {'T': 0.5}, {'r': 0.04}, {'q': 0.01}])
+def test_contract_changes_reprice_everything(change):
+    engine = IncrementalGridEngine()
+    _compute(engine, DEFAULTS)
+    _compute(engine, {**DEFAULTS, **change})
+    assert engine.cells_reused == 0
+    assert engine.cells_computed == 200
@@ -0,0 +1,146 @@
+"""
+Instrumentation tests: rerun bookkeeping and cProfile capture, including
+reruns that never reach end_rerun and concurrent sessions
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+from utils.instrumentation import Instrumentation
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def _profiler_active():
+    """Whether any profiler is installed for this thread (or process on 3.12+)"""
+    if sys.version_info >= (3, 12):
+        return sys.monitoring.get_tool(sys.monitoring.PROFILER_ID) is not None
+    return sys.getprofile() is not None
+
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation = Instrumentation('0')
+    instrumentation.start_rerun()
+    with instrumentation.stage('pricing'):
+        pass
+    instrumentation.increment('db_saves')
+    instrumentation.end_rerun()
+    snapshot = instrumentation.snapshot()
+    assert snapshot['reruns'] == 0 and snapshot['totals'] == {} and snapshot['counters'] == {}
+
+
+def test_rerun_timings_and_counters():
+    instrumentation = Instrumentation('1')
+    instrumentation.start_rerun()
+    with instrumentation.stage('pricing'):
+        pass
+    instrumentation.increment('db_saves', 2)
+    instrumentation.set_gauge('grid_cells_reused', 7)
+    instrumentation.end_rerun()
+    snapshot = instrumentation.snapshot()
+    assert snapshot['reruns'] == 1
+    assert set(snapshot['last_rerun']) == {'pricing'}
+    assert snapshot['totals']['pricing']['count'] == 1
+    assert snapshot['counters'] == {'db_saves': 2}
+    assert 'options_app_grid_cells_reused 7' in instrumentation.to_prometheus()
+
+
+def test_profile_is_captured_and_the_profiler_stopped():
+    instrumentation = Instrumentation('profile')
+    instrumentation.start_rerun()
+    assert _profiler_active()
+    sum(range(1000))
+    instrumentation.end_rerun()
+    assert not _profiler_active()
+    assert 'function calls' in instrumentation.snapshot()['profile']
+
+
+def test_rerun_that_skipped_end_rerun_does_not_leak_its_profiler():
+    instrumentation = Instrumentation('profile')
+    instrumentation.start_rerun()
+    # e.g. st.rerun() raised before end_rerun; the next rerun starts cleanly
+    instrumentation.start_rerun()
+    instrumentation.end_rerun()
+    assert not _profiler_active()
+    assert 'function calls' in instrumentation.snapshot()['profile']
+
+
+def test_concurrent_reruns_take_turns_profiling():
+    instrumentation = Instrumentation('profile')
+    instrumentation.start_rerun()
+    started = threading.Event()
+    finish = threading.Event()
+    results = {}
+
+    def other_session():
+        try:
+            instrumentation.start_rerun()
+            started.set()
+            finish.wait(5)
+            instrumentation.end_rerun()
+            results['profile'] = instrumentation.snapshot()['profile']
+        except Exception as e:
+            results['error'] = e
+            started.set()
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    started.wait(5)
+    finish.set()
+    thread.join(5)
+    instrumentation.end_rerun()
+
+    assert 'error' not in results
+    assert results['profile'].startswith('Not profiled')
+    assert 'function calls' in instrumentation.snapshot()['profile']
+    assert instrumentation.snapshot()['reruns'] == 2
+
+
+def test_profiler_of_an_exited_thread_is_replaced():
+    instrumentation = Instrumentation('profile')
+    thread = threading.Thread(target=instrumentation.start_rerun)
+    thread.start()
+    thread.join()
+    instrumentation.start_rerun()
+    instrumentation.end_rerun()
+    assert 'function calls' in instrumentation.snapshot()['profile']
+
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch):
+    """The app with profiling on and more than one page of saved history"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    from database import init_database, save_calculation
+    from utils.calculations import calculate_pricing_grid
+    from utils.instrumentation import instrumentation
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(instrumentation, 'enabled', True)
+    monkeypatch.setattr(instrumentation, 'profiling', True)
+    conn = init_database('options.db')
+    grid = calculate_pricing_grid([90.0, 100.0], [0.2, 0.3], 100.0, 1.0, 0.05)
+    for i in range(12):
+        save_calculation(conn, {'StockPrice': 90.0 + i, 'StrikePrice': 100.0, 'InterestRate': 0.05,
+                                'Volatility': 0.2, 'TimeToMaturity': 1.0}, grid, storage='blob')
+    conn.close()
+    st.cache_resource.clear()
+    yield AppTest.from_file(APP_PATH, default_timeout=120).run(), instrumentation
+    st.cache_resource.clear()
+
+
+def test_history_page_change_ends_the_rerun_before_st_rerun(profiled_app):
+    app, instrumentation = profiled_app
+    assert not app.exception
+    reruns = instrumentation.reruns
+    next(button for button in app.button if button.label == 'Older').click().run()
+    assert not app.exception
+    # The click's rerun and the st.rerun() it triggers are both recorded
+    assert instrumentation.reruns == reruns + 2
+    # No rerun is left holding the process's profiler
+    assert instrumentation._profiler_owner is None
+    assert any(button.label == 'Newest' for button in app.button)
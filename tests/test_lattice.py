@@ -0,0 +1,75 @@
+"""
+Lattice tests: convergence to Black-Scholes, early exercise never worth less
+than European exercise, and stable trees when the drift outruns the volatility
+"""
+
+import numpy as np
+import pytest
+
+from black_scholes import black_scholes_prices
+from lattice import LATTICE_METHODS, lattice_prices
+from utils.calculations import calculate_pricing_grid
+
+# Steps and relative/absolute tolerance against the closed form per method
+CONVERGENCE = {
+    'crr': (1000, 1e-3, 1e-2), 'leisen-reimer': (201, 0, 1e-4), 'trinomial': (500, 1e-3, 1e-2)
+}
+
+
+@pytest.fixture(scope='module')
+def contracts():
+    """Random contracts, including rates and yields far above the volatility"""
+    rng = np.random.default_rng(7)
+    n = 200
+    return (rng.uniform(50.0, 150.0, n), rng.uniform(60.0, 140.0, n), rng.uniform(0.05, 2.0, n),
+            rng.uniform(0.0, 0.3, n), rng.uniform(0.005, 0.8, n), rng.uniform(0.0, 0.3, n))
+
+
+@pytest.mark.parametrize('method', LATTICE_METHODS)
+def test_european_lattice_converges_to_black_scholes(contracts, method):
+    S, K, T, r, sigma, q = contracts
+    steps, rtol, atol = CONVERGENCE[method]
+    call_prices, put_prices = black_scholes_prices(S, K, T, r, sigma, q)
+    for is_call, expected in ((True, call_prices), (False, put_prices)):
+        prices = lattice_prices(S, K, T, r, sigma, is_call, False, steps, method, q=q)
+        np.testing.assert_allclose(prices, expected, rtol=rtol, atol=atol)
+
+
+@pytest.mark.parametrize('method', LATTICE_METHODS)
+@pytest.mark.parametrize('is_call', (True, False))
+def test_american_is_worth_at_least_european(contracts, method, is_call):
+    S, K, T, r, sigma, q = contracts
+    american = lattice_prices(S, K, T, r, sigma, is_call, True, 101, method, q=q)
+    european = lattice_prices(S, K, T, r, sigma, is_call, False, 101, method, q=q)
+    assert np.all(american >= european - 1e-12)
+    assert np.all(american >= np.maximum(np.where(is_call, S - K, K - S), 0.0))
+
+
+@pytest.mark.parametrize('method', LATTICE_METHODS)
+def test_drift_larger_than_volatility_stays_finite(method):
+    # sigma * sqrt(dt) < r * dt: the CRR and Boyle probabilities leave [0, 1]
+    expected, _ = black_scholes_prices(100.0, 100.0, 1.0, 0.2, 0.01)
+    for american in (False, True):
+        price = lattice_prices(100.0, 100.0, 1.0, 0.2, 0.01, True, american, 101, method)
+        assert price == pytest.approx(expected, abs=1e-6)
+
+
+def test_leisen_reimer_fallback_keeps_early_exercise_premium():
+    expected, _ = black_scholes_prices(180.0, 100.0, 1.0, 0.2, 0.01)
+    price = lattice_prices(180.0, 100.0, 1.0, 0.2, 0.01, True, True, 101, 'leisen-reimer')
+    assert price >= expected - 1e-9
+
+
+def test_american_grid_with_high_yield_is_bounded():
+    spot_prices = np.linspace(20.0, 300.0, 25)
+    volatilities = np.linspace(0.01, 0.3, 25)
+    american = calculate_pricing_grid(spot_prices, volatilities, 100.0, 1.0, 0.05,
+                                      exercise='american', dividend_yield=0.3)
+    european = calculate_pricing_grid(spot_prices, volatilities, 100.0, 1.0, 0.05,
+                                      dividend_yield=0.3)
+    assert np.all(np.isfinite(american.call_prices)) and np.all(np.isfinite(american.put_prices))
+    assert np.all(american.put_prices <= 100.0)
+    assert np.all(american.call_prices <= spot_prices[:, None])
+    # The lattice is accurate to about 1e-4 at LATTICE_STEPS
+    assert np.all(american.put_prices >= european.put_prices - 1e-3)
+    assert np.all(american.call_prices >= european.call_prices - 1e-3)
@@ -0,0 +1,109 @@
+"""
+Monte Carlo engine tests: agreement with Black-Scholes, reproducibility
+across worker counts and sanity bounds on path-dependent prices
+"""
+
+import numpy as np
+import pytest
+
+from black_scholes import black_scholes_prices, norm_cdf
+from monte_carlo import monte_carlo_price
+
+S, K, T, r, sigma = 100.0, 100.0, 1.0, 0.05, 0.2
+
+
+def _geometric_asian_call(n_steps, q=0.0):
+    """Closed-form call on the geometric average over n_steps equally spaced dates"""
+    mean = np.log(S) + (r - q - 0.5 * sigma ** 2) * T * (n_steps + 1) / (2 * n_steps)
+    variance = sigma ** 2 * T * (n_steps + 1) * (2 * n_steps + 1) / (6 * n_steps ** 2)
+    d2 = (mean - np.log(K)) / np.sqrt(variance)
+    d1 = d2 + np.sqrt(variance)
+    return float(np.exp(-r * T) * (np.exp(mean + 0.5 * variance) * norm_cdf(d1)
+                                   - K * norm_cdf(d2)))
+
+
+@pytest.mark.parametrize('is_call', (True, False))
+@pytest.mark.parametrize('q, model', [(0.0, 'black-scholes'), (0.03, 'black-scholes'),
+                                      (0.0, 'black-76')])
+def test_european_is_within_standard_errors_of_black_scholes(is_call, q, model):
+    call_price, put_price = black_scholes_prices(S, K, T, r, sigma, q, model)
+    expected = float(call_price if is_call else put_price)
+    result = monte_carlo_price(S, K, T, r, sigma, is_call, n_paths=200_000,
+                               control_variate=False, seed=1, q=q, model=model)
+    assert result.std_error > 0
+    assert abs(result.price - expected) < 4 * result.std_error
+
+
+def test_european_control_variate_reproduces_black_scholes():
+    call_price, _ = black_scholes_prices(S, K, T, r, sigma)
+    result = monte_carlo_price(S, K, T, r, sigma, n_paths=10_000, seed=2)
+    assert result.price == pytest.approx(float(call_price), abs=1e-9)
+    assert result.control_beta == pytest.approx(1.0)
+
+
+def test_antithetic_paths_reduce_the_standard_error():
+    plain = monte_carlo_price(S, K, T, r, sigma, n_paths=100_000, antithetic=False,
+                              control_variate=False, seed=3)
+    paired = monte_carlo_price(S, K, T, r, sigma, n_paths=100_000, antithetic=True,
+                               control_variate=False, seed=3)
+    assert paired.n_paths == plain.n_paths == 100_000
+    assert paired.std_error < plain.std_error
+
+
+@pytest.mark.parametrize('payoff, extra', [('european', {}), ('asian', {'n_steps': 12}),
+                                           ('barrier', {'n_steps': 12, 'barrier': 120.0})])
+def test_results_do_not_depend_on_the_worker_count(payoff, extra):
+    kwargs = dict(payoff=payoff, n_paths=40_000, seed=4, batch_elements=50_000, **extra)
+    serial = monte_carlo_price(S, K, T, r, sigma, workers=1, **kwargs)
+    parallel = monte_carlo_price(S, K, T, r, sigma, workers=2, **kwargs)
+    assert parallel == serial
+
+
+def test_same_seed_repeats_and_other_seeds_differ():
+    first = monte_carlo_price(S, K, T, r, sigma, payoff='asian', n_steps=12, n_paths=20_000, seed=5)
+    again = monte_carlo_price(S, K, T, r, sigma, payoff='asian', n_steps=12, n_paths=20_000, seed=5)
+    other = monte_carlo_price(S, K, T, r, sigma, payoff='asian', n_steps=12, n_paths=20_000, seed=6)
+    assert again == first
+    assert other.price != first.price
+
+
+def test_asian_call_lies_between_geometric_asian_and_european():
+    n_steps = 12
+    result = monte_carlo_price(S, K, T, r, sigma, payoff='asian', n_steps=n_steps,
+                               n_paths=200_000, seed=7)
+    european, _ = black_scholes_prices(S, K, T, r, sigma)
+    # The arithmetic average is at least the geometric one on every path
+    assert result.price > _geometric_asian_call(n_steps) - 4 * result.std_error
+    assert result.price < float(european)
+    assert result.price - _geometric_asian_call(n_steps) < 0.5
+
+
+def test_knock_in_and_knock_out_add_up_to_the_vanilla():
+    call_price, _ = black_scholes_prices(S, K, T, r, sigma)
+    kwargs = dict(payoff='barrier', barrier=120.0, n_steps=50, n_paths=100_000,
+                  control_variate=False, seed=8)
+    knock_out = monte_carlo_price(S, K, T, r, sigma, barrier_type='up-and-out', **kwargs)
+    knock_in = monte_carlo_price(S, K, T, r, sigma, barrier_type='up-and-in', **kwargs)
+    std_error = np.hypot(knock_out.std_error, knock_in.std_error)
+    assert 0 < knock_out.price < float(call_price)
+    assert abs(knock_out.price + knock_in.price - float(call_price)) < 4 * std_error
+
+
+def test_lookback_call_is_worth_more_than_the_european():
+    european, _ = black_scholes_prices(S, K, T, r, sigma)
+    result = monte_carlo_price(S, K, T, r, sigma, payoff='lookback', n_steps=52,
+                               n_paths=50_000, seed=9)
+    assert result.price > float(european)
+
+
+@pytest.mark.parametrize('kwargs', [{'payoff': 'digital'}, {'payoff': 'barrier'},
+                                    {'payoff': 'barrier', 'barrier': 120.0,
+                                     'barrier_type': 'sideways'}])
+def test_invalid_arguments_raise_value_error(kwargs):
+    with pytest.raises(ValueError):
+        monte_carlo_price(S, K, T, r, sigma, n_paths=100, **kwargs)
+
+
+def test_expired_option_raises_value_error():
+    with pytest.raises(ValueError):
+        monte_carlo_price(S, K, 0.0, r, sigma, n_paths=100)
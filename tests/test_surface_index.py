@@ -0,0 +1,165 @@
+"""
+Surface index tests: interpolation accuracy against the exact pricers,
+fallbacks outside the table, and the American grid engine built on it
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from black_scholes import black_scholes_prices, calculate_greeks
+from lattice import lattice_prices
+from surface_index import INDEX_GREEKS, build_surface_index, load_surface_index
+from utils.calculations import LATTICE_METHOD, LATTICE_STEPS, calculate_pricing_grid
+from utils.surface_grid import SurfaceGridEngine
+
+AMERICAN_SHAPE = (201, 101)
+AMERICAN_MIN_TOTAL_VOL = 0.15
+
+
+@pytest.fixture(scope='module')
+def european_index(tmp_path_factory):
+    return build_surface_index(str(tmp_path_factory.mktemp('index') / 'european.npy'))
+
+
+@pytest.fixture(scope='module')
+def american_index(tmp_path_factory):
+    return build_surface_index(
+        str(tmp_path_factory.mktemp('index') / 'american.npy'), 'american', T=1.0, r=0.05,
+        q=0.01, shape=AMERICAN_SHAPE, min_total_vol=AMERICAN_MIN_TOTAL_VOL
+    )
+
+
+def _random_contracts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(50.0, 200.0, n), rng.uniform(50.0, 200.0, n), rng.uniform(0.05, 3.0, n),
+            rng.uniform(0.0, 0.1, n), rng.uniform(0.05, 0.8, n), rng.uniform(0.0, 0.05, n))
+
+
+def test_european_prices_match_the_closed_form(european_index):
+    S, K, T, r, sigma, q = _random_contracts(20_000)
+    call_prices, put_prices = european_index.prices(S, K, T, r, sigma, q)
+    exact_calls, exact_puts = black_scholes_prices(S, K, T, r, sigma, q)
+
+    max_error = european_index.metadata['max_error']
+    assert max(max_error.values()) < 2e-8
+    # Errors in the units the table stores: S * e^(-q*T) and K * e^(-r*T)
+    assert np.max(np.abs(call_prices - exact_calls) / (S * np.exp(-q * T))) < 2e-8
+    assert np.max(np.abs(put_prices - exact_puts) / (K * np.exp(-r * T))) < 2e-8
+    assert european_index.stats()['fallbacks'] > 0
+
+
+def test_european_greeks_match_the_closed_form(european_index):
+    S, K, T, r, sigma, q = _random_contracts(5_000, seed=1)
+    for is_call in (True, False):
+        greeks = european_index.greeks(S, K, T, r, sigma, is_call=is_call, q=q)
+        exact = calculate_greeks(S, K, T, r, sigma, is_call, INDEX_GREEKS, q)
+        np.testing.assert_allclose(greeks['delta'], exact['delta'], atol=1e-6)
+        np.testing.assert_allclose(greeks['gamma'], exact['gamma'], atol=1e-4)
+        np.testing.assert_allclose(greeks['vega'], exact['vega'], rtol=1e-3, atol=1e-2)
+
+
+def test_black_76_reads_spot_as_the_forward(european_index):
+    S, K, T, r, sigma, _ = _random_contracts(1_000, seed=2)
+    prices = european_index.prices(S, K, T, r, sigma, model='black-76')
+    exact = black_scholes_prices(S, K, T, r, sigma, model='black-76')
+    for price, expected in zip(prices, exact):
+        np.testing.assert_allclose(price, expected, atol=2e-8 * np.max(S))
+
+
+def test_american_prices_match_the_lattice(american_index):
+    rng = np.random.default_rng(3)
+    S, K, sigma = rng.uniform(60.0, 160.0, 2_000), 100.0, rng.uniform(0.2, 0.8, 2_000)
+    call_prices, put_prices = american_index.prices(S, K, 1.0, 0.05, sigma, 0.01)
+    exact_calls, exact_puts = (
+        lattice_prices(S, K, 1.0, 0.05, sigma, is_call, True, LATTICE_STEPS, LATTICE_METHOD, q=0.01)
+        for is_call in (True, False)
+    )
+    assert american_index.stats()['fallbacks'] == 0
+    assert np.max(np.abs(call_prices - exact_calls)) < 1e-3
+    assert np.max(np.abs(put_prices - exact_puts)) < 1e-2
+    assert np.all(put_prices >= np.maximum(K - S, 0.0) - 1e-2)
+
+
+def test_american_queries_for_another_maturity_are_priced_exactly(american_index):
+    S, sigma = np.array([90.0, 100.0, 110.0]), np.array([0.2, 0.3, 0.4])
+    fallbacks = american_index.fallbacks
+    _, put_prices = american_index.prices(S, 100.0, 0.5, 0.05, sigma, 0.01)
+    exact = lattice_prices(S, 100.0, 0.5, 0.05, sigma, False, True, LATTICE_STEPS,
+                           LATTICE_METHOD, q=0.01)
+    np.testing.assert_array_equal(put_prices, exact)
+    assert american_index.fallbacks == fallbacks + 3
+
+
+def test_load_reopens_the_same_table(tmp_path):
+    path = str(tmp_path / 'small.npy')
+    built = build_surface_index(path, shape=(101, 51))
+    loaded = load_surface_index(path)
+    assert loaded.metadata == built.metadata
+    S, K, T, r, sigma, q = _random_contracts(100, seed=4)
+    for price, expected in zip(loaded.prices(S, K, T, r, sigma, q), built.prices(S, K, T, r, sigma, q)):
+        np.testing.assert_array_equal(price, expected)
+
+
+def test_load_rejects_another_format_version(tmp_path):
+    path = str(tmp_path / 'small.npy')
+    build_surface_index(path, shape=(11, 11))
+    metadata_path = os.path.splitext(path)[0] + '.json'
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    metadata['format_version'] += 1
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f)
+    with pytest.raises(ValueError):
+        load_surface_index(path)
+
+
+def _american_grid(engine, T=1.0, K=100.0):
+    spot_prices, volatilities = np.linspace(80.0, 120.0, 10), np.linspace(0.2, 0.5, 10)
+    return engine.compute(spot_prices, volatilities, K, T, 0.05, dividend_yield=0.01)
+
+
+def test_surface_engine_builds_an_index_once_it_pays_off(tmp_path):
+    shape = (41, 21)
+    engine = SurfaceGridEngine(str(tmp_path), shape=shape)
+    grids_before_build = -(-shape[0] * shape[1] // 100) - 1
+    for strike in np.linspace(90.0, 110.0, grids_before_build):
+        _american_grid(engine, K=strike)
+    assert engine.stats()['indexes_built'] == 0
+    assert engine.cells_lattice == grids_before_build * 100
+
+    result = _american_grid(engine, K=101.0)
+    expected = calculate_pricing_grid(result.spot_prices, result.volatilities, 101.0, 1.0, 0.05,
+                                      exercise='american', dividend_yield=0.01)
+    assert engine.stats() == {'cells_lattice': grids_before_build * 100, 'cells_interpolated': 100,
+                              'indexes_built': 1, 'indexes': 1}
+    np.testing.assert_allclose(result.call_prices, expected.call_prices, atol=0.05)
+    np.testing.assert_allclose(result.put_prices, expected.put_prices, atol=0.05)
+
+    # Another maturity has its own count and starts on the lattice
+    _american_grid(engine, T=0.5)
+    assert engine.cells_lattice == (grids_before_build + 1) * 100
+
+
+def test_surface_engine_evicts_the_least_recently_used_index(tmp_path):
+    engine = SurfaceGridEngine(str(tmp_path), shape=(11, 11), max_indexes=2)
+    for T in (0.5, 1.0, 1.5):
+        for _ in range(2):
+            _american_grid(engine, T=T)
+    assert engine.stats()['indexes_built'] == 3
+    assert engine.stats()['indexes'] == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        f'american_{T!r}_0.05_0.01.{extension}' for T in (1.0, 1.5) for extension in ('npy', 'json')
+    )
+
+
+def test_surface_engine_close_removes_its_temporary_directory():
+    engine = SurfaceGridEngine(shape=(11, 11))
+    for _ in range(2):
+        _american_grid(engine)
+    directory = engine._directory
+    assert os.listdir(directory)
+    engine.close()
+    assert not os.path.exists(directory)
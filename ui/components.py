@@ -22,16 +22,19 @@ def render_parameters_table(params):
             - volatility (float)
             - strike_price (float)
             - risk_free_rate (float)
+            - dividend_yield (float)
+            - model (str) - 'black-76' labels the asset price as a futures price
             - time_to_maturity_days (int)
             - purchase_price (float)
     """
     st.markdown(get_params_box_css(), unsafe_allow_html=True)
+    asset_label = "Current Futures Price" if params['model'] == 'black-76' else "Current Asset Price"
     
     params_html = f"""
     <div class="params-box">
         <div class="params-row">
             <div class="param-item">
-                <div class="param-label">Current Asset Price</div>
+                <div class="param-label">{asset_label}</div>
                 <div class="param-value">${params['current_asset_price']:.2f}</div>
             </div>
             <div class="param-item">
@@ -46,6 +49,10 @@ def render_parameters_table(params):
                 <div class="param-label">Risk Free Rate</div>
                 <div class="param-value">{params['risk_free_rate']:.2%}</div>
             </div>
+            <div class="param-item">
+                <div class="param-label">Dividend Yield</div>
+                <div class="param-value">{params['dividend_yield']:.2%}</div>
+            </div>
             <div class="param-item">
                 <div class="param-label">Time To Maturity</div>
                 <div class="param-value">{params['time_to_maturity_days']} days</div>
@@ -79,3 +86,83 @@ def render_value_box(value, option_type='call'):
             unsafe_allow_html=True
         )
 
+
+
+def render_diagnostics_panel(instrumentation):
+    """
+    Renders a collapsible panel with per-rerun stage timings, counters and
+    downloadable JSON / Prometheus metrics. Nothing is shown when
+    instrumentation is disabled.
+    
+    Args:
+        instrumentation (Instrumentation): Source of the metrics
+    """
+    if not instrumentation.enabled:
+        return
+    
+    snapshot = instrumentation.snapshot()
+    with st.expander("Diagnostics", expanded=False):
+        last_rerun = snapshot['last_rerun']
+        st.markdown(f"**Last rerun:** {sum(last_rerun.values()) * 1e3:.2f} ms "
+                    f"across {len(last_rerun)} stages (rerun #{snapshot['reruns']})")
+        st.table({
+            'Stage': list(last_rerun),
+            'Last rerun (ms)': [f"{seconds * 1e3:.3f}" for seconds in last_rerun.values()],
+            'Mean (ms)': [
+                f"{snapshot['totals'][name]['seconds'] / snapshot['totals'][name]['count'] * 1e3:.3f}"
+                for name in last_rerun
+            ],
+            'Max (ms)': [f"{snapshot['totals'][name]['max'] * 1e3:.3f}" for name in last_rerun],
+        })
+        
+        if snapshot['counters'] or snapshot['gauges']:
+            st.json({**snapshot['counters'], **snapshot['gauges']})
+        
+        if snapshot['profile']:
+            st.code(snapshot['profile'], language='text')
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download JSON", instrumentation.to_json(),
+                               file_name="metrics.json", mime="application/json")
+        with col2:
+            st.download_button("Download Prometheus", instrumentation.to_prometheus(),
+                               file_name="metrics.prom", mime="text/plain")
+
+
+def render_history_panel(history, nearest, has_older=False, has_newer=False):
+    """
+    Renders a collapsible panel with a page of saved calculations and the
+    saved calculations nearest to the current inputs.
+    
+    Args:
+        history (list): Dicts from database.list_calculations
+        nearest (list): Dicts from database.find_nearest_calculations
+        has_older (bool): Whether an "Older" page button is shown
+        has_newer (bool): Whether a "Newest" page button is shown
+    
+    Returns:
+        str: 'older' or 'newest' when that page button was clicked, else None
+    """
+    action = None
+    with st.expander("Saved Calculations", expanded=False):
+        st.markdown("**Nearest to current inputs**")
+        if nearest:
+            st.table(nearest)
+        else:
+            st.caption("No saved calculation within range of the current inputs")
+        
+        st.markdown("**History**")
+        if history:
+            st.table(history)
+        else:
+            st.caption("No saved calculations")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if has_newer and st.button("Newest", key="history_newest"):
+                action = 'newest'
+        with col2:
+            if has_older and st.button("Older", key="history_older"):
+                action = 'older'
+    return action
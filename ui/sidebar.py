@@ -4,6 +4,17 @@ Sidebar input components for the Option Pricing and Risk Analyzer application
 
 import streamlit as st
 
+# Pricing model choices, mapped to black_scholes.MODELS
+MODEL_OPTIONS = {'Spot (Black-Scholes)': 'black-scholes', 'Futures (Black-76)': 'black-76'}
+
+# Grid points per axis offered for pricing and for display
+GRID_RESOLUTION_OPTIONS = [10, 25, 50, 100, 250, 500, 1000]
+DISPLAY_RESOLUTION_OPTIONS = [10, 25, 50, 100, 200]
+
+# American grids are rolled back on a lattice, ~0.6s at 100x100 and growing
+# with the cell count, so larger grids are not offered for them
+AMERICAN_MAX_GRID_RESOLUTION = 100
+
 
 def render_sidebar():
     """
@@ -18,18 +29,33 @@ def render_sidebar():
             - time_to_maturity (float) - converted to years
             - volatility (float)
             - risk_free_rate (float)
+            - model (str) - 'black-scholes' or 'black-76'
+            - dividend_yield (float) - 0 under Black-76
             - purchase_price (float)
+            - exercise_style (str) - 'european' or 'american'
             - min_spot_price (float)
             - max_spot_price (float)
             - min_volatility (float)
             - max_volatility (float)
+            - grid_resolution (int) - grid points per axis to compute
+            - display_resolution (int) - max grid points per axis to draw
+            - zoom_spot_range (tuple) - (min, max) spot range to compute
+            - zoom_volatility_range (tuple) - (min, max) volatility range to compute
     """
     with st.sidebar:
         st.header("Input Parameters")
         
-        # Main input parameters
+        # Main input parameters; the pricing model decides whether the asset
+        # price is a spot or a futures price, so it is chosen first
+        model = MODEL_OPTIONS[st.radio(
+            "Pricing Model",
+            options=list(MODEL_OPTIONS),
+            horizontal=True,
+            help="Black-76 prices options on a futures price, which has no dividend yield"
+        )]
+        
         current_asset_price = st.number_input(
-            "Current Asset Price",
+            "Current Futures Price" if model == 'black-76' else "Current Asset Price",
             min_value=0.01,
             value=100.0,
             step=0.01,
@@ -72,6 +98,17 @@ def render_sidebar():
             format="%.2f"
         )
         
+        dividend_yield = st.number_input(
+            "Dividend Yield",
+            min_value=0.0,
+            value=0.0,
+            step=0.01,
+            format="%.2f",
+            disabled=model == 'black-76'
+        )
+        if model == 'black-76':
+            dividend_yield = 0.0
+        
         purchase_price = st.number_input(
             "Purchase Price",
             min_value=0.0,
@@ -80,6 +117,13 @@ def render_sidebar():
             format="%.2f"
         )
         
+        exercise_style = st.radio(
+            "Exercise Style",
+            options=['European', 'American'],
+            horizontal=True,
+            help="American options are priced on a Leisen-Reimer binomial lattice"
+        ).lower()
+        
         st.divider()
         st.header("Heatmap Range Settings")
         
@@ -120,6 +164,56 @@ def render_sidebar():
             step=0.01,
             format="%.2f"
         )
+        
+        st.divider()
+        st.header("Resolution")
+        
+        resolution_options = GRID_RESOLUTION_OPTIONS
+        resolution_help = "Points per axis: the heatmaps are computed on an N×N grid"
+        if exercise_style == 'american':
+            resolution_options = [
+                n for n in GRID_RESOLUTION_OPTIONS if n <= AMERICAN_MAX_GRID_RESOLUTION
+            ]
+            resolution_help += (f"; at most {AMERICAN_MAX_GRID_RESOLUTION} for American "
+                                "options, which are priced on a lattice")
+        grid_resolution = st.select_slider(
+            "Grid Resolution",
+            options=resolution_options,
+            value=10,
+            help=resolution_help
+        )
+        
+        display_resolution = st.select_slider(
+            "Display Resolution",
+            options=DISPLAY_RESOLUTION_OPTIONS,
+            value=100,
+            help="Larger grids are downsampled to this many points per axis, "
+                 "keeping each block's extreme value"
+        )
+        
+        # Zoom sub-ranges: the grid is computed at full resolution only
+        # inside them
+        zoom_spot_range = (min_spot_price, max_spot_price)
+        if min_spot_price < max_spot_price:
+            zoom_spot_range = st.slider(
+                "Zoom Spot Range",
+                min_value=min_spot_price,
+                max_value=max_spot_price,
+                value=(min_spot_price, max_spot_price),
+                step=0.01,
+                format="%.2f"
+            )
+        
+        zoom_volatility_range = (min_volatility, max_volatility)
+        if min_volatility < max_volatility:
+            zoom_volatility_range = st.slider(
+                "Zoom Volatility Range",
+                min_value=min_volatility,
+                max_value=max_volatility,
+                value=(min_volatility, max_volatility),
+                step=0.01,
+                format="%.2f"
+            )
     
     return {
         'current_asset_price': current_asset_price,
@@ -128,10 +222,17 @@ def render_sidebar():
         'time_to_maturity': time_to_maturity,
         'volatility': volatility,
         'risk_free_rate': risk_free_rate,
+        'model': model,
+        'dividend_yield': dividend_yield,
         'purchase_price': purchase_price,
+        'exercise_style': exercise_style,
         'min_spot_price': min_spot_price,
         'max_spot_price': max_spot_price,
         'min_volatility': min_volatility,
-        'max_volatility': max_volatility
+        'max_volatility': max_volatility,
+        'grid_resolution': grid_resolution,
+        'display_resolution': display_resolution,
+        'zoom_spot_range': zoom_spot_range,
+        'zoom_volatility_range': zoom_volatility_range
     }
 
@@ -0,0 +1,267 @@
+"""
+Memoized pricing cache for the grid and scalar Black-Scholes engines
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+from black_scholes import _carry_yield, black_scholes_prices
+from lattice import lattice_prices
+from utils.calculations import LATTICE_METHOD, LATTICE_STEPS, calculate_pricing_grid
+
+# Inputs are rounded to this many decimals before hashing, so values that
+# differ only by float noise (e.g. 365 / 365.0 days) share a cache entry
+QUANTIZE_DECIMALS = 10
+
+
+def quantize(value, decimals=QUANTIZE_DECIMALS):
+    """
+    Round a scalar or array input to the cache's key precision.
+    
+    Args:
+        value (float or np.array): Input to quantize
+        decimals (int): Number of decimals to keep
+        
+    Returns:
+        float or np.array: Quantized value (arrays become float64)
+    """
+    if np.ndim(value) == 0:
+        return round(float(value), decimals)
+    return np.round(np.asarray(value, dtype=np.float64), decimals)
+
+
+def make_cache_key(*parts):
+    """
+    Build a cache key from quantized input parameters.
+    
+    Scalars are hashed by their quantized value and arrays by their shape
+    and quantized contents, so the grid shape is part of the key.
+    
+    Args:
+        *parts: Scalars or arrays identifying the computation
+        
+    Returns:
+        str: Hex digest identifying the inputs
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, str):
+            digest.update(part.encode())
+        elif np.ndim(part) == 0:
+            digest.update(repr(quantize(part)).encode())
+        else:
+            array = quantize(part)
+            digest.update(repr(array.shape).encode())
+            digest.update(array.tobytes())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+def _nbytes(value):
+    """Approximate memory held by a cached value"""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class PricingCache:
+    """
+    Thread-safe LRU cache of pricing results with hit/miss counters.
+    
+    Entries are evicted least-recently-used first whenever either the entry
+    count or the total array memory exceeds its bound.
+    
+    Args:
+        max_entries (int): Maximum number of cached results
+        max_bytes (int): Maximum total memory of cached arrays
+    """
+    
+    def __init__(self, max_entries=128, max_bytes=256 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key, default=None):
+        """Return the cached value for key, counting a hit or a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        """Store value under key and evict entries beyond the bounds"""
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._total_bytes += size
+            
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._total_bytes > self.max_bytes):
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+    
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, calling compute() on a miss.
+        
+        Args:
+            key (str): Cache key from make_cache_key
+            compute (callable): Zero-argument function producing the value
+            
+        Returns:
+            The cached or freshly computed value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+    
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self):
+        """
+        Returns:
+            dict: entries, bytes, hits, misses, evictions and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+# Process-wide cache shared by every session
+default_cache = PricingCache()
+
+
+def _option_prices(S, K, T, r, sigma, q, exercise):
+    """Call and put prices for one exercise style"""
+    if exercise == 'american':
+        return tuple(
+            lattice_prices(S, K, T, r, sigma, is_call, True, LATTICE_STEPS, LATTICE_METHOD, q=q)
+            for is_call in (True, False)
+        )
+    return black_scholes_prices(S, K, T, r, sigma, q)
+
+
+def cached_option_prices(S, K, T, r, sigma, cache=None, exercise='european', q=0.0,
+                         model='black-scholes'):
+    """
+    Memoized black_scholes_prices (or lattice prices for American exercise)
+    for headline (scalar or array) inputs.
+    
+    The model is keyed by the yield it prices with, so a Black-76 entry is
+    shared with the spot entry whose yield equals the rate.
+    
+    Args:
+        S, K, T, r, sigma: Pricing inputs as for black_scholes_prices
+        cache (PricingCache): Cache to use (default_cache if None)
+        exercise (str): 'european' or 'american'
+        q (float): Continuous dividend yield
+        model (str): One of black_scholes.MODELS
+        
+    Returns:
+        tuple: (call_price, put_price)
+    """
+    cache = default_cache if cache is None else cache
+    q = _carry_yield(r, q, model)
+    S, K, T, r, sigma, q = (quantize(v) for v in (S, K, T, r, sigma, q))
+    key = make_cache_key('prices', exercise, S, K, T, r, sigma, q)
+    return cache.get_or_compute(key, lambda: _option_prices(S, K, T, r, sigma, q, exercise))
+
+
+def cached_pricing_grid(spot_prices, volatilities, strike_price, time_to_maturity,
+                        risk_free_rate, purchase_price=0.0, cache=None, engine=None,
+                        exercise='european', dividend_yield=0.0, model='black-scholes',
+                        load_saved=None):
+    """
+    Memoized calculate_pricing_grid.
+    
+    The purchase price is not part of the key: a cached grid is re-used with
+    its PnL re-measured against the requested purchase price. As in
+    cached_option_prices, the model is keyed by the yield it prices with.
+    The engine only prices grids of its own exercise style
+    (engine.exercise); other misses are priced directly.
+    
+    Args:
+        spot_prices (np.array): Array of spot prices (grid rows)
+        volatilities (np.array): Array of volatilities (grid columns)
+        strike_price (float): Strike price
+        time_to_maturity (float): Time to maturity in years
+        risk_free_rate (float): Risk-free interest rate
+        purchase_price (float): Purchase price of the option
+        cache (PricingCache): Cache to use (default_cache if None)
+        engine (IncrementalGridEngine or SurfaceGridEngine): Engine used
+            to price misses, e.g. reusing cells shared with its previous
+            grid or reading an American surface index (optional)
+        exercise (str): 'european' or 'american'
+        dividend_yield (float): Continuous dividend yield
+        model (str): One of black_scholes.MODELS
+        load_saved (callable): Called on a miss with the quantized
+            (spot_prices, volatilities); returns a previously saved
+            PricingResult for this grid, or None to price it (optional)
+        
+    Returns:
+        PricingResult: Prices, PnL and axes of the grid
+    """
+    cache = default_cache if cache is None else cache
+    dividend_yield = _carry_yield(risk_free_rate, dividend_yield, model)
+    spot_prices, volatilities = quantize(spot_prices), quantize(volatilities)
+    strike_price, time_to_maturity, risk_free_rate, dividend_yield = (
+        quantize(v) for v in (strike_price, time_to_maturity, risk_free_rate, dividend_yield)
+    )
+    key = make_cache_key(
+        'grid', exercise, spot_prices, volatilities, strike_price, time_to_maturity,
+        risk_free_rate, dividend_yield
+    )
+    if engine is not None and engine.exercise == exercise:
+        compute = engine.compute
+    else:
+        compute = partial(calculate_pricing_grid, exercise=exercise)
+
+    def compute_grid():
+        saved = None if load_saved is None else load_saved(spot_prices, volatilities)
+        if saved is not None:
+            return saved
+        return compute(
+            spot_prices, volatilities, strike_price, time_to_maturity, risk_free_rate,
+            dividend_yield=dividend_yield
+        )
+
+    result = cache.get_or_compute(key, compute_grid)
+    return result.with_purchase_price(purchase_price)
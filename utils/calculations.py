@@ -2,41 +2,180 @@
 Calculation utilities for PnL grid generation
 """
 
+from dataclasses import dataclass, replace
+
 import numpy as np
-from black_scholes import calculate_call_price, calculate_put_price
+from black_scholes import black_scholes_grid_prices, calculate_greeks
+from lattice import EXERCISE_STYLES, lattice_grid_prices
+
+# Lattice used for American exercise: Leisen-Reimer converges smoothly, so
+# ~100 steps keep interactive grids accurate to about a tenth of a cent
+LATTICE_STEPS = 101
+LATTICE_METHOD = 'leisen-reimer'
+
+
+@dataclass
+class PricingResult:
+    """
+    Priced spot x volatility grid shared by the heatmaps and the database.
+    
+    Only the prices are stored; the PnL grids are derived on access, so
+    cached results hold two grids rather than four.
+    
+    Attributes:
+        spot_prices (np.array): Spot price axis (grid rows)
+        volatilities (np.array): Volatility axis (grid columns)
+        call_prices (np.array): Call prices of shape (n_spot, n_vol)
+        put_prices (np.array): Put prices of shape (n_spot, n_vol)
+        purchase_price (float): Purchase price the PnL grids are measured against
+    """
+    spot_prices: np.ndarray
+    volatilities: np.ndarray
+    call_prices: np.ndarray
+    put_prices: np.ndarray
+    purchase_price: float = 0.0
+    
+    @property
+    def call_pnl(self):
+        """np.array: call_prices - purchase_price, computed on each access"""
+        return self.call_prices - self.purchase_price
+    
+    @property
+    def put_pnl(self):
+        """np.array: put_prices - purchase_price, computed on each access"""
+        return self.put_prices - self.purchase_price
+    
+    @property
+    def shape(self):
+        """tuple: Grid shape (n_spot, n_vol)"""
+        return self.call_prices.shape
+    
+    @property
+    def nbytes(self):
+        """int: Memory held by the axis and grid arrays"""
+        return sum(a.nbytes for a in (
+            self.spot_prices, self.volatilities, self.call_prices, self.put_prices
+        ))
+    
+    def with_purchase_price(self, purchase_price):
+        """
+        Return the same priced grid with PnL measured against another
+        purchase price. The price arrays are shared, not copied.
+        """
+        return replace(self, purchase_price=purchase_price)
+
+
+def calculate_pricing_grid(spot_prices, volatilities, strike_price, time_to_maturity,
+                           risk_free_rate, purchase_price=0.0, exercise='european',
+                           dividend_yield=0.0, model='black-scholes'):
+    """
+    Price calls and puts over a spot x volatility grid.
+    
+    European grids are priced in one broadcast evaluation, with calls and
+    puts sharing the same d1/d2 and CDF values and volatility-only terms
+    computed once per column. American grids are rolled back on a batched
+    lattice (LATTICE_METHOD, LATTICE_STEPS). Both take the dividend yield
+    and pricing model in the same pass. The spot and volatility axes do not
+    need to have the same length.
+    
+    Args:
+        spot_prices (np.array): Array of spot prices (grid rows)
+        volatilities (np.array): Array of volatilities (grid columns)
+        strike_price (float): Strike price
+        time_to_maturity (float): Time to maturity in years
+        risk_free_rate (float): Risk-free interest rate
+        purchase_price (float): Purchase price of the option
+        exercise (str): One of EXERCISE_STYLES
+        dividend_yield (float): Continuous dividend yield
+        model (str): One of black_scholes.MODELS; 'black-76' treats the
+            spot axis as futures prices and ignores dividend_yield
+        
+    Returns:
+        PricingResult: Prices, PnL and axes of the grid
+    """
+    if exercise not in EXERCISE_STYLES:
+        raise ValueError(f"Unknown exercise style {exercise!r}; expected one of {EXERCISE_STYLES}")
+    spot_prices = np.asarray(spot_prices, dtype=np.float64)
+    volatilities = np.asarray(volatilities, dtype=np.float64)
+    
+    if exercise == 'american':
+        call_price_grid, put_price_grid = lattice_grid_prices(
+            spot_prices, volatilities, strike_price, time_to_maturity, risk_free_rate,
+            american=True, steps=LATTICE_STEPS, method=LATTICE_METHOD,
+            q=dividend_yield, model=model
+        )
+    else:
+        call_price_grid, put_price_grid = black_scholes_grid_prices(
+            spot_prices, volatilities, strike_price, time_to_maturity, risk_free_rate,
+            dividend_yield, model
+        )
+    
+    return PricingResult(
+        spot_prices, volatilities, call_price_grid, put_price_grid, purchase_price
+    )
 
 
 def calculate_pnl_grids(spot_prices, volatilities, strike_price, time_to_maturity, 
-                        risk_free_rate, purchase_price):
+                        risk_free_rate, purchase_price, dividend_yield=0.0,
+                        model='black-scholes'):
     """
     Calculate PnL grids for both call and put options.
     
     Args:
-        spot_prices (np.array): Array of spot prices
-        volatilities (np.array): Array of volatilities
+        spot_prices (np.array): Array of spot prices (grid rows)
+        volatilities (np.array): Array of volatilities (grid columns)
         strike_price (float): Strike price
         time_to_maturity (float): Time to maturity in years
         risk_free_rate (float): Risk-free interest rate
         purchase_price (float): Purchase price of the option
+        dividend_yield (float): Continuous dividend yield
+        model (str): One of black_scholes.MODELS
         
     Returns:
-        tuple: (call_pnl_grid, put_pnl_grid) as numpy arrays
-    """
-    grid_size = len(spot_prices)
-    call_pnl_grid = np.zeros((grid_size, grid_size))
-    put_pnl_grid = np.zeros((grid_size, grid_size))
-    
-    for i, spot in enumerate(spot_prices):
-        for j, vol in enumerate(volatilities):
-            call_price = calculate_call_price(
-                spot, strike_price, time_to_maturity, risk_free_rate, vol
-            )
-            put_price = calculate_put_price(
-                spot, strike_price, time_to_maturity, risk_free_rate, vol
-            )
-            
-            call_pnl_grid[i, j] = call_price - purchase_price
-            put_pnl_grid[i, j] = put_price - purchase_price
-    
-    return call_pnl_grid, put_pnl_grid
+        tuple: (call_pnl_grid, put_pnl_grid) as numpy arrays of shape
+            (len(spot_prices), len(volatilities))
+    """
+    result = calculate_pricing_grid(
+        spot_prices, volatilities, strike_price, time_to_maturity,
+        risk_free_rate, purchase_price, dividend_yield=dividend_yield, model=model
+    )
+    return result.call_pnl, result.put_pnl
+
 
+def calculate_greek_grids(spot_prices, volatilities, strike_price, time_to_maturity,
+                          risk_free_rate, is_call=True, greeks=None, dividend_yield=0.0,
+                          model='black-scholes'):
+    """
+    Calculate analytic Greek surfaces over the same spot x volatility grid
+    used by calculate_pnl_grids.
+    
+    Args:
+        spot_prices (np.array): Array of spot prices (grid rows)
+        volatilities (np.array): Array of volatilities (grid columns)
+        strike_price (float): Strike price
+        time_to_maturity (float): Time to maturity in years
+        risk_free_rate (float): Risk-free interest rate
+        is_call (bool): True for call Greeks, False for put Greeks
+        greeks (iterable of str): Subset of black_scholes.GREEK_NAMES
+            (default all)
+        dividend_yield (float): Continuous dividend yield
+        model (str): One of black_scholes.MODELS
+        
+    Returns:
+        dict: Mapping of Greek name to an array of shape
+            (len(spot_prices), len(volatilities))
+    """
+    spot_prices = np.asarray(spot_prices, dtype=np.float64)
+    volatilities = np.asarray(volatilities, dtype=np.float64)
+    
+    return calculate_greeks(
+        spot_prices[:, np.newaxis],
+        strike_price,
+        time_to_maturity,
+        risk_free_rate,
+        volatilities[np.newaxis, :],
+        is_call=is_call,
+        greeks=greeks,
+        q=dividend_yield,
+        model=model
+    )
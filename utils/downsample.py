@@ -0,0 +1,67 @@
+"""
+Min/max-preserving downsampling of large grids for display
+"""
+
+import numpy as np
+
+# Default cap on rows and columns sent to the browser per heatmap
+DEFAULT_DISPLAY_RESOLUTION = 100
+
+
+def _block_starts(length, max_blocks):
+    """Start index of each of min(length, max_blocks) near-equal blocks"""
+    n_blocks = min(length, max_blocks)
+    return np.linspace(0, length, n_blocks + 1).astype(np.intp)[:-1]
+
+
+def downsample_grid(grid, row_axis, col_axis, max_rows=DEFAULT_DISPLAY_RESOLUTION,
+                    max_cols=None):
+    """
+    Reduce a 2D grid to at most max_rows x max_cols blocks.
+
+    Each output cell represents a block of input cells and takes the block's
+    minimum or maximum, whichever lies further from the block mean, so
+    spikes and troughs survive. The blocks holding the global minimum and
+    maximum always show them (unless both fall in the same block), keeping
+    the colour range of the view equal to that of the full grid. Axis values
+    become the block means.
+
+    Args:
+        grid (np.array): 2D array of shape (len(row_axis), len(col_axis))
+        row_axis (np.array): Coordinates of the grid rows
+        col_axis (np.array): Coordinates of the grid columns
+        max_rows (int): Maximum rows in the output
+        max_cols (int): Maximum columns in the output (default max_rows)
+
+    Returns:
+        tuple: (grid, row_axis, col_axis) downsampled; the inputs are
+            returned unchanged when they already fit
+    """
+    max_cols = max_rows if max_cols is None else max_cols
+    n_rows, n_cols = grid.shape
+    if n_rows <= max_rows and n_cols <= max_cols:
+        return grid, row_axis, col_axis
+
+    row_starts = _block_starts(n_rows, max_rows)
+    col_starts = _block_starts(n_cols, max_cols)
+    row_counts = np.diff(np.append(row_starts, n_rows))
+    col_counts = np.diff(np.append(col_starts, n_cols))
+
+    def reduce_blocks(ufunc):
+        return ufunc.reduceat(ufunc.reduceat(grid, row_starts, axis=0), col_starts, axis=1)
+
+    block_min = reduce_blocks(np.minimum)
+    block_max = reduce_blocks(np.maximum)
+    block_mean = reduce_blocks(np.add) / np.outer(row_counts, col_counts)
+    view = np.where(block_max - block_mean >= block_mean - block_min, block_max, block_min)
+
+    # Pin the global extremes to the blocks that contain them
+    for flat_index, source in ((np.argmin(grid), block_min), (np.argmax(grid), block_max)):
+        row, col = np.unravel_index(flat_index, grid.shape)
+        block = (np.searchsorted(row_starts, row, side='right') - 1,
+                 np.searchsorted(col_starts, col, side='right') - 1)
+        view[block] = source[block]
+
+    row_axis = np.add.reduceat(np.asarray(row_axis, dtype=np.float64), row_starts) / row_counts
+    col_axis = np.add.reduceat(np.asarray(col_axis, dtype=np.float64), col_starts) / col_counts
+    return view, row_axis, col_axis
@@ -3,7 +3,6 @@ Heatmap generation and visualization utilities
 """
 
 import numpy as np
-import plotly.graph_objects as go
 
 
 def create_colorscale(pnl_grid):
@@ -50,10 +49,66 @@ def create_colorscale(pnl_grid):
     return custom_colorscale
 
 
+# Per-cell value labels are drawn only up to this many cells; beyond it the
+# text would be unreadable and dominates the figure payload
+TEXT_LABEL_MAX_CELLS = 400
+
+# Axes with at most this many points get one tick label per row/column;
+# longer axes use automatic numeric ticks
+MAX_TICK_LABELS = 20
+
+# Axes a heatmap can be drawn over: name -> (label, unit, d3 number format)
+HEATMAP_AXES = {
+    'spot': ('Spot Price', '$', '$.2f'),
+    'volatility': ('Volatility', '%', '.2%'),
+    'maturity': ('Time to Maturity', 'years', '.2f'),
+    'rate': ('Risk-Free Rate', '%', '.2%'),
+}
+
+# Hover content is produced in the browser from the z values and axis values,
+# so no per-cell strings are built or shipped
+HOVER_TEMPLATE = (
+    "<span style='color: black;'>Spot Price: %{y:$.2f}<br>"
+    "Volatility: %{x:.2%}<br>"
+    "PnL: $%{z:.2f}</span><extra></extra>"
+)
+
+
+def _value_template(value_format):
+    """Plotly template for a cell value; a '$' format keeps the $ before the sign"""
+    if value_format.startswith('$'):
+        return f"$%{{z:{value_format[1:]}}}"
+    return f"%{{z:{value_format}}}"
+
+
+def _hover_template(x_axis, y_axis, value_label='PnL', value_format='$.2f'):
+    """HOVER_TEMPLATE for any pair of HEATMAP_AXES and value label and format"""
+    if (x_axis, y_axis, value_label, value_format) == ('volatility', 'spot', 'PnL', '$.2f'):
+        return HOVER_TEMPLATE
+    x_label, _, x_format = HEATMAP_AXES[x_axis]
+    y_label, _, y_format = HEATMAP_AXES[y_axis]
+    return (
+        f"<span style='color: black;'>{y_label}: %{{y:{y_format}}}<br>"
+        f"{x_label}: %{{x:{x_format}}}<br>"
+        f"{value_label}: {_value_template(value_format)}</span><extra></extra>"
+    )
+
+
+def _tick_text(value, d3_format):
+    """Format a tick like Plotly's d3 format; only the $ prefix differs"""
+    if d3_format.startswith('$'):
+        return '$' + format(value, d3_format[1:])
+    return format(value, d3_format)
+
+
 def generate_hover_text(spot_prices, volatilities, pnl_grid):
     """
     Generate hover text for heatmap cells with black color.
     
+    Kept for callers that need the strings themselves; create_heatmap_figure
+    uses HOVER_TEMPLATE instead. Built with vectorized NumPy string
+    operations over the row/column labels.
+    
     Args:
         spot_prices (np.array): Array of spot prices
         volatilities (np.array): Array of volatilities
@@ -62,59 +117,90 @@ def generate_hover_text(spot_prices, volatilities, pnl_grid):
     Returns:
         np.array: 2D array of hover text strings
     """
-    grid_size = len(spot_prices)
-    hover_text = np.empty((grid_size, grid_size), dtype=object)
+    spot_labels = np.char.mod("<span style='color: black;'>Spot Price: $%.2f<br>",
+                              np.asarray(spot_prices))[:, np.newaxis]
+    vol_labels = np.char.mod("Volatility: %.2f%%<br>",
+                             np.asarray(volatilities) * 100)[np.newaxis, :]
+    pnl_labels = np.char.mod("PnL: $%.2f</span>", np.asarray(pnl_grid))
     
-    for i in range(grid_size):
-        for j in range(grid_size):
-            hover_text[i, j] = (
-                f"<span style='color: black;'>Spot Price: ${spot_prices[i]:.2f}<br>"
-                f"Volatility: {volatilities[j]:.2%}<br>"
-                f"PnL: ${pnl_grid[i, j]:.2f}</span>"
-            )
-    
-    return hover_text
+    return np.char.add(np.char.add(spot_labels, vol_labels), pnl_labels).astype(object)
 
 
-def create_heatmap_figure(pnl_grid, spot_prices, volatilities, title="PnL ($)"):
+def create_heatmap_figure(pnl_grid, spot_prices, volatilities, title=None,
+                          show_labels=None, x_axis='volatility', y_axis='spot',
+                          value_label='PnL', value_unit='$', value_format='$.2f'):
     """
     Create a Plotly heatmap figure with custom styling.
     
+    Hover and cell label content come from Plotly templates evaluated in the
+    browser, so only the z grid and the axis values are sent. Axes are
+    numeric, so large or downsampled grids never merge cells whose labels
+    round to the same text. Any other pair of HEATMAP_AXES can be drawn,
+    e.g. a spot x maturity slice of a scenario cube, by naming the axes,
+    and any value, e.g. a Greek, by giving its label, unit and format.
+    
     Args:
         pnl_grid (np.array): 2D array of PnL values
         spot_prices (np.array): Array of spot prices for y-axis
         volatilities (np.array): Array of volatilities for x-axis
-        title (str): Title for the colorbar
+        title (str): Title for the colorbar (default "<value_label> (<value_unit>)",
+            or just the label when there is no unit)
+        show_labels (bool): Draw the value in each cell; by default only
+            when the grid has at most TEXT_LABEL_MAX_CELLS cells
+        x_axis (str): HEATMAP_AXES name of the x values (columns)
+        y_axis (str): HEATMAP_AXES name of the y values (rows)
+        value_label (str): What the cells hold, shown on hover, e.g. 'Price'
+            for price grids such as scenario cube slices
+        value_unit (str): Unit of the cell values for the colorbar title,
+            or '' for unitless values such as delta
+        value_format (str): d3 number format of the cell values on hover
+            and in the cell labels, e.g. '.4f' for delta; a leading '$'
+            prefixes a dollar sign
         
     Returns:
         go.Figure: Plotly figure object
     """
-    grid_size = len(spot_prices)
+    if title is None:
+        title = f"{value_label} ({value_unit})" if value_unit else value_label
+    if show_labels is None:
+        show_labels = pnl_grid.size <= TEXT_LABEL_MAX_CELLS
     
-    # Generate hover text
-    hover_text = generate_hover_text(spot_prices, volatilities, pnl_grid)
+    # Plotly is imported on first use so importing this module stays cheap
+    import plotly.graph_objects as go
     
     # Create colorscale
     custom_colorscale = create_colorscale(pnl_grid)
     
+    x_label, x_unit, x_format = HEATMAP_AXES[x_axis]
+    y_label, y_unit, y_format = HEATMAP_AXES[y_axis]
+    
+    # Label every row/column on small grids, as before; otherwise format
+    # the automatic ticks the same way
+    xaxis_ticks = dict(tickformat=x_format)
+    yaxis_ticks = dict(tickformat=y_format)
+    if len(volatilities) <= MAX_TICK_LABELS:
+        xaxis_ticks = dict(tickmode='array', tickvals=list(volatilities),
+                           ticktext=[_tick_text(v, x_format) for v in volatilities])
+    if len(spot_prices) <= MAX_TICK_LABELS:
+        yaxis_ticks = dict(tickmode='array', tickvals=list(spot_prices),
+                           ticktext=[_tick_text(s, y_format) for s in spot_prices])
+    
     # Create figure
     fig = go.Figure(data=go.Heatmap(
         z=pnl_grid,
-        x=[f"{v:.2%}" for v in volatilities],
-        y=[f"${s:.2f}" for s in spot_prices],
+        x=volatilities,
+        y=spot_prices,
         colorscale=custom_colorscale,
-        text=[[f"${pnl_grid[i, j]:.2f}" for j in range(grid_size)] for i in range(grid_size)],
-        texttemplate='%{text}',
+        texttemplate=_value_template(value_format) if show_labels else None,
         textfont={"size": 16, "color": "black"},
-        hovertext=hover_text,
-        hoverinfo='text',
+        hovertemplate=_hover_template(x_axis, y_axis, value_label, value_format),
         colorbar=dict(title=title)
     ))
     
     # Update layout
     fig.update_layout(
-        xaxis_title="Volatility(%)",
-        yaxis_title="Spot Price($)",
+        xaxis_title=f"{x_label}({x_unit})",
+        yaxis_title=f"{y_label}({y_unit})",
         height=700,
         width=700,
         plot_bgcolor='rgba(0,0,0,0)',
@@ -126,14 +212,16 @@ def create_heatmap_figure(pnl_grid, spot_prices, volatilities, title="PnL ($)"):
             constrain='domain',
             title_font=dict(size=18, color='#fafafa'),
             tickfont=dict(size=14, color='#fafafa'),
-            fixedrange=True
+            fixedrange=True,
+            **xaxis_ticks
         ),
         yaxis=dict(
             showgrid=False, 
             constrain='domain',
             title_font=dict(size=18, color='#fafafa'),
             tickfont=dict(size=14, color='#fafafa'),
-            fixedrange=True
+            fixedrange=True,
+            **yaxis_ticks
         )
     )
     
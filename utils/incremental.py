@@ -0,0 +1,160 @@
+"""
+Incremental recomputation of the spot x volatility pricing grid
+"""
+
+import numpy as np
+from black_scholes import _carry_yield, _grid_column_terms, _grid_prices_from_terms
+from utils.calculations import PricingResult
+
+
+def _match_axis(new_axis, old_axis):
+    """
+    Locate each value of new_axis in old_axis.
+
+    Args:
+        new_axis (np.array): Axis being priced now
+        old_axis (np.array): Axis of the previous grid
+
+    Returns:
+        np.array: Index into old_axis for every new value, -1 where absent
+    """
+    if len(old_axis) == 0:
+        return np.full(len(new_axis), -1)
+    order = np.argsort(old_axis, kind='stable')
+    sorted_old = old_axis[order]
+    positions = np.minimum(np.searchsorted(sorted_old, new_axis), len(old_axis) - 1)
+    found = sorted_old[positions] == new_axis
+    return np.where(found, order[positions], -1)
+
+
+class IncrementalGridEngine:
+    """
+    Grid pricer that reuses cells from the previous grid it computed.
+
+    When the strike, maturity, rate and yield are unchanged, the new spot and
+    volatility axes are diffed against the previous ones: cells whose spot
+    and volatility both already existed are copied, and only the new rows
+    and columns are priced. Volatility-only terms are kept per column, so a
+    change to the spot axis alone reuses them without recomputation.
+
+    Attributes:
+        exercise (str): Exercise style this engine prices ('european')
+        cells_computed (int): Grid cells priced since creation
+        cells_reused (int): Grid cells copied from a previous grid
+    """
+
+    exercise = 'european'
+
+    def __init__(self):
+        self._result = None
+        self._params = None
+        self._column_terms = None
+        self.cells_computed = 0
+        self.cells_reused = 0
+
+    def reset(self):
+        """Forget the previous grid so the next call is a full computation"""
+        self._result = None
+        self._params = None
+        self._column_terms = None
+
+    def _column_terms_for(self, volatilities, params, col_map):
+        """Column terms for the new volatility axis, reusing matched columns"""
+        if col_map is not None and np.all(col_map >= 0):
+            return tuple(term[col_map] for term in self._column_terms)
+        _, time_to_maturity, risk_free_rate, dividend_yield = params
+        return _grid_column_terms(volatilities, time_to_maturity, risk_free_rate, dividend_yield)
+
+    def compute(self, spot_prices, volatilities, strike_price, time_to_maturity,
+                risk_free_rate, purchase_price=0.0, dividend_yield=0.0, model='black-scholes'):
+        """
+        Price the grid, reusing overlapping cells of the previous call.
+
+        Args:
+            spot_prices (np.array): Array of spot prices (grid rows)
+            volatilities (np.array): Array of volatilities (grid columns)
+            strike_price (float): Strike price
+            time_to_maturity (float): Time to maturity in years
+            risk_free_rate (float): Risk-free interest rate
+            purchase_price (float): Purchase price of the option
+            dividend_yield (float): Continuous dividend yield
+            model (str): One of black_scholes.MODELS
+
+        Returns:
+            PricingResult: Prices, PnL and axes of the grid
+        """
+        spot_prices = np.asarray(spot_prices, dtype=np.float64)
+        volatilities = np.asarray(volatilities, dtype=np.float64)
+        # Black-76 is priced as its equivalent yield, so it shares cells with
+        # a spot grid whose dividend yield equals the rate
+        dividend_yield = _carry_yield(risk_free_rate, dividend_yield, model)
+        params = (float(strike_price), float(time_to_maturity), float(risk_free_rate),
+                  float(dividend_yield))
+
+        if self._result is None or params != self._params:
+            row_map = col_map = None
+        else:
+            row_map = _match_axis(spot_prices, self._result.spot_prices)
+            col_map = _match_axis(volatilities, self._result.volatilities)
+
+        column_terms = self._column_terms_for(volatilities, params, col_map)
+
+        if row_map is None:
+            call_prices, put_prices = _grid_prices_from_terms(
+                spot_prices, *params[:3], column_terms, params[3]
+            )
+            self.cells_computed += call_prices.size
+        else:
+            call_prices, put_prices = self._update(
+                spot_prices, row_map, col_map, column_terms, params
+            )
+
+        self._params = params
+        self._column_terms = column_terms
+        self._result = PricingResult(spot_prices, volatilities, call_prices, put_prices)
+        return self._result.with_purchase_price(purchase_price)
+
+    def _update(self, spot_prices, row_map, col_map, column_terms, params):
+        """Fill the new grid from reused cells and freshly priced strips"""
+        strike_price, time_to_maturity, risk_free_rate, dividend_yield = params
+        previous = self._result
+        shape = (len(spot_prices), len(col_map))
+        call_prices = np.empty(shape)
+        put_prices = np.empty(shape)
+
+        old_rows = row_map >= 0
+        old_cols = col_map >= 0
+        new_rows = ~old_rows
+        new_cols = ~old_cols
+
+        # Cells whose spot and volatility were both on the previous grid
+        if old_rows.any() and old_cols.any():
+            block = np.ix_(row_map[old_rows], col_map[old_cols])
+            target = np.ix_(old_rows, old_cols)
+            call_prices[target] = previous.call_prices[block]
+            put_prices[target] = previous.put_prices[block]
+            self.cells_reused += int(old_rows.sum() * old_cols.sum())
+
+        # New rows span every column
+        if new_rows.any():
+            call_strip, put_strip = _grid_prices_from_terms(
+                spot_prices[new_rows], strike_price, time_to_maturity, risk_free_rate,
+                column_terms, dividend_yield
+            )
+            call_prices[new_rows] = call_strip
+            put_prices[new_rows] = put_strip
+            self.cells_computed += call_strip.size
+
+        # New columns for the rows that were reused
+        if new_cols.any() and old_rows.any():
+            strip_terms = tuple(term[new_cols] for term in column_terms)
+            call_strip, put_strip = _grid_prices_from_terms(
+                spot_prices[old_rows], strike_price, time_to_maturity, risk_free_rate,
+                strip_terms, dividend_yield
+            )
+            target = np.ix_(old_rows, new_cols)
+            call_prices[target] = call_strip
+            put_prices[target] = put_strip
+            self.cells_computed += call_strip.size
+
+        return call_prices, put_prices
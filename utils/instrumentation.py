@@ -0,0 +1,252 @@
+"""
+Lightweight hot-path instrumentation: stage timers, counters and optional
+cProfile capture, exportable as JSON or Prometheus text
+
+Enable by setting the OPTIONS_INSTRUMENTATION environment variable to '1'
+(timers and counters) or 'profile' (also capture a cProfile per rerun).
+If OPTIONS_METRICS_FILE is also set, the app rewrites that file after every
+rerun (JSON for a .json path, Prometheus text otherwise).
+
+When disabled, stage() returns a shared no-op context manager, so
+instrumented code pays only an attribute lookup and a function call.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = 'OPTIONS_INSTRUMENTATION'
+METRICS_FILE_ENV_VAR = 'OPTIONS_METRICS_FILE'
+
+_NULL_STAGE = nullcontext()
+
+
+class Instrumentation:
+    """
+    Collects stage timings and counters for the application.
+
+    Totals are process-wide and aggregate over every session; the timings
+    of the current rerun are tracked per thread, since Streamlit runs each
+    session's script in its own thread.
+
+    Args:
+        mode (str): '', '0' or 'off' disables; 'profile' also enables
+            cProfile capture; anything else enables timers only. Defaults
+            to the OPTIONS_INSTRUMENTATION environment variable.
+    """
+
+    def __init__(self, mode=None):
+        mode = os.environ.get(ENV_VAR, '') if mode is None else mode
+        mode = mode.strip().lower()
+        self.enabled = mode not in ('', '0', 'off', 'false')
+        self.profiling = mode == 'profile'
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._totals = {}
+        self._counters = {}
+        self._gauges = {}
+        self._profiler_owner = None
+        self.reruns = 0
+
+    def _rerun_state(self):
+        if not hasattr(self._local, 'timings'):
+            self._local.timings = {}
+            self._local.profiler = None
+            self._local.profile_text = None
+        return self._local
+
+    def stage(self, name):
+        """
+        Context manager timing one named stage.
+
+        Args:
+            name (str): Stage name, e.g. 'pricing' or 'db_write'
+
+        Returns:
+            Context manager; a shared no-op one when disabled
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._timed_stage(name)
+
+    @contextmanager
+    def _timed_stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+    def _record(self, name, seconds):
+        timings = self._rerun_state().timings
+        timings[name] = timings.get(name, 0.0) + seconds
+        with self._lock:
+            total = self._totals.setdefault(name, {'count': 0, 'seconds': 0.0, 'max': 0.0})
+            total['count'] += 1
+            total['seconds'] += seconds
+            total['max'] = max(total['max'], seconds)
+
+    def increment(self, name, amount=1):
+        """Add amount to a named counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        """Record the current value of a named gauge"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def start_rerun(self):
+        """Reset the current thread's rerun timings and start profiling"""
+        if not self.enabled:
+            return
+        state = self._rerun_state()
+        state.timings = {}
+        if self.profiling:
+            self._stop_profiler(state)
+            self._start_profiler(state)
+
+    def _start_profiler(self, state):
+        """
+        Start a profiler for the current thread's rerun, if none is running.
+
+        Only one cProfile profiler can be active per process on Python
+        3.12+, so concurrent reruns take turns: a rerun that finds another
+        one profiling runs unprofiled. A profiler left behind by a thread
+        that has exited is stopped first.
+        """
+        current = threading.current_thread()
+        with self._lock:
+            if self._profiler_owner is not None:
+                owner, profiler = self._profiler_owner
+                if owner.is_alive() and owner is not current:
+                    state.profile_text = 'Not profiled: another rerun was being profiled'
+                    return
+                profiler.disable()
+                self._profiler_owner = None
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiling tool (a debugger or coverage) is active
+                state.profile_text = 'Not profiled: another profiler is active'
+                return
+            self._profiler_owner = (current, profiler)
+        state.profiler = profiler
+
+    def _stop_profiler(self, state):
+        """Stop the current thread's profiler and release it; returns it or None"""
+        profiler, state.profiler = state.profiler, None
+        if profiler is None:
+            return None
+        profiler.disable()
+        with self._lock:
+            if self._profiler_owner is not None and self._profiler_owner[1] is profiler:
+                self._profiler_owner = None
+        return profiler
+
+    def end_rerun(self, top=25):
+        """
+        Finish the current rerun, stopping the profiler if running.
+
+        Must run before st.rerun() or st.stop(), which end the script by
+        raising; a profiler that is never stopped would keep every later
+        rerun in the process from being profiled.
+
+        Args:
+            top (int): Number of functions kept in the profile summary
+        """
+        if not self.enabled:
+            return
+        state = self._rerun_state()
+        profiler = self._stop_profiler(state)
+        if profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+            state.profile_text = stream.getvalue()
+        with self._lock:
+            self.reruns += 1
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: last_rerun stage seconds, per-stage totals, counters,
+                gauges, rerun count and the last profile summary (or None)
+        """
+        state = self._rerun_state()
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'reruns': self.reruns,
+                'last_rerun': dict(state.timings),
+                'totals': {name: dict(total) for name, total in self._totals.items()},
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'profile': state.profile_text,
+            }
+
+    def to_json(self):
+        """Return the snapshot as a JSON document"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='options_app'):
+        """
+        Return totals, counters and gauges in the Prometheus text format.
+
+        Args:
+            prefix (str): Metric name prefix
+
+        Returns:
+            str: Exposition text
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f'# HELP {prefix}_reruns_total Completed script reruns',
+            f'# TYPE {prefix}_reruns_total counter',
+            f'{prefix}_reruns_total {snapshot["reruns"]}',
+            f'# HELP {prefix}_stage_seconds_total Time spent per stage',
+            f'# TYPE {prefix}_stage_seconds_total counter',
+        ]
+        for name, total in sorted(snapshot['totals'].items()):
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {total["seconds"]:.9f}')
+        lines += [
+            f'# HELP {prefix}_stage_calls_total Calls per stage',
+            f'# TYPE {prefix}_stage_calls_total counter',
+        ]
+        for name, total in sorted(snapshot['totals'].items()):
+            lines.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {total["count"]}')
+        lines += [
+            f'# HELP {prefix}_stage_seconds_max Slowest single call per stage',
+            f'# TYPE {prefix}_stage_seconds_max gauge',
+        ]
+        for name, total in sorted(snapshot['totals'].items()):
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {total["max"]:.9f}')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines += [f'# TYPE {prefix}_{name}_total counter', f'{prefix}_{name}_total {value}']
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines += [f'# TYPE {prefix}_{name} gauge', f'{prefix}_{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """
+        Atomically write the metrics to path, as JSON when it ends in .json
+        and as Prometheus text otherwise.
+        """
+        text = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+
+# Process-wide instance configured from the environment
+instrumentation = Instrumentation()
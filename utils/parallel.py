@@ -0,0 +1,224 @@
+"""
+Multi-core process-pool execution for large batch and grid pricing runs
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from black_scholes import (
+    _carry_yield, _grid_column_terms, _grid_prices_from_terms, black_scholes_prices
+)
+from utils.calculations import PricingResult
+
+# Contracts (or grid cells) per task; small enough to balance load across
+# workers, large enough to amortize the per-task dispatch cost
+DEFAULT_CHUNK_SIZE = 250_000
+
+
+class _SharedArrays:
+    """
+    Named float64 arrays packed into one shared-memory block.
+
+    The block is created by the parent process; workers attach to it by
+    name through the picklable `layout`, so array data is never pickled.
+    """
+
+    def __init__(self, shapes, name=None):
+        self.layout = []
+        offset = 0
+        for array_name, shape in shapes.items():
+            self.layout.append((array_name, tuple(shape), offset))
+            offset += int(np.prod(shape)) * 8
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.arrays = {
+            array_name: np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf, offset=start)
+            for array_name, shape, start in self.layout
+        }
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def attach(cls, name, layout):
+        """Attach to a block created in another process"""
+        return cls({array_name: shape for array_name, shape, _ in layout}, name=name)
+
+    def close(self):
+        """Release the views and the mapping, unlinking the block if owned"""
+        self.arrays = {}
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+# Shared input arrays of option_prices, in black_scholes_prices order
+_CONTRACT_INPUTS = ('S', 'K', 'T', 'r', 'sigma', 'q')
+
+
+def _price_contracts_task(inputs_ref, outputs_ref, start, stop):
+    """Worker: price contracts [start, stop) from shared inputs into shared outputs"""
+    inputs = _SharedArrays.attach(*inputs_ref)
+    outputs = _SharedArrays.attach(*outputs_ref)
+    try:
+        rows = slice(start, stop)
+        call_prices, put_prices = black_scholes_prices(
+            *(inputs.arrays[name][rows] for name in _CONTRACT_INPUTS)
+        )
+        outputs.arrays['call'][rows] = call_prices
+        outputs.arrays['put'][rows] = put_prices
+        del call_prices, put_prices
+    finally:
+        inputs.close()
+        outputs.close()
+    return stop - start
+
+
+def _price_grid_rows_task(inputs_ref, outputs_ref, params, start, stop):
+    """Worker: price grid rows [start, stop) from shared axes into shared outputs"""
+    inputs = _SharedArrays.attach(*inputs_ref)
+    outputs = _SharedArrays.attach(*outputs_ref)
+    try:
+        strike_price, time_to_maturity, risk_free_rate, dividend_yield = params
+        column_terms = _grid_column_terms(
+            inputs.arrays['volatilities'], time_to_maturity, risk_free_rate, dividend_yield
+        )
+        call_prices, put_prices = _grid_prices_from_terms(
+            inputs.arrays['spot_prices'][start:stop],
+            strike_price, time_to_maturity, risk_free_rate, column_terms, dividend_yield
+        )
+        outputs.arrays['call'][start:stop] = call_prices
+        outputs.arrays['put'][start:stop] = put_prices
+        del call_prices, put_prices, column_terms
+    finally:
+        inputs.close()
+        outputs.close()
+    return stop - start
+
+
+class ParallelPricer:
+    """
+    Process pool that prices contracts and grids in parallel chunks.
+
+    Inputs are copied once into a shared-memory block and workers write
+    their results straight into a shared output block, so only chunk
+    bounds cross process boundaries. Use as a context manager, or call
+    close() when done, to shut the pool down.
+
+    Args:
+        workers (int): Number of worker processes (default: CPU count)
+        chunk_size (int): Contracts or grid cells per task
+    """
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, int(chunk_size))
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _run(self, task, inputs, outputs, n_rows, rows_per_task, *args):
+        """Submit one task per block of rows and wait for all of them"""
+        bounds = [
+            (start, min(start + rows_per_task, n_rows))
+            for start in range(0, n_rows, rows_per_task)
+        ]
+        inputs_ref = (inputs.name, inputs.layout)
+        outputs_ref = (outputs.name, outputs.layout)
+        futures = [
+            self._pool().submit(task, inputs_ref, outputs_ref, *args, start, stop)
+            for start, stop in bounds
+        ]
+        for future in futures:
+            future.result()
+
+    def option_prices(self, S, K, T, r, sigma, q=0.0, model='black-scholes'):
+        """
+        Parallel equivalent of black_scholes_prices.
+
+        Inputs broadcast against each other and are priced as a flat array
+        split into chunk_size pieces. Inputs of at most one chunk, or a pool
+        of one worker, are priced in-process.
+
+        Returns:
+            tuple: (call_prices, put_prices) of the broadcast shape
+        """
+        q = _carry_yield(r, q, model)
+        S, K, T, r, sigma, q = np.broadcast_arrays(
+            *(np.asarray(v, dtype=np.float64) for v in (S, K, T, r, sigma, q))
+        )
+        shape, n = S.shape, S.size
+        if n <= self.chunk_size or self.workers == 1:
+            return black_scholes_prices(S, K, T, r, sigma, q)
+
+        inputs = _SharedArrays({name: (n,) for name in _CONTRACT_INPUTS})
+        outputs = _SharedArrays({'call': (n,), 'put': (n,)})
+        try:
+            for name, values in zip(_CONTRACT_INPUTS, (S, K, T, r, sigma, q)):
+                inputs.arrays[name][:] = values.ravel()
+            self._run(_price_contracts_task, inputs, outputs, n, self.chunk_size)
+            return (
+                outputs.arrays['call'].reshape(shape).copy(),
+                outputs.arrays['put'].reshape(shape).copy()
+            )
+        finally:
+            inputs.close()
+            outputs.close()
+
+    def pricing_grid(self, spot_prices, volatilities, strike_price, time_to_maturity,
+                     risk_free_rate, purchase_price=0.0, dividend_yield=0.0,
+                     model='black-scholes'):
+        """
+        Parallel equivalent of calculate_pricing_grid, split by spot rows.
+
+        Returns:
+            PricingResult: Prices, PnL and axes of the grid
+        """
+        spot_prices = np.asarray(spot_prices, dtype=np.float64)
+        volatilities = np.asarray(volatilities, dtype=np.float64)
+        n_spot, n_vol = len(spot_prices), len(volatilities)
+        dividend_yield = _carry_yield(risk_free_rate, dividend_yield, model)
+        params = (float(strike_price), float(time_to_maturity), float(risk_free_rate),
+                  float(dividend_yield))
+
+        if n_spot * n_vol <= self.chunk_size or self.workers == 1:
+            column_terms = _grid_column_terms(volatilities, *params[1:])
+            call_prices, put_prices = _grid_prices_from_terms(
+                spot_prices, *params[:3], column_terms, params[3]
+            )
+        else:
+            inputs = _SharedArrays({'spot_prices': (n_spot,), 'volatilities': (n_vol,)})
+            outputs = _SharedArrays({'call': (n_spot, n_vol), 'put': (n_spot, n_vol)})
+            try:
+                inputs.arrays['spot_prices'][:] = spot_prices
+                inputs.arrays['volatilities'][:] = volatilities
+                rows_per_task = max(1, self.chunk_size // max(n_vol, 1))
+                self._run(_price_grid_rows_task, inputs, outputs, n_spot, rows_per_task, params)
+                call_prices = outputs.arrays['call'].copy()
+                put_prices = outputs.arrays['put'].copy()
+            finally:
+                inputs.close()
+                outputs.close()
+
+        return PricingResult(spot_prices, volatilities, call_prices, put_prices, purchase_price)
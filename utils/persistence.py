@@ -0,0 +1,253 @@
+"""
+Shared database access for concurrent sessions: a pool of read connections
+and a single write-behind writer thread fed by a bounded queue
+"""
+
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import numpy as np
+from database import (
+    check_storage_options, connect, init_database, insert_calculation
+)
+
+# Read connections kept open per pool
+DEFAULT_POOL_SIZE = 4
+
+# Saves waiting for the writer before save() applies backpressure
+DEFAULT_MAX_PENDING = 64
+
+# Saves committed together in one transaction
+DEFAULT_BATCH_SIZE = 32
+
+_STOP = object()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only connections to one database.
+
+    Each connection is used by one thread at a time, so sessions never share
+    a connection; with WAL journaling readers do not block the writer or
+    each other. Connections are opened on demand up to `size`, after which
+    callers wait for one to be returned.
+
+    Args:
+        db_path (str): Path to the database file (initialized if needed)
+        size (int): Maximum number of open connections
+        pragmas (dict): PRAGMA overrides passed to database.connect
+        timeout (float): Seconds to wait for a free connection, None for ever
+    """
+
+    def __init__(self, db_path='options.db', size=DEFAULT_POOL_SIZE, pragmas=None,
+                 timeout=None):
+        init_database(db_path, pragmas).close()
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self.pragmas = pragmas
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def _open(self):
+        conn = connect(self.db_path, self.pragmas)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with block.
+
+        Raises:
+            queue.Empty: If no connection frees up within the timeout
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self):
+        """Close idle connections; borrowed ones close when returned"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class WriteBehindWriter:
+    """
+    Single background thread that owns the only write connection.
+
+    save() validates the request, queues it and returns a Future at once.
+    The thread takes whatever is queued, up to batch_size saves, and commits
+    them in one transaction; if that fails, each save is retried in its own
+    transaction so one bad save cannot fail the others. Each Future resolves
+    to the saved CalculationID or to the exception that prevented the save.
+
+    Backpressure: at most max_pending saves wait in the queue. When it is
+    full, save() blocks until the writer catches up, or raises queue.Full
+    after `timeout` seconds if one is given.
+
+    Pending saves are flushed when the interpreter exits.
+
+    Args:
+        db_path (str): Path to the database file (initialized if needed)
+        max_pending (int): Queue capacity
+        batch_size (int): Maximum saves per transaction
+        pragmas (dict): PRAGMA overrides passed to database.init_database
+    """
+
+    def __init__(self, db_path='options.db', max_pending=DEFAULT_MAX_PENDING,
+                 batch_size=DEFAULT_BATCH_SIZE, pragmas=None):
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self._conn = init_database(db_path, pragmas)
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._idle = threading.Condition()
+        self._unfinished = 0
+        self.saved = 0
+        self.failed = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, input_params, pricing_result, storage='rows', dtype=np.float64,
+             compression=None, timeout=None):
+        """
+        Queue a calculation to be saved; arguments as database.save_calculation.
+
+        Args:
+            timeout (float): Seconds to wait for queue space when it is full;
+                None waits as long as needed
+
+        Returns:
+            concurrent.futures.Future: Resolves to the CalculationID
+
+        Raises:
+            ValueError: For an unknown storage mode or compression
+            queue.Full: If the queue stays full for `timeout` seconds
+            RuntimeError: If the writer has been closed
+        """
+        check_storage_options(storage, compression)
+        if not self._thread.is_alive():
+            raise RuntimeError("Database writer is closed")
+        future = Future()
+        with self._idle:
+            self._unfinished += 1
+        try:
+            self._queue.put(
+                (future, (input_params, pricing_result, storage, dtype, compression)),
+                timeout=timeout
+            )
+        except queue.Full:
+            self._task_done(1)
+            raise
+        return future
+
+    def pending(self):
+        """Number of saves queued or being written"""
+        with self._idle:
+            return self._unfinished
+
+    def flush(self, timeout=None):
+        """
+        Wait until every save queued so far has been committed or failed.
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def close(self, timeout=None):
+        """Flush pending saves, stop the thread and close the connection"""
+        if self._thread.is_alive():
+            self._queue.put((None, _STOP))
+            self._thread.join(timeout)
+        if not self._thread.is_alive() and self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: pending, saved, failed and batches counts
+        """
+        return {
+            'pending': self.pending(),
+            'saved': self.saved,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
+
+    def _task_done(self, count):
+        with self._idle:
+            self._unfinished -= count
+            if self._unfinished == 0:
+                self._idle.notify_all()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(job is _STOP for _, job in batch)
+            batch = [(future, job) for future, job in batch if job is not _STOP]
+            if batch:
+                self._write(batch)
+                self._task_done(len(batch))
+
+    def _write(self, batch):
+        """Commit a batch in one transaction, falling back to one per save"""
+        try:
+            with self._conn:
+                cursor = self._conn.cursor()
+                ids = [insert_calculation(cursor, *job) for _, job in batch]
+        except Exception:
+            for future, job in batch:
+                try:
+                    with self._conn:
+                        calculation_id = insert_calculation(self._conn.cursor(), *job)
+                except Exception as e:
+                    self.failed += 1
+                    future.set_exception(e)
+                else:
+                    self.saved += 1
+                    future.set_result(calculation_id)
+        else:
+            self.saved += len(batch)
+            for (future, _), calculation_id in zip(batch, ids):
+                future.set_result(calculation_id)
+        self.batches += 1
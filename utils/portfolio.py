@@ -0,0 +1,101 @@
+"""
+Portfolio (multi-leg position) pricing and aggregated PnL grids
+"""
+
+import numpy as np
+from black_scholes import black_scholes_prices
+
+POSITION_COLUMNS = ('quantity', 'strike', 'expiry', 'is_call', 'entry_price')
+
+# Upper bound on legs x spot x volatility cells evaluated at once
+DEFAULT_MAX_CELLS = 2_000_000
+
+
+def make_positions(quantity, strike, expiry, option_type, entry_price):
+    """
+    Build a columnar position table.
+
+    Args:
+        quantity (array): Signed number of contracts per leg (negative = short)
+        strike (array): Strike price per leg
+        expiry (array): Time to maturity per leg in years
+        option_type (array): Per leg, a bool (True = call) or 'call'/'put'
+        entry_price (array): Price paid (or received) per contract
+
+    Returns:
+        dict: Mapping of POSITION_COLUMNS to equal-length numpy arrays
+    """
+    option_type = np.asarray(option_type)
+    if option_type.dtype.kind in 'US':
+        lowered = np.char.lower(option_type)
+        if not np.all((lowered == 'call') | (lowered == 'put')):
+            raise ValueError("option_type strings must be 'call' or 'put'")
+        is_call = lowered == 'call'
+    else:
+        is_call = option_type.astype(bool)
+
+    positions = {
+        'quantity': np.asarray(quantity, dtype=np.float64),
+        'strike': np.asarray(strike, dtype=np.float64),
+        'expiry': np.asarray(expiry, dtype=np.float64),
+        'is_call': is_call,
+        'entry_price': np.asarray(entry_price, dtype=np.float64),
+    }
+    positions = {name: np.atleast_1d(column) for name, column in positions.items()}
+
+    lengths = {len(column) for column in positions.values()}
+    if len(lengths) != 1:
+        raise ValueError("All position columns must have the same length")
+    return positions
+
+
+def calculate_portfolio_pnl_grid(positions, spot_prices, volatilities, risk_free_rate,
+                                 max_cells=DEFAULT_MAX_CELLS, dividend_yield=0.0,
+                                 model='black-scholes'):
+    """
+    Calculate the aggregated PnL of a book over a spot x volatility grid.
+
+    Every leg is revalued at each (spot, volatility) scenario in one
+    broadcast legs x spot x volatility evaluation. Legs are processed in
+    chunks so the tensor never exceeds max_cells elements, and each chunk
+    is summed into the running total.
+
+    Args:
+        positions (dict): Columnar position table from make_positions
+        spot_prices (np.array): Array of spot prices (grid rows)
+        volatilities (np.array): Array of volatilities (grid columns)
+        risk_free_rate (float): Risk-free interest rate
+        max_cells (int): Maximum tensor size evaluated per chunk
+        dividend_yield (float): Continuous dividend yield of the underlying
+        model (str): One of black_scholes.MODELS
+
+    Returns:
+        np.array: PnL grid of shape (len(spot_prices), len(volatilities)),
+            ready for create_heatmap_figure
+    """
+    spot_prices = np.asarray(spot_prices, dtype=np.float64)
+    volatilities = np.asarray(volatilities, dtype=np.float64)
+    n_spot, n_vol = len(spot_prices), len(volatilities)
+
+    S = spot_prices[np.newaxis, :, np.newaxis]
+    sigma = volatilities[np.newaxis, np.newaxis, :]
+
+    n_legs = len(positions['quantity'])
+    chunk_size = max(1, max_cells // max(n_spot * n_vol, 1))
+    pnl_grid = np.zeros((n_spot, n_vol))
+
+    for start in range(0, n_legs, chunk_size):
+        legs = slice(start, start + chunk_size)
+        chunk = {
+            name: positions[name][legs, np.newaxis, np.newaxis] for name in POSITION_COLUMNS
+        }
+
+        call_prices, put_prices = black_scholes_prices(
+            S, chunk['strike'], chunk['expiry'], risk_free_rate, sigma, dividend_yield, model
+        )
+        prices = np.where(chunk['is_call'], call_prices, put_prices)
+        prices -= chunk['entry_price']
+        prices *= chunk['quantity']
+        pnl_grid += prices.sum(axis=0)
+
+    return pnl_grid
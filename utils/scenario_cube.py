@@ -0,0 +1,229 @@
+"""
+Scenario cubes: call and put prices over spot x volatility x maturity x rate
+shocks, written to a memory-mapped .npy file one 2-D slice at a time and read
+back a slice at a time
+"""
+
+import json
+import os
+
+import numpy as np
+from utils.cache import make_cache_key
+from utils.calculations import PricingResult, calculate_pricing_grid
+
+# Layout version of the cube file and its metadata
+CUBE_FORMAT_VERSION = 1
+
+# Axis names, shared with utils.heatmap.HEATMAP_AXES, in the order they are
+# passed to build_scenario_cube
+CUBE_AXES = ('spot', 'volatility', 'maturity', 'rate')
+
+# Storage order of the axes. Each (maturity, rate) pair is one contiguous
+# spot x volatility block, so the heatmap slice is a single sequential read;
+# other slices touch only the pages holding their cells
+_STORAGE_ORDER = ('maturity', 'rate', 'spot', 'volatility')
+
+OPTION_TYPES = ('call', 'put')
+
+
+def _metadata_path(path):
+    """Metadata file stored next to the cube"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+class ScenarioCube:
+    """
+    Read-only view of a scenario cube file.
+
+    The prices stay on disk: slices copy only the cells they select, so a
+    cube far larger than memory can be browsed one heatmap at a time.
+
+    Args:
+        path (str): Cube file written by build_scenario_cube
+        metadata (dict): Contents of the cube's metadata file
+        reused (bool): True when the file existed before this run
+
+    Attributes:
+        prices (np.memmap): Prices of shape (2, n_maturity, n_rate, n_spot,
+            n_vol); index 0 holds calls, 1 puts
+        axes (dict): Axis name to its values, for every name in CUBE_AXES
+    """
+
+    def __init__(self, path, metadata, reused=False):
+        self.path = path
+        self.metadata = metadata
+        self.reused = reused
+        self.prices = np.load(path, mmap_mode='r')
+        self.axes = {name: np.asarray(metadata['axes'][name]) for name in CUBE_AXES}
+
+    @property
+    def shape(self):
+        """tuple: Cube shape in CUBE_AXES order"""
+        return tuple(len(self.axes[name]) for name in CUBE_AXES)
+
+    def nearest_index(self, axis, value):
+        """
+        Position of the grid point closest to value along an axis.
+
+        Args:
+            axis (str): One of CUBE_AXES
+            value (float): Axis value to look up
+
+        Returns:
+            int: Index into self.axes[axis]
+        """
+        return int(np.abs(self.axes[axis] - value).argmin())
+
+    def slice(self, option='call', rows='spot', columns='volatility', **fixed):
+        """
+        Extract one 2-D slice of the cube, ready for create_heatmap_figure.
+
+        The two axes not plotted are pinned with keyword arguments naming
+        them, e.g. maturity=0.5, rate=0.04; each snaps to the nearest grid
+        point. Only the selected cells are read from disk. The grid holds
+        prices, so draw it with create_heatmap_figure(..., value_label='Price')
+        and the axes' names as x_axis and y_axis.
+
+        Args:
+            option (str): 'call' or 'put'
+            rows (str): CUBE_AXES name of the slice rows (heatmap y-axis)
+            columns (str): CUBE_AXES name of the slice columns (heatmap x-axis)
+            **fixed (float): Values of the two remaining axes
+
+        Returns:
+            tuple: (grid of shape (n_rows, n_columns), row values, column values)
+
+        Raises:
+            ValueError: For an unknown option type or axis, or when the
+                fixed values do not pin exactly the two remaining axes
+        """
+        if option not in OPTION_TYPES:
+            raise ValueError(f"Unknown option type {option!r}; expected one of {OPTION_TYPES}")
+        for axis in (rows, columns, *fixed):
+            if axis not in CUBE_AXES:
+                raise ValueError(f"Unknown cube axis {axis!r}; expected one of {CUBE_AXES}")
+        remaining = set(CUBE_AXES) - {rows, columns}
+        if rows == columns or set(fixed) != remaining:
+            raise ValueError(
+                f"A {rows} x {columns} slice needs values for {sorted(remaining)}, "
+                f"got {sorted(fixed)}"
+            )
+
+        index = tuple(
+            self.nearest_index(axis, fixed[axis]) if axis in fixed else slice(None)
+            for axis in _STORAGE_ORDER
+        )
+        grid = np.array(self.prices[(OPTION_TYPES.index(option),) + index])
+        if _STORAGE_ORDER.index(rows) > _STORAGE_ORDER.index(columns):
+            grid = grid.T
+        return grid, self.axes[rows], self.axes[columns]
+
+    def pricing_result(self, maturity, rate, purchase_price=0.0):
+        """
+        The spot x volatility slice at one maturity and rate as a PricingResult.
+
+        Args:
+            maturity (float): Time to maturity; snaps to the nearest grid point
+            rate (float): Risk-free rate; snaps to the nearest grid point
+            purchase_price (float): Purchase price the PnL grids are measured against
+
+        Returns:
+            PricingResult: Same layout as calculate_pricing_grid returns
+        """
+        call_prices, spot_prices, volatilities = self.slice('call', maturity=maturity, rate=rate)
+        put_prices, _, _ = self.slice('put', maturity=maturity, rate=rate)
+        return PricingResult(spot_prices, volatilities, call_prices, put_prices, purchase_price)
+
+
+def _load_matching(path, key):
+    """Open the cube at path if it was completed with the same inputs"""
+    try:
+        with open(_metadata_path(path)) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if metadata.get('format_version') != CUBE_FORMAT_VERSION or metadata.get('key') != key:
+        return None
+    try:
+        cube = ScenarioCube(path, metadata, reused=True)
+    except (OSError, ValueError):
+        return None
+    return cube if cube.prices.shape == (2, *(len(cube.axes[a]) for a in _STORAGE_ORDER)) else None
+
+
+def build_scenario_cube(spot_prices, volatilities, maturities, rates, strike_price,
+                        directory='scenario_cubes', exercise='european', dividend_yield=0.0,
+                        model='black-scholes', dtype=np.float64):
+    """
+    Price calls and puts over a 4-D shock grid into a memory-mapped cube.
+
+    Each (maturity, rate) pair is priced as one spot x volatility grid by
+    calculate_pricing_grid and written straight to the file, so memory use
+    is bounded by a single 2-D slice whatever the cube size. The file is
+    named after a hash of the inputs: rerunning with the same axes and
+    parameters reopens the finished cube instead of repricing it. A cube is
+    written under a temporary name and its metadata last, so an interrupted
+    build is never reused.
+
+    Args:
+        spot_prices (np.array): Spot price shocks
+        volatilities (np.array): Volatility shocks
+        maturities (np.array): Times to maturity in years
+        rates (np.array): Risk-free rate shocks
+        strike_price (float): Strike price
+        directory (str): Folder holding the cube files
+        exercise (str): One of lattice.EXERCISE_STYLES
+        dividend_yield (float): Continuous dividend yield
+        model (str): One of black_scholes.MODELS
+        dtype (np.dtype): Stored precision; float32 halves the file size
+
+    Returns:
+        ScenarioCube: Read-only view of the cube, with reused set when an
+            existing file was reopened
+    """
+    axes = {
+        name: np.asarray(values, dtype=np.float64).ravel()
+        for name, values in zip(CUBE_AXES, (spot_prices, volatilities, maturities, rates))
+    }
+    dtype = np.dtype(dtype)
+    # Black-76 ignores the dividend yield, so it is not part of the key
+    key_yield = 0.0 if model == 'black-76' else dividend_yield
+    key = make_cache_key(
+        'scenario-cube', CUBE_FORMAT_VERSION, *(axes[name] for name in CUBE_AXES),
+        strike_price, key_yield, exercise, model, dtype.str
+    )
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'cube_{key}.npy')
+
+    cube = _load_matching(path, key)
+    if cube is not None:
+        return cube
+
+    shape = (2, *(len(axes[name]) for name in _STORAGE_ORDER))
+    partial_path = os.path.join(directory, f'cube_{key}.partial.npy')
+    prices = np.lib.format.open_memmap(partial_path, mode='w+', dtype=dtype, shape=shape)
+    for i, maturity in enumerate(axes['maturity']):
+        for j, rate in enumerate(axes['rate']):
+            result = calculate_pricing_grid(
+                axes['spot'], axes['volatility'], strike_price, maturity, rate,
+                exercise=exercise, dividend_yield=dividend_yield, model=model
+            )
+            prices[0, i, j] = result.call_prices
+            prices[1, i, j] = result.put_prices
+    prices.flush()
+    del prices
+    os.replace(partial_path, path)
+
+    metadata = {
+        'format_version': CUBE_FORMAT_VERSION,
+        'key': key,
+        'axes': {name: axes[name].tolist() for name in CUBE_AXES},
+        'strike_price': float(strike_price),
+        'exercise': exercise,
+        'dividend_yield': float(dividend_yield),
+        'model': model,
+        'dtype': dtype.str,
+    }
+    with open(_metadata_path(path), 'w') as f:
+        json.dump(metadata, f)
+    return ScenarioCube(path, metadata)
@@ -0,0 +1,174 @@
+"""
+American pricing grids served from surface indexes built on demand
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from lattice import lattice_grid_prices
+from surface_index import build_surface_index
+from utils.calculations import LATTICE_METHOD, LATTICE_STEPS, PricingResult
+
+# Table built per maturity, rate and yield. It interpolates the
+# LATTICE_STEPS lattice to within a few 1e-4 of K * e^(-r*T) for puts,
+# less for calls, which keeps it inside the lattice's own error against
+# a converged lattice; it builds in about twice the time of one 100 x 100
+# lattice grid
+INDEX_SHAPE = (201, 101)
+
+# Below this total volatility the early-exercise boundary is too sharp to
+# interpolate at INDEX_SHAPE, so those cells stay on the lattice
+INDEX_MIN_TOTAL_VOL = 0.15
+
+# Indexes kept at once, least recently used evicted first
+MAX_INDEXES = 8
+
+# Maturity/rate/yield combinations whose lattice work is remembered
+_MAX_TRACKED_KEYS = 256
+
+
+class SurfaceGridEngine:
+    """
+    American grid pricer that switches to a surface index once it pays off.
+
+    A surface index (see surface_index.build_surface_index) prices any
+    spot, strike and volatility for one maturity, rate and yield, about
+    100x faster than the lattice, but building it costs roughly as much as
+    pricing INDEX_SHAPE cells on the lattice. Grids are therefore priced on
+    the lattice until the cells priced for the same maturity, rate and
+    yield would reach that cost; the index is built then, so the total
+    never exceeds twice what the cheaper choice would have cost. Strike
+    and range changes afterwards are served from the index.
+
+    Indexes are written to a private temporary directory and shared by
+    every thread; a build holds the engine's lock, so concurrent sessions
+    wait for one build rather than duplicating it.
+
+    Args:
+        directory (str): Where tables are written (default: a new
+            temporary directory, removed by close())
+        shape (tuple): Nodes along (moneyness, total volatility)
+        min_total_vol (float): Smallest total volatility interpolated
+        max_indexes (int): Indexes kept before the least recently used is
+            dropped
+
+    Attributes:
+        exercise (str): Exercise style this engine prices ('american')
+        cells_lattice (int): Grid cells priced on the lattice
+        cells_interpolated (int): Grid cells served from an index
+        indexes_built (int): Indexes built since creation
+    """
+
+    exercise = 'american'
+
+    def __init__(self, directory=None, shape=INDEX_SHAPE, min_total_vol=INDEX_MIN_TOTAL_VOL,
+                 max_indexes=MAX_INDEXES):
+        self._owns_directory = directory is None
+        self._directory = tempfile.mkdtemp(prefix='surface-index-') if directory is None else directory
+        self._shape = tuple(shape)
+        self._min_total_vol = min_total_vol
+        self._max_indexes = max_indexes
+        self._indexes = OrderedDict()
+        self._lattice_cells = OrderedDict()
+        self._lock = threading.Lock()
+        self.cells_lattice = 0
+        self.cells_interpolated = 0
+        self.indexes_built = 0
+
+    def _table_path(self, key):
+        T, r, q = key
+        return os.path.join(self._directory, f'american_{T!r}_{r!r}_{q!r}.npy')
+
+    def _index_for(self, key, cells):
+        """The index for key, built now if it has paid off, else None"""
+        if key[0] <= 0:
+            return None
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+
+            priced = self._lattice_cells.pop(key, 0)
+            if priced + cells < np.prod(self._shape):
+                self._lattice_cells[key] = priced + cells
+                while len(self._lattice_cells) > _MAX_TRACKED_KEYS:
+                    self._lattice_cells.popitem(last=False)
+                return None
+
+            T, r, q = key
+            index = build_surface_index(
+                self._table_path(key), 'american', T=T, r=r, q=q, shape=self._shape,
+                min_total_vol=self._min_total_vol, steps=LATTICE_STEPS, method=LATTICE_METHOD
+            )
+            self.indexes_built += 1
+            self._indexes[key] = index
+            while len(self._indexes) > self._max_indexes:
+                evicted, _ = self._indexes.popitem(last=False)
+                self._remove_table(evicted)
+            return index
+
+    def _remove_table(self, key):
+        """Delete a table and its metadata, leaving open memory maps valid"""
+        path = self._table_path(key)
+        for name in (path, os.path.splitext(path)[0] + '.json'):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+    def compute(self, spot_prices, volatilities, strike_price, time_to_maturity,
+                risk_free_rate, purchase_price=0.0, dividend_yield=0.0):
+        """
+        Price an American spot x volatility grid.
+
+        Same arguments as calculate_pricing_grid with exercise='american';
+        dividend_yield is the yield priced with (Black-76 passes the rate).
+
+        Returns:
+            PricingResult: Prices, PnL and axes of the grid
+        """
+        spot_prices = np.asarray(spot_prices, dtype=np.float64)
+        volatilities = np.asarray(volatilities, dtype=np.float64)
+        cells = spot_prices.size * volatilities.size
+        key = (float(time_to_maturity), float(risk_free_rate), float(dividend_yield))
+
+        index = self._index_for(key, cells)
+        if index is None:
+            call_prices, put_prices = lattice_grid_prices(
+                spot_prices, volatilities, strike_price, time_to_maturity, risk_free_rate,
+                american=True, steps=LATTICE_STEPS, method=LATTICE_METHOD, q=dividend_yield
+            )
+            self.cells_lattice += cells
+        else:
+            call_prices, put_prices = index.prices(
+                spot_prices[:, np.newaxis], strike_price, time_to_maturity, risk_free_rate,
+                volatilities[np.newaxis, :], dividend_yield
+            )
+            self.cells_interpolated += cells
+
+        return PricingResult(spot_prices, volatilities, call_prices, put_prices, purchase_price)
+
+    def stats(self):
+        """
+        Returns:
+            dict: cells_lattice, cells_interpolated, indexes_built and
+                indexes (held now)
+        """
+        return {
+            'cells_lattice': self.cells_lattice,
+            'cells_interpolated': self.cells_interpolated,
+            'indexes_built': self.indexes_built,
+            'indexes': len(self._indexes),
+        }
+
+    def close(self):
+        """Drop every index and remove the temporary directory if it was created here"""
+        with self._lock:
+            self._indexes.clear()
+            self._lattice_cells.clear()
+            if self._owns_directory:
+                shutil.rmtree(self._directory, ignore_errors=True)